@@ -9,12 +9,13 @@ The attribute names (p_O2gas, T, p_COgas) of ScanKinetics
 have to be defined in the your model.
 The final configuration of each kMC run
 will be stored in a subdirectory ScanKinetics_configs
-for caching, the output data will be stored in ScanKinetics.dat.
+for caching, the output data will be stored in ScanKinetics.npz.
 
-To allow execution from multiple hosts connected
-to the same filesystem calculated points are blocked
-via ScanKinetics.lock. To redo a calculation ScanKinetics.dat
-and ScanKinetics.lock should be moved out of the way.
+The points to calculate are handed out to the workers from
+the job queue ScanKinetics.sqlite, which also allows execution
+from multiple hosts connected to the same filesystem. Running
+the script again only calculates missing points. To redo a
+calculation ScanKinetics.sqlite should be moved out of the way.
 """
 
 from kmos.run import ModelRunner, PressureParameter, TemperatureParameter
@@ -49,9 +49,18 @@ usage = {}
 usage["all"] = """kmos help all
     Display documentation for all commands.
                 """
-usage["benchmark"] = """kmos benchmark
+usage["benchmark"] = """kmos benchmark [<xml-file> [<backend> ...]]
     Run 1 mio. kMC steps on model in current directory
     and report runtime.
+
+    With an xml-file export and build the model with each
+    backend (default: local_smart, lat_int and table)
+    in a temporary directory and report the size of the
+    generated code, the export and build times, the size
+    of the binary and the steps per second of each.
+    A backend can be quoted together with export options,
+    e.g. "local_smart --inline", to compare them against
+    the plain backend.
                      """
 
 usage["build"] = """kmos build
@@ -80,10 +89,14 @@ usage["export"] = """kmos export <xml-file> [<export-path>]
         -s/--source-only
             Export source only and don't build binary
 
-        -b/--backend (local_smart|lat_int|otf)
+        -b/--backend (local_smart|lat_int|otf|table)
             Choose backend. Default is "local_smart".
             lat_int is EXPERIMENTAL and not made
-            for production, yet.
+            for production, yet. table runs the processes
+            of the lat_int backend from integer tables
+            instead of generating code for each, so that
+            the build time hardly grows with the number of
+            processes, at the cost of slower steps.
 
         -w/--wasm
             Export and compile for WebAssembly using flang-wasm.
@@ -98,6 +111,72 @@ usage["export"] = """kmos export <xml-file> [<export-path>]
             Build the modules base_acf.f90 and proclist_acf.f90. Default is false.
             This both modules contain functions to calculate ACF (autocorrelation function) and MSD (mean squared displacement).
 
+           --sparse
+            Store the available sites of each process in growing
+            lists plus a hash table instead of the dense
+            avail_sites(nr_of_proc, volume, 2) array. Memory then
+            scales with the number of enabled processes rather than
+            nr_of_proc x volume at the cost of slightly slower steps.
+            With the otf backend this also applies to the rates and
+            their sum trees, which otherwise take two dense
+            nr_of_proc x volume arrays of doubles.
+
+           --rng=intrinsic|xoshiro
+            Random number generator of the exported model. Default is
+            intrinsic, i.e. the single precision random_number of the
+            Fortran compiler. xoshiro uses a built-in xoshiro256**
+            generator that draws double precision numbers, is
+            identical across compilers, is saved and reloaded with the
+            system state and provides independent streams via
+            KMC_Model(random_stream=...).
+
+           --openmp
+            Compile with OpenMP, so that do_kmc_steps_ensemble, i.e.
+            KMC_Ensemble.do_steps, advances the replicas of a model in
+            parallel threads. Without it the replicas run one after the
+            other.
+
+           --sublattice
+            Compile with OpenMP for do_kmc_steps_sublattice, i.e.
+            KMC_Model.do_steps_sublattice, which runs the domains of a
+            single large lattice in parallel threads with the
+            synchronous sublattice method. Only for the local_smart and
+            lat_int backends and not together with --openmp or --acf.
+            Each thread keeps a book-keeping of its own, so --sparse
+            saves memory on large lattices.
+
+           --rate-tables=N
+            Only for the otf backend: tabulate the rate of each process
+            for all numbers of bystanders of each species and flag if
+            the table has at most N entries, instead of evaluating the
+            otf_rate expression in every step. The tables are filled
+            again whenever a rate constant or parameter changes.
+            Processes with larger tables evaluate the expression.
+            Default is 0, i.e. no tables.
+
+           --inline
+            Only for the local_smart backend: let the generated
+            put/take/touchup routines look up the index of each site
+            they touch once and then work directly on the avail_sites
+            and lattice arrays of the base module instead of calling
+            can_do, add_proc, del_proc and get_species of the lattice
+            module for every question. Not together with --sublattice.
+
+           --site-order=row|morton|hilbert
+            Order in which the sites are numbered. Default is row,
+            i.e. x fastest, then y, then z. morton and hilbert number
+            the unit cells along a space-filling curve, so that
+            neighbouring cells mostly get nearby numbers and the
+            book-keeping of a step touches fewer cache lines on large
+            lattices. hilbert is only available for 2D models. Site
+            coordinates seen from Python are the same for all orders.
+
+           --compact-lookup
+            Allocate the lattice2nr lookup table only for the system
+            plus the few unit cells that the processes reach beyond
+            it, instead of for 27 (3D) or 9 (2D) copies of the system.
+            This saves memory and startup time on large lattices.
+
         -n/--no-compiler-optimization
             Do not send optimizing flags to compiler.
                     """ % ("pyd" if os.name == "nt" else "so")
@@ -116,6 +195,36 @@ usage["import"] = """kmos import <xml-file>
     Take a kmos xml-file and open an ipython shell
     with the project_tree imported as pt.
                   """
+usage["movie"] = """kmos movie [<prefix>]
+    Run the model in the current directory and write
+    a snapshot every few steps to <prefix>_000000.png,
+    <prefix>_000001.png, ... (Default prefix: movie).
+
+    Additional Parameters ::
+        --frames <number>
+            Number of frames (Default: 30)
+
+        -v/--steps-per-frame <number>
+            Number of steps per frame
+
+        --suffix (png|pov|traj)
+            File type of the frames (Default: png)
+
+        -j/--processes <number>
+            Number of worker processes which build and
+            write the frames while the model keeps running
+            (Default: 1)
+
+        --max-pending <number>
+            Maximum number of frames waiting for a worker
+            (Default: 2 per worker process)
+
+        --raster
+            Paint each site as a small square in the colour
+            of its species instead of rendering the atoms.
+            Much faster, only for png.
+                  """
+
 usage["rebuild"] = """kmos rebuild
     Export code and rebuild binary module from XML
     information included in kmc_settings.py in
@@ -184,6 +293,16 @@ def get_options(args=None, get_parser=False):
         "-v", "--steps-per-frame", dest="steps_per_frame", type="int", default="50000"
     )
 
+    parser.add_option("--frames", dest="frames", type="int", default=30)
+
+    parser.add_option("--suffix", dest="suffix", default="png")
+
+    parser.add_option("-j", "--processes", dest="processes", type="int", default=1)
+
+    parser.add_option("--max-pending", dest="max_pending", type="int", default=0)
+
+    parser.add_option("--raster", dest="raster", action="store_true", default=False)
+
     parser.add_option("-d", "--debug", default=False, dest="debug", action="store_true")
 
     parser.add_option(
@@ -209,6 +328,64 @@ def get_options(args=None, get_parser=False):
         default=False,
     )
 
+    parser.add_option(
+        "--sparse",
+        dest="sparse",
+        action="store_true",
+        default=False,
+    )
+
+    parser.add_option(
+        "--rng",
+        dest="rng",
+        type="choice",
+        choices=["intrinsic", "xoshiro"],
+        default="intrinsic",
+    )
+
+    parser.add_option(
+        "--openmp",
+        dest="openmp",
+        action="store_true",
+        default=False,
+    )
+
+    parser.add_option(
+        "--sublattice",
+        dest="sublattice",
+        action="store_true",
+        default=False,
+    )
+
+    parser.add_option(
+        "--rate-tables",
+        dest="rate_tables",
+        type="int",
+        default=0,
+    )
+
+    parser.add_option(
+        "--inline",
+        dest="inline",
+        action="store_true",
+        default=False,
+    )
+
+    parser.add_option(
+        "--site-order",
+        dest="site_order",
+        type="choice",
+        choices=["row", "morton", "hilbert"],
+        default="row",
+    )
+
+    parser.add_option(
+        "--compact-lookup",
+        dest="compact_lookup",
+        action="store_true",
+        default=False,
+    )
+
     parser.add_option(
         "-w",
         "--wasm",
@@ -290,7 +467,37 @@ def main(args=None):
     if args[0] not in usage.keys():
         args[0] = match_keys(args[0], usage, parser)
 
-    if args[0] == "benchmark":
+    if args[0] == "benchmark" and len(args) > 1:
+        from kmos.utils import benchmark_backends
+
+        backends = args[2:] or ["local_smart", "lat_int", "table"]
+        results = benchmark_backends(args[1], backends)
+        logger.info(
+            "%-22s %6s %8s %10s %10s %10s %10s"
+            % (
+                "backend",
+                "files",
+                "lines",
+                "export/s",
+                "build/s",
+                "binary/kB",
+                "steps/s",
+            )
+        )
+        for result in results:
+            logger.info(
+                "%-22s %6d %8d %10.1f %10.1f %10d %10.2e"
+                % (
+                    result["backend"],
+                    result["files"],
+                    result["lines"],
+                    result["export_time"],
+                    result["build_time"],
+                    result["binary_size"] / 1024,
+                    result["steps_per_second"],
+                )
+            )
+    elif args[0] == "benchmark":
         from sys import path
 
         path.append(os.path.abspath(os.curdir))
@@ -526,6 +733,26 @@ def main(args=None):
         ):  # if optional 3rd argument is given, store model there and exit
             pt.save(args[2])
 
+    elif args[0] == "movie":
+        from sys import path
+
+        path.append(os.path.abspath(os.curdir))
+        from kmos.run import KMC_Model
+
+        prefix = args[1] if len(args) > 1 else "movie"
+        model = KMC_Model(print_rates=False, banner=False)
+        model.export_movie(
+            frames=options.frames,
+            skip=options.steps_per_frame,
+            prefix=prefix,
+            suffix=options.suffix,
+            verbose=True,
+            processes=options.processes,
+            max_pending=options.max_pending,
+            raster=options.raster,
+        )
+        model.deallocate()
+
     elif args[0] == "rebuild":
         from time import sleep
 
@@ -0,0 +1,220 @@
+!/* ROBODOC this makes robodoc to document this file */
+! Copyright (C)  2009-2013 Max J. Hoffmann
+!
+! This file is part of kmos.
+!
+! kmos is free software; you can redistribute it and/or modify
+! it under the terms of the GNU General Public License as published by
+! the Free Software Foundation; either version 2 of the License, or
+! (at your option) any later version.
+!
+! kmos is distributed in the hope that it will be useful,
+! but WITHOUT ANY WARRANTY; without even the implied warranty of
+! MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+! GNU General Public License for more details.
+!
+! You should have received a copy of the GNU General Public License
+! along with kmos; if not, write to the Free Software
+! Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301
+! USA
+
+module rng
+!****h* kmos/rng
+! FUNCTION
+!    xoshiro256** pseudo random number generator, which replaces the
+!    intrinsic random_number if a model is exported with --rng=xoshiro.
+!    Unlike the intrinsic generator the sequence does not depend on the
+!    compiler, the whole state can be saved and restored and
+!    independent streams for parallel replicas are obtained by jumping
+!    2^128 numbers ahead.
+!
+!    Fortran has no unsigned integers and signed overflow is undefined,
+!    so the 64 bit arithmetic modulo 2^64 is done by add64 and mul64 on
+!    smaller pieces and the constants are given as signed values.
+!******
+use kind_values
+implicit none
+
+private
+public :: rng_state, rng_stream, rng_seed, rng_jump, rng_uniform
+
+integer(kind=ilong), dimension(4) :: rng_state = (/ &
+    -7995527694508729151_ilong, -4689498862643123097_ilong, &
+    -534904783426661026_ilong, 8196980753821780235_ilong /)
+!****v* rng/rng_state
+! FUNCTION
+!   The 256 bit state of the generator, initially the state set by
+!   rng_seed(1).
+!******
+integer(kind=iint) :: rng_stream = 0
+!****v* rng/rng_stream
+! FUNCTION
+!   Number of the stream selected by rng_seed: after seeding the state
+!   is advanced by rng_stream*2^128 numbers, so that replicas with the
+!   same seed but different streams draw non-overlapping sequences.
+!******
+! with --openmp or --sublattice each thread draws from a state of its own
+!$omp threadprivate(rng_state)
+
+integer(kind=ilong), parameter :: golden_gamma = -7046029254386353131_ilong
+integer(kind=ilong), parameter :: mix_1 = -4658895280553007687_ilong
+integer(kind=ilong), parameter :: mix_2 = -7723592293110705685_ilong
+integer(kind=ilong), dimension(4), parameter :: jump_poly = (/ &
+    1733541517147835066_ilong, -3051731464161248980_ilong, &
+    -6244198995065845334_ilong, 4155657270789760540_ilong /)
+
+contains
+
+subroutine rng_seed(seed)
+    !****f* rng/rng_seed
+    ! FUNCTION
+    !    Fills the state from seed with splitmix64 as recommended by the
+    !    authors of xoshiro256** and then selects stream rng_stream.
+    !
+    ! ARGUMENTS
+    !
+    !    * ``seed`` integer seed
+    !******
+    integer(kind=iint), intent(in) :: seed
+
+    integer(kind=ilong) :: x, z
+    integer(kind=iint) :: i
+
+    x = int(seed, ilong)
+    do i = 1, 4
+        x = add64(x, golden_gamma)
+        z = x
+        z = mul64(ieor(z, ishft(z, -30)), mix_1)
+        z = mul64(ieor(z, ishft(z, -27)), mix_2)
+        rng_state(i) = ieor(z, ishft(z, -31))
+    enddo
+
+    do i = 1, rng_stream
+        call rng_jump()
+    enddo
+
+end subroutine rng_seed
+
+
+subroutine rng_jump()
+    !****f* rng/rng_jump
+    ! FUNCTION
+    !    Advances the state by 2^128 numbers.
+    !
+    ! ARGUMENTS
+    !
+    !    ``none``
+    !******
+    integer(kind=ilong), dimension(4) :: jumped
+    integer(kind=ilong) :: dummy
+    integer(kind=iint) :: i, b
+
+    jumped = 0
+    do i = 1, 4
+        do b = 0, 63
+            if(btest(jump_poly(i), b))then
+                jumped = ieor(jumped, rng_state)
+            endif
+            dummy = next_number()
+        enddo
+    enddo
+    rng_state = jumped
+
+end subroutine rng_jump
+
+
+subroutine rng_uniform(ran)
+    !****f* rng/rng_uniform
+    ! FUNCTION
+    !    Drop-in replacement of random_number: returns a uniform random
+    !    number with 53 significant bits in (0, 1]. Excluding 0 keeps
+    !    log(ran) finite in update_clocks.
+    !
+    ! ARGUMENTS
+    !
+    !    * ``ran`` the random number
+    !******
+    real(kind=rdouble), intent(out) :: ran
+
+    ran = real(ishft(next_number(), -11) + 1_ilong, rdouble)*2.0_rdouble**(-53)
+
+end subroutine rng_uniform
+
+
+function next_number()
+    !****f* rng/next_number
+    ! FUNCTION
+    !    Returns the next 64 bit output of xoshiro256** and advances the
+    !    state.
+    !
+    ! ARGUMENTS
+    !
+    !    ``none``
+    !******
+    integer(kind=ilong) :: next_number
+    integer(kind=ilong) :: t
+
+    ! x*5 and x*9 as shifts and additions
+    next_number = ishftc(add64(ishft(rng_state(2), 2), rng_state(2)), 7)
+    next_number = add64(ishft(next_number, 3), next_number)
+    t = ishft(rng_state(2), 17)
+
+    rng_state(3) = ieor(rng_state(3), rng_state(1))
+    rng_state(4) = ieor(rng_state(4), rng_state(2))
+    rng_state(2) = ieor(rng_state(2), rng_state(3))
+    rng_state(1) = ieor(rng_state(1), rng_state(4))
+    rng_state(3) = ieor(rng_state(3), t)
+    rng_state(4) = ishftc(rng_state(4), 45)
+
+end function next_number
+
+
+pure function add64(a, b)
+    !****f* rng/add64
+    ! FUNCTION
+    !    Returns a + b modulo 2^64. The lower and upper 32 bits are added
+    !    separately, so no intermediate result overflows.
+    !
+    ! ARGUMENTS
+    !
+    !    * ``a``, ``b`` the summands
+    !******
+    integer(kind=ilong) :: add64
+    integer(kind=ilong), intent(in) :: a, b
+    integer(kind=ilong) :: low, high
+
+    low = ibits(a, 0, 32) + ibits(b, 0, 32)
+    high = ibits(a, 32, 32) + ibits(b, 32, 32) + ishft(low, -32)
+    add64 = ior(ishft(high, 32), ibits(low, 0, 32))
+
+end function add64
+
+
+pure function mul64(a, b)
+    !****f* rng/mul64
+    ! FUNCTION
+    !    Returns a * b modulo 2^64 by long multiplication of 16 bit
+    !    digits, whose products and column sums never overflow.
+    !
+    ! ARGUMENTS
+    !
+    !    * ``a``, ``b`` the factors
+    !******
+    integer(kind=ilong) :: mul64
+    integer(kind=ilong), intent(in) :: a, b
+    integer(kind=ilong) :: column
+    integer(kind=iint) :: i, k
+
+    mul64 = 0
+    column = 0
+    do k = 0, 3
+        do i = 0, k
+            column = column + ibits(a, 16*i, 16)*ibits(b, 16*(k - i), 16)
+        enddo
+        mul64 = ior(mul64, ishft(ibits(column, 0, 16), 16*k))
+        column = ishft(column, -16)
+    enddo
+
+end function mul64
+
+end module rng
@@ -39,6 +39,51 @@ from kmos.utils import evaluate_template
 from kmos import species as species_module
 
 
+class Struct:
+    """Simple attribute container standing in for the parsed
+    command line options of `kmos export`.
+    """
+
+    def __init__(self, **entries):
+        self.__dict__.update(entries)
+
+
+# Default values of all export options that change the generated code.
+# Options objects lacking one of these (e.g. when export_source is called
+# from a script) are completed with the defaults.
+EXPORT_DEFAULTS = {
+    "acf": False,
+    "sparse": False,
+    "rng": "intrinsic",
+    "openmp": False,
+    "sublattice": False,
+    "rate_tables": 0,
+    "inline": False,
+    "site_order": "row",
+    "compact_lookup": False,
+}
+
+
+def _complete_options(options=None, backend="local_smart"):
+    """Return options with all EXPORT_DEFAULTS filled in."""
+    if options is None:
+        options = Struct(backend=backend)
+    for key, value in EXPORT_DEFAULTS.items():
+        if not hasattr(options, key):
+            setattr(options, key, value)
+    return options
+
+
+def _site_offset_unpacked(coord):
+    """Turn a relative site in Fortran form, e.g. 'site + (/0, 1, 0, 0/)',
+    into the four arguments of lattice2nr.
+    """
+    if coord == "site":
+        return "site(1), site(2), site(3), site(4)"
+    offset = coord.split("(/")[1].split("/)")[0].split(", ")
+    return ", ".join("site(%s) + (%s)" % (i + 1, term) for i, term in enumerate(offset))
+
+
 def _casetree_dict(dictionary, indent="", out=None):
     """Recursively prints nested dictionaries."""
     # Fortran90 always expects the default branch
@@ -120,9 +165,13 @@ class ProcListWriter:
     to run a kMC model.
     """
 
-    def __init__(self, data, dir):
+    def __init__(self, data, dir, options=None):
         self.data = data
         self.dir = dir
+        self.options = _complete_options(options)
+        # relative sites -> local site index variables of the routine
+        # currently written with --inline
+        self._inline_sites = None
 
     def write_template(self, filename, target=None, options=None):
         if target is None:
@@ -204,6 +253,20 @@ class ProcListWriter:
             self.write_proclist_otf(data, out)
             self.write_proclist_end(out)
 
+        elif code_generator == "table":
+            lat_int_groups = self._get_lat_int_groups()
+            constants_out = open("%s/proclist_constants.f90" % self.dir, "w")
+            self.write_proclist_constants(
+                data,
+                constants_out,
+                code_generator=code_generator,
+                module_name="proclist_constants",
+            )
+            self.write_proclist_constants_table(data, lat_int_groups, constants_out)
+            constants_out.close()
+            self.write_proclist_table(data, lat_int_groups, out)
+            self.write_proclist_end(out)
+
         else:
             raise Exception("Don't know this code generator '%s'" % code_generator)
 
@@ -218,7 +281,9 @@ class ProcListWriter:
         """
         from kmos.io.acf import get_acf_writer
 
-        writer = get_acf_writer(self.data, self.dir, code_generator)
+        writer = get_acf_writer(
+            self.data, self.dir, code_generator, options=self.options
+        )
         writer.write_proclist_acf()
 
     def write_proclist_constants(
@@ -1641,18 +1706,66 @@ class ProcListWriter:
         # lateral interaction groups
         lat_int_groups = self._get_lat_int_groups()
 
+        self._write_proclist_lat_int_header(
+            data,
+            out,
+            [
+                "use run_proc_%04d; use nli_%04d" % (i, i)
+                for i in range(len(lat_int_groups))
+            ],
+        )
+
+        out.write("\ncontains\n\n")
+
+        # write out the process list
+        self.write_proclist_lat_int_run_proc_nr(data, lat_int_groups, progress_bar, out)
+        self.write_proclist_lat_int_touchup(lat_int_groups, out)
+        self.write_proclist_generic_subroutines(data, out, code_generator="lat_int")
+        self.write_proclist_lat_int_run_proc(data, lat_int_groups, progress_bar)
+        self.write_proclist_lat_int_nli_casetree(data, lat_int_groups, progress_bar)
+
+        # and we are done!
+        if os.name == "posix":
+            progress_bar.render(100, "finished proclist.f90")
+
+    def _write_proclist_lat_int_header(self, data, out, uses, code_generator="lat_int"):
+        """Write the head of the proclist module shared by the lat_int and
+        table backends: the imports from base and lattice, the lines in
+        `uses` and the module variables up to 'contains'.
+        """
+        out.write("module proclist\nuse kind_values\n")
+        if self.options.rng == "xoshiro" and self.options.sublattice:
+            out.write("use rng, only: rng_seed, rng_state, rng_uniform\n")
+        elif self.options.rng == "xoshiro":
+            out.write("use rng, only: rng_seed, rng_uniform\n")
+        out.write("use base, only: &\n")
+        if self.options.sublattice:
+            out.write(
+                "    allocate_domain, &\n"
+                "    clear_avail_sites, &\n"
+                "    collect_domains, &\n"
+                "    deallocate_domain, &\n"
+                "    get_accum_rate, &\n"
+                "    set_kmc_time, &\n"
+            )
         out.write(
             (
-                "module proclist\n"
-                "use kind_values\n"
-                "use base, only: &\n"
+                "    get_rates, &\n"
                 "    update_accum_rate, &\n"
                 "    update_integ_rate, &\n"
                 "    determine_procsite, &\n"
                 "    update_clocks, &\n"
-                "    avail_sites, &\n"
+                "    recorder_active, &\n"
+                "    recorder_due, &\n"
+                "    record_samples, &\n"
+                "    get_kmc_time, &\n"
+                "    get_procstats, &\n"
+                "    rewind_clocks, &\n"
+                "    species_count, &\n"
             )
         )
+        if not self.options.sparse:
+            out.write("    avail_sites, &\n")
         if len(data.layer_list) == 1:  # multi-lattice mode
             out.write("    null_species, &\n")
         else:
@@ -1675,13 +1788,23 @@ class ProcListWriter:
             "    replace_species, &\n"
             "    del_proc, &\n"
             "    reset_site, &\n"
-            "    system_size, &\n"
-            "    spuck, &\n"
+            "    enter_instance, &\n"
+            "    leave_instance, &\n"
+            "    current_instance, &\n"
         )
+        if self.options.sublattice:
+            out.write(
+                (
+                    "    domain_active, &\n"
+                    "    domain_lower, &\n"
+                    "    domain_upper, &\n"
+                )
+            )
+        out.write("    system_size, &\n    spuck, &\n")
 
         out.write("    get_species\n")
-        for i in range(len(lat_int_groups)):
-            out.write("use run_proc_%04d; use nli_%04d\n" % (i, i))
+        for line in uses:
+            out.write(line + "\n")
 
         out.write("\nimplicit none\n")
 
@@ -1707,27 +1830,10 @@ class ProcListWriter:
             % (len(data.process_list))
         )
 
-        code_generator = "lat_int"
-        if code_generator == "lat_int":
-            out.write(
-                '\ncharacter(len=%s), parameter, public :: backend = "%s"\n'
-                % (len(code_generator), code_generator)
-            )
-        elif code_generator == "local_smart":
-            pass  # change nothing here, to not alter old code
-
-        out.write("\ncontains\n\n")
-
-        # write out the process list
-        self.write_proclist_lat_int_run_proc_nr(data, lat_int_groups, progress_bar, out)
-        self.write_proclist_lat_int_touchup(lat_int_groups, out)
-        self.write_proclist_generic_subroutines(data, out, code_generator="lat_int")
-        self.write_proclist_lat_int_run_proc(data, lat_int_groups, progress_bar)
-        self.write_proclist_lat_int_nli_casetree(data, lat_int_groups, progress_bar)
-
-        # and we are done!
-        if os.name == "posix":
-            progress_bar.render(100, "finished proclist.f90")
+        out.write(
+            '\ncharacter(len=%s), parameter, public :: backend = "%s"\n'
+            % (len(code_generator), code_generator)
+        )
 
     def write_proclist_lat_int_run_proc_nr(
         self, data, lat_int_groups, progress_bar, out
@@ -1779,9 +1885,12 @@ class ProcListWriter:
         out.write("    integer(kind=iint) :: proc_nr\n\n")
         out.write("    site = cell + (/0, 0, 0, 1/)\n")
         out.write("    do proc_nr = 1, nr_of_proc\n")
-        out.write(
-            "        if(avail_sites(proc_nr, lattice2nr(site(1), site(2), site(3), site(4)) , 2).ne.0)then\n"
-        )
+        if self.options.sparse:
+            out.write("        if(can_do(proc_nr, site))then\n")
+        else:
+            out.write(
+                "        if(avail_sites(proc_nr, lattice2nr(site(1), site(2), site(3), site(4)) , 2).ne.0)then\n"
+            )
         out.write("            call del_proc(proc_nr, site)\n")
         out.write("        endif\n")
         out.write("    end do\n\n")
@@ -1790,6 +1899,43 @@ class ProcListWriter:
             out.write("    call add_proc(nli_%s(cell), site)\n" % (lat_int_group))
         out.write("end subroutine touchup_cell\n\n")
 
+    def _get_lat_int_modified_procs(self, process0, lat_int_groups):
+        """Return the sorted (process, offset) pairs of the lateral
+        interaction groups, whose conditions or bystanders are changed by
+        the actions of process0. The processes have to be checked again
+        in the cells shifted by offset after process0 was executed.
+        """
+        modified_procs = set()
+        # collect processes that could be modified by current process:
+        # if current process modifies a site, that "another process" depends on,
+        # add "another process" to the processes to be modified/updated.
+        for action in process0.action_list:
+            self._db_print("    ACTION: %s" % action)
+            for _, other_processes in lat_int_groups.items():
+                other_process = other_processes[0]
+                self._db_print(
+                    "      OTHER PROCESS %s" % (pformat(other_process, indent=12))
+                )
+                other_conditions = (
+                    other_process.condition_list + other_process.bystanders
+                )
+                self._db_print(
+                    "            OTHER CONDITIONS\n%s"
+                    % pformat(other_conditions, indent=12)
+                )
+
+                for condition in other_conditions:
+                    if action.coord.eq_mod_offset(condition.coord):
+                        modified_procs.add(
+                            (
+                                other_process,
+                                tuple(action.coord.offset - condition.coord.offset),
+                            )
+                        )
+
+        # sort to one well-defined orded
+        return sorted(modified_procs, key=lambda x: "%s %s" % (x[0].name, str(x[1])))
+
     def write_proclist_lat_int_run_proc(self, data, lat_int_groups, progress_bar):
         """
         subroutine run_proc_<processname>(cell)
@@ -1805,7 +1951,6 @@ class ProcListWriter:
             self._db_print("PROCESS: %s" % lat_int_group)
             # initialize needed data structure
             process0 = processes[0]
-            modified_procs = set()
 
             out.write("module run_proc_%04d\n" % lat_int_loop)
             out.write("use kind_values\n")
@@ -1819,37 +1964,7 @@ class ProcListWriter:
             out.write("    integer(kind=iint), dimension(4), intent(in) :: cell\n")
             out.write("\n    ! disable processes that have to be disabled\n")
 
-            # collect processes that could be modified by current process:
-            # if current process modifies a site, that "another process" depends on,
-            # add "another process" to the processes to be modified/updated.
-            for action in process0.action_list:
-                self._db_print("    ACTION: %s" % action)
-                for _, other_processes in lat_int_groups.items():
-                    other_process = other_processes[0]
-                    self._db_print(
-                        "      OTHER PROCESS %s" % (pformat(other_process, indent=12))
-                    )
-                    other_conditions = (
-                        other_process.condition_list + other_process.bystanders
-                    )
-                    self._db_print(
-                        "            OTHER CONDITIONS\n%s"
-                        % pformat(other_conditions, indent=12)
-                    )
-
-                    for condition in other_conditions:
-                        if action.coord.eq_mod_offset(condition.coord):
-                            modified_procs.add(
-                                (
-                                    other_process,
-                                    tuple(action.coord.offset - condition.coord.offset),
-                                )
-                            )
-
-            # sort to one well-defined orded
-            modified_procs = sorted(
-                modified_procs, key=lambda x: "%s %s" % (x[0].name, str(x[1]))
-            )
+            modified_procs = self._get_lat_int_modified_procs(process0, lat_int_groups)
 
             # write out necessary DELETION statements
             for i, (process, offset) in enumerate(modified_procs):
@@ -2216,6 +2331,413 @@ class ProcListWriter:
                     "nli_%s" % lat_int_group,
                 )
 
+    def _get_proclist_tables(self, lat_int_groups):
+        """Encode the lateral interaction groups as the integer tables of
+        the table backend, see write_proclist_constants_table. Returns a
+        dictionary of table name to list of values, 2-dimensional tables
+        flattened in Fortran order.
+        """
+        data = self.data
+        species_nrs = dict(
+            (species.name, i)
+            for i, species in enumerate(sorted(data.species_list, key=lambda x: x.name))
+        )
+        if len(data.layer_list) > 1:
+            nr_of_species = len(data.species_list) + 1
+            species_nrs["null_species"] = len(data.species_list)
+        else:
+            nr_of_species = len(data.species_list)
+            species_nrs["null_species"] = -1
+        site_nrs = dict(
+            ("%s_%s" % (layer, site), i + 1)
+            for i, (site, layer, _) in enumerate(self._get_site_params())
+        )
+        process_nrs = dict(
+            (process.name, i + 1) for i, process in enumerate(data.process_list)
+        )
+        group_nrs = dict((name, i + 1) for i, name in enumerate(lat_int_groups))
+
+        def site(coord):
+            if coord.layer:
+                site_nr = site_nrs["%s_%s" % (coord.layer, coord.name)]
+            else:
+                site_nr = site_nrs[coord.name]
+            return [int(x) for x in coord.offset] + [site_nr]
+
+        def species_set(species):
+            return frozenset(species_nrs[x.strip()] for x in species.split(" or "))
+
+        tables = dict(
+            (name, [])
+            for name in [
+                "nli_root",
+                "nli_site",
+                "nli_next",
+                "update_start",
+                "update_group",
+                "update_cell",
+                "action_start",
+                "action_site",
+                "action_old",
+                "action_new",
+            ]
+        )
+        tables["proc_group"] = [0] * len(data.process_list)
+
+        def encode(node):
+            # > 0: number of the next node, < 0: the process found, 0: none
+            if node is None:
+                return 0
+            elif not isinstance(node, dict):
+                return -process_nrs[node]
+            tables["nli_site"].extend(site(node["coord"]))
+            tables["nli_next"].extend([0] * nr_of_species)
+            node_nr = len(tables["nli_site"]) // 4
+            first = (node_nr - 1) * nr_of_species
+            for species, branch in node["branches"]:
+                child = encode(branch["node"])
+                for species_nr in species:
+                    if species_nr >= 0:
+                        tables["nli_next"][first + species_nr] = child
+            return node_nr
+
+        for group, processes in lat_int_groups.items():
+            for process in processes:
+                tables["proc_group"][process_nrs[process.name] - 1] = group_nrs[group]
+
+            # the decision tree of nli_<group> of the lat_int backend:
+            # one site per node and a branch per species or set of species
+            tree = {"node": None}
+            for process in processes:
+                conditions = [
+                    y
+                    for y in sorted(
+                        process.condition_list + process.bystanders,
+                        key=functools.cmp_to_key(
+                            lambda a, b: cmp_coords(a.coord, b.coord)
+                        ),
+                    )
+                    if not y.implicit
+                ]
+                branch = tree
+                for condition in conditions:
+                    if not isinstance(branch["node"], dict):
+                        branch["node"] = {"coord": condition.coord, "branches": []}
+                    node = branch["node"]
+                    if node["coord"] != condition.coord:
+                        # cannot be reached in nli_<group> either
+                        break
+                    species = species_set(condition.species)
+                    for other_species, other_branch in node["branches"]:
+                        if other_species == species:
+                            branch = other_branch
+                            break
+                    else:
+                        branch = {"node": None}
+                        node["branches"].append((species, branch))
+                else:
+                    branch["node"] = process.name
+            tables["nli_root"].append(encode(tree["node"]))
+
+            # the processes updated by run_proc_<group>
+            tables["update_start"].append(len(tables["update_group"]) + 1)
+            for other_process, offset in self._get_lat_int_modified_procs(
+                processes[0], lat_int_groups
+            ):
+                tables["update_group"].append(group_nrs[other_process.name])
+                tables["update_cell"].extend(int(x) for x in offset)
+
+            # and its lattice updates, see write_proclist_lat_int_run_proc
+            tables["action_start"].append(len(tables["action_old"]) + 1)
+            process0 = processes[0]
+            changes = []
+            matched_actions = []
+            for condition in process0.condition_list:
+                action = [
+                    action
+                    for action in process0.action_list
+                    if condition.coord == action.coord
+                ][0]
+                matched_actions.append(action)
+                if action.species.startswith("$"):
+                    changes.append((action.coord, condition.species, "null_species"))
+                elif action.species.startswith("^"):
+                    changes.append((action.coord, "null_species", action.species[1:]))
+                else:
+                    changes.append((action.coord, condition.species, action.species))
+            for action in process0.action_list:
+                if action in matched_actions:
+                    continue
+                if action.species.startswith("$"):
+                    changes.append((action.coord, action.species[1:], "null_species"))
+                elif action.species.startswith("^"):
+                    changes.append((action.coord, "null_species", action.species[1:]))
+                else:
+                    raise UserWarning(
+                        "Unmatched action that is not a multi-lattice action: %s"
+                        % (action)
+                    )
+            for coord, old_species, new_species in changes:
+                tables["action_site"].extend(site(coord))
+                if len(old_species.split(" or ")) > 1:
+                    # read from the lattice, see run_proc_group
+                    tables["action_old"].append(nr_of_species)
+                else:
+                    tables["action_old"].append(species_nrs[old_species.strip()])
+                tables["action_new"].append(species_nrs[new_species.strip()])
+
+        tables["update_start"].append(len(tables["update_group"]) + 1)
+        tables["action_start"].append(len(tables["action_old"]) + 1)
+
+        return tables
+
+    def write_proclist_constants_table(self, data, lat_int_groups, out):
+        """Write the tables of the table backend into the
+        proclist_constants module and close it. Instead of one
+        run_proc_<group> and nli_<group> routine per lateral interaction
+        group as in the lat_int backend, each group is a few rows of
+        integer tables, which proclist/run_proc_group and proclist/nli
+        interpret. So the compile time hardly grows with the number of
+        processes.
+        """
+        tables = self._get_proclist_tables(lat_int_groups)
+        if len(data.layer_list) > 1:
+            nr_of_species = len(data.species_list) + 1
+        else:
+            nr_of_species = len(data.species_list)
+
+        out.write(
+            "\n\ninteger(kind=iint), parameter, public :: nr_of_lat_int_groups = %s\n"
+            % len(lat_int_groups)
+        )
+        out.write(
+            "!****v* proclist_constants/nr_of_lat_int_groups\n"
+            "! FUNCTION\n"
+            "!   Number of groups of processes that only differ by lateral\n"
+            "!   interaction, see proc_group.\n"
+            "!******\n"
+        )
+
+        documentation = {
+            "proc_group": (
+                "The lateral interaction group of each process. The processes\n"
+                "of a group have the same conditions and actions and differ\n"
+                "only in the species on their bystander sites."
+            ),
+            "nli_root": ("The first node of the decision tree of each group, see nli."),
+            "nli_site": (
+                "The site of each node of the decision trees, relative to the\n"
+                "cell of the group."
+            ),
+            "nli_next": (
+                "For each species on the site of a node the next node, if > 0,\n"
+                "the process of the group that matches, if < 0, or 0 if none\n"
+                "does."
+            ),
+            "update_start": (
+                "Where the rows of update_group and update_cell of each group\n"
+                "start, the last entry is one past the end."
+            ),
+            "update_group": (
+                "The groups whose processes have to be checked again after a\n"
+                "process of the group was executed, see proclist/run_proc_group."
+            ),
+            "update_cell": "The cell of each update_group relative to the cell executed.",
+            "action_start": (
+                "Where the rows of action_site, action_old and action_new of\n"
+                "each group start, the last entry is one past the end."
+            ),
+            "action_site": "The site changed by each action.",
+            "action_old": (
+                "The species each action removes, nr_of_species if it has to\n"
+                "be read from the lattice."
+            ),
+            "action_new": "The species each action puts.",
+        }
+        shapes = {
+            "nli_site": ("4", 4),
+            "nli_next": ("0:%s" % (nr_of_species - 1), nr_of_species),
+            "update_cell": ("3", 3),
+            "action_site": ("4", 4),
+        }
+        for name in [
+            "proc_group",
+            "nli_root",
+            "nli_site",
+            "nli_next",
+            "update_start",
+            "update_group",
+            "update_cell",
+            "action_start",
+            "action_site",
+            "action_old",
+            "action_new",
+        ]:
+            values = tables[name]
+            rows, row_length = shapes.get(name, (None, 1))
+            if not values:
+                # Fortran has no empty array constructors of this form
+                values = [0] * row_length
+            columns = len(values) // row_length
+            out.write("\n")
+            if rows is None:
+                out.write(
+                    "integer(kind=iint), dimension(%s), parameter, public :: "
+                    "%s = (/ &\n" % (columns, name)
+                )
+                out.write(_chop_line(", ".join(map(str, values))))
+                out.write(" /)\n")
+            else:
+                out.write(
+                    "integer(kind=iint), dimension(%s, %s), parameter, public :: "
+                    "%s = reshape((/ &\n" % (rows, columns, name)
+                )
+                out.write(
+                    ", &\n".join(
+                        "    " + ", ".join(map(str, values[i : i + row_length]))
+                        for i in range(0, len(values), row_length)
+                    )
+                )
+                out.write(" /), (/%s, %s/))\n" % (row_length, columns))
+            out.write("!****v* proclist_constants/%s\n! FUNCTION\n" % name)
+            for line in documentation[name].split("\n"):
+                out.write("!   %s\n" % line)
+            out.write("!******\n")
+        out.write("\n\nend module\n")
+
+    def write_proclist_table(self, data, lat_int_groups, out):
+        """Write the proclist module of the table backend: a generic
+        interpreter of the tables written by write_proclist_constants_table
+        in place of the generated run_proc_* and nli_* modules of the
+        lat_int backend. Both backends give the same trajectories.
+        """
+        self._write_proclist_lat_int_header(
+            data, out, ["use proclist_constants"], code_generator="table"
+        )
+        out.write("\ncontains\n\n")
+
+        out.write(
+            "subroutine run_proc_nr(proc, nr_cell)\n"
+            "    integer(kind=iint), intent(in) :: nr_cell\n"
+            "    integer(kind=iint), intent(in) :: proc\n\n"
+            "    integer(kind=iint), dimension(4) :: cell\n\n"
+            "    cell = nr2lattice(nr_cell, :) + (/0, 0, 0, -1/)\n"
+            "    call increment_procstat(proc)\n\n"
+        )
+        if data.meta.debug > 1:
+            out.write(
+                '    print *, "PROCLIST/RUN_PROC_NR"\n'
+                '    print *, "  PROCLIST/RUN_PROC_NR/PROC", proc\n'
+                '    print *, "  PROCLIST/RUN_PROC_NR/NR_CELL", nr_cell\n'
+                '    print *, "  PROCLIST/RUN_PROC_NR/CELL", cell\n'
+            )
+        out.write(
+            "    call run_proc_group(proc_group(proc), cell)\n\n"
+            "end subroutine run_proc_nr\n\n"
+        )
+
+        out.write(
+            "subroutine run_proc_group(group, cell)\n"
+            "!****f* proclist/run_proc_group\n"
+            "! FUNCTION\n"
+            "!    Executes a process of the lateral interaction group\n"
+            "!    ``group`` in ``cell``: removes the processes of the groups in\n"
+            "!    update_group, applies the actions of the group to the lattice\n"
+            "!    and adds the processes that match now.\n"
+            "!\n"
+            "! ARGUMENTS\n"
+            "!\n"
+            "!    * ``group`` the lateral interaction group, see proc_group\n"
+            "!    * ``cell`` the cell of the process\n"
+            "!******\n"
+            "    integer(kind=iint), intent(in) :: group\n"
+            "    integer(kind=iint), dimension(4), intent(in) :: cell\n\n"
+            "    integer(kind=iint), dimension(4) :: other_cell, site\n"
+            "    integer(kind=iint) :: i, old_species\n\n"
+            "    ! disable processes that have to be disabled\n"
+            "    do i = update_start(group), update_start(group + 1) - 1\n"
+            "        other_cell = cell + (/update_cell(1, i), update_cell(2, i), "
+            "update_cell(3, i), 0/)\n"
+            "        call del_proc(nli(update_group(i), other_cell), "
+            "other_cell + (/0, 0, 0, 1/))\n"
+            "    enddo\n\n"
+            "    ! update lattice\n"
+            "    do i = action_start(group), action_start(group + 1) - 1\n"
+            "        site = cell + action_site(:, i)\n"
+            "        old_species = action_old(i)\n"
+            "        if(old_species.eq.nr_of_species)then\n"
+            "            old_species = get_species(site)\n"
+            "        endif\n"
+            "        call replace_species(site, old_species, action_new(i))\n"
+            "    enddo\n\n"
+            "    ! enable processes that have to be enabled\n"
+            "    do i = update_start(group), update_start(group + 1) - 1\n"
+            "        other_cell = cell + (/update_cell(1, i), update_cell(2, i), "
+            "update_cell(3, i), 0/)\n"
+            "        call add_proc(nli(update_group(i), other_cell), "
+            "other_cell + (/0, 0, 0, 1/))\n"
+            "    enddo\n\n"
+            "end subroutine run_proc_group\n\n"
+        )
+
+        if data.meta.debug > 0:
+            out.write("function nli(group, cell)\n")
+        else:
+            out.write("pure function nli(group, cell)\n")
+        out.write(
+            "!****f* proclist/nli\n"
+            "! FUNCTION\n"
+            "!    Returns the process of the lateral interaction group\n"
+            "!    ``group`` that matches the species around ``cell`` or 0 if\n"
+            "!    none does, by walking down the decision tree of the group.\n"
+            "!\n"
+            "! ARGUMENTS\n"
+            "!\n"
+            "!    * ``group`` the lateral interaction group, see proc_group\n"
+            "!    * ``cell`` the cell of the process\n"
+            "!******\n"
+            "    integer(kind=iint), intent(in) :: group\n"
+            "    integer(kind=iint), dimension(4), intent(in) :: cell\n"
+            "    integer(kind=iint) :: nli\n\n"
+            "    integer(kind=iint) :: node, species\n\n"
+            "    node = nli_root(group)\n"
+            "    do while(node.gt.0)\n"
+            "        species = get_species(cell + nli_site(:, node))\n"
+            "        if(species.lt.0.or.species.ge.nr_of_species)then\n"
+            "            node = 0\n"
+            "        else\n"
+            "            node = nli_next(species, node)\n"
+            "        endif\n"
+            "    enddo\n"
+            "    nli = -node\n\n"
+            "end function nli\n\n"
+        )
+
+        out.write(
+            "subroutine touchup_cell(cell)\n"
+            "    integer(kind=iint), intent(in), dimension(4) :: cell\n\n"
+            "    integer(kind=iint), dimension(4) :: site\n\n"
+            "    integer(kind=iint) :: proc_nr, group\n\n"
+            "    site = cell + (/0, 0, 0, 1/)\n"
+            "    do proc_nr = 1, nr_of_proc\n"
+        )
+        if self.options.sparse:
+            out.write("        if(can_do(proc_nr, site))then\n")
+        else:
+            out.write(
+                "        if(avail_sites(proc_nr, lattice2nr(site(1), site(2), site(3), site(4)) , 2).ne.0)then\n"
+            )
+        out.write(
+            "            call del_proc(proc_nr, site)\n"
+            "        endif\n"
+            "    end do\n\n"
+            "    do group = 1, nr_of_lat_int_groups\n"
+            "        call add_proc(nli(group, cell), site)\n"
+            "    end do\n"
+            "end subroutine touchup_cell\n\n"
+        )
+        self.write_proclist_generic_subroutines(data, out, code_generator="table")
+
     def write_proclist_put_take(self, data, out):
         """
         HERE comes the bulk part of this code generator:
@@ -2255,45 +2777,48 @@ class ProcListWriter:
                         out.write(
                             "    integer(kind=iint), dimension(4), intent(in) :: site\n\n"
                         )
+                        body = self._start_inline_routine(out)
                         if data.meta.debug > 0:
-                            out.write(
+                            body.write(
                                 'print *,"PROCLIST/%s/SITE",site\n'
                                 % (routine_name.upper(),)
                             )
-                        out.write("    ! update lattice\n")
+                        body.write("    ! update lattice\n")
                         if op == "put":
                             if data.meta.debug > 0:
-                                out.write(
+                                body.write(
                                     'print *,"    LATTICE/REPLACE_SPECIES/SITE",site\n'
                                 )
-                                out.write(
+                                body.write(
                                     'print *,"    LATTICE/REPLACE_SPECIES/OLD_SPECIES","%s"\n'
                                     % data.species_list.default_species
                                 )
-                                out.write(
+                                body.write(
                                     'print *,"    LATTICE/REPLACE_SPECIES/NEW_SPECIES","%s"\n'
                                     % species.name
                                 )
-                            out.write(
-                                "    call replace_species(site, %s, %s)\n\n"
-                                % (data.species_list.default_species, species.name)
+                            body.write(
+                                self._replace_species_call(
+                                    data.species_list.default_species, species.name
+                                )
                             )
                         elif op == "take":
                             if data.meta.debug > 0:
-                                out.write(
+                                body.write(
                                     'print *,"    LATTICE/REPLACE_SPECIES/SITE",site\n'
                                 )
-                                out.write(
+                                body.write(
                                     'print *,"    LATTICE/REPLACE_SPECIES/OLD_SPECIES","%s"\n'
                                     % species.name
                                 )
-                                out.write(
+                                body.write(
                                     'print *,"    LATTICE/REPLACE_SPECIES/NEW_SPECIES","%s"\n'
                                     % data.species_list.default_species
                                 )
-                            out.write(
-                                "    call replace_species(site, %s, %s)\n\n"
-                                % (species.name, data.species_list.default_species)
+                            body.write(
+                                self._replace_species_call(
+                                    species.name, data.species_list.default_species
+                                )
                             )
                         for process in data.process_list:
                             for condition in process.condition_list:
@@ -2367,25 +2892,44 @@ class ProcListWriter:
                         # updating disabled procs is easy to do efficiently
                         # because we don't ask any questions twice, so we do it immediately
                         if disabled_procs:
-                            out.write("    ! disable affected processes\n")
+                            body.write("    ! disable affected processes\n")
                             for process, coord in disabled_procs:
                                 if data.meta.debug > 1:
-                                    out.write(
+                                    body.write(
                                         'print *,"    LATTICE/CAN_DO/PROC",%s\n'
                                         % process.name
                                     )
-                                    out.write(
+                                    body.write(
                                         'print *,"    LATTICE/CAN_DO/VSITE","site%s"\n'
                                         % (coord).radd_ff()
                                     )
-                                    out.write(
+                                    body.write(
                                         'print *,"    LATTICE/CAN_DO/SITE",site%s\n'
                                         % (coord).radd_ff()
                                     )
                                 # out.write(('    if(can_do(%(proc)s, site%(coord)s))then\n'
-                                out.write(
+                                if self.options.inline:
+                                    site_coord = "site%s" % (coord).radd_ff()
+                                    body.write(
+                                        "    if(%s)then\n%s    endif\n\n"
+                                        % (
+                                            self._can_do_expr(process.name, site_coord),
+                                            self._proc_call(
+                                                "del_proc", process.name, site_coord, 8
+                                            ),
+                                        )
+                                    )
+                                    continue
+                                if self.options.sparse:
+                                    # there is no avail_sites array to peek into
+                                    can_do = (
+                                        "    if(can_do(%(proc)s, site%(coord)s))then\n"
+                                    )
+                                else:
+                                    can_do = "    if(avail_sites(%(proc)s, lattice2nr(%(unpacked)s), 2).ne.0)then\n"
+                                body.write(
                                     (
-                                        "    if(avail_sites(%(proc)s, lattice2nr(%(unpacked)s), 2).ne.0)then\n"
+                                        can_do
                                         + "        call del_proc(%(proc)s, site%(coord)s)\n"
                                         + "    endif\n\n"
                                     )
@@ -2401,11 +2945,12 @@ class ProcListWriter:
                         # so we collect  all questions first and build a tree, where the most
                         # frequent questions are closer to the top
                         if enabled_procs:
-                            out.write("    ! enable affected processes\n")
+                            body.write("    ! enable affected processes\n")
 
                             self._write_optimal_iftree(
-                                items=enabled_procs, indent=4, out=out
+                                items=enabled_procs, indent=4, out=body
                             )
+                        self._end_inline_routine(out, body)
                         out.write("\nend subroutine %s\n\n" % routine_name)
 
     def write_proclist_touchup(self, data, out):
@@ -2416,11 +2961,14 @@ class ProcListWriter:
                 out.write(
                     "    integer(kind=iint), dimension(4), intent(in) :: site\n\n"
                 )
+                body = self._start_inline_routine(out)
                 # First remove all process from this site
                 for process in data.process_list:
-                    out.write("    if (can_do(%s, site)) then\n" % process.name)
-                    out.write("        call del_proc(%s, site)\n" % process.name)
-                    out.write("    endif\n")
+                    body.write(
+                        "    if (%s) then\n" % self._can_do_expr(process.name, "site")
+                    )
+                    body.write(self._proc_call("del_proc", process.name, "site", 8))
+                    body.write("    endif\n")
                 # Then add all available one
                 items = []
                 for process in data.process_list:
@@ -2439,7 +2987,8 @@ class ProcListWriter:
                         ]
                         items.append((condition_list, (process.name, "site", True)))
 
-                self._write_optimal_iftree(items=items, indent=4, out=out)
+                self._write_optimal_iftree(items=items, indent=4, out=body)
+                self._end_inline_routine(out, body)
                 out.write("end subroutine %s\n\n" % routine_name)
 
     def write_proclist_multilattice(self, data, out):
@@ -2456,39 +3005,40 @@ class ProcListWriter:
                         out.write(
                             "    integer(kind=iint), dimension(4), intent(in) :: site\n\n"
                         )
-                        out.write("    ! update lattice\n")
+                        body = self._start_inline_routine(out)
+                        body.write("    ! update lattice\n")
                         if data.meta.debug > 0:
-                            out.write(
+                            body.write(
                                 'print *,"PROCLIST/%s/SITE",site\n'
                                 % (routine_name.upper(),)
                             )
                         if special_op == "create":
                             if data.meta.debug > 0:
-                                out.write(
+                                body.write(
                                     'print *,"    LATTICE/REPLACE_SPECIES/SITE",site\n'
                                 )
-                                out.write(
+                                body.write(
                                     'print *,"    LATTICE/REPLACE_SPECIES/OLD_SPECIES","null_species"\n'
                                 )
-                                out.write(
+                                body.write(
                                     'print *,"    LATTICE/REPLACE_SPECIES/NEW_SPECIES",species\n'
                                 )
-                            out.write(
-                                "    call replace_species(site, null_species, species)\n\n"
+                            body.write(
+                                self._replace_species_call("null_species", "species")
                             )
                         elif special_op == "annihilate":
                             if data.meta.debug > 0:
-                                out.write(
+                                body.write(
                                     'print *,"    LATTICE/REPLACE_SPECIES/SITE",site\n'
                                 )
-                                out.write(
+                                body.write(
                                     'print *,"    LATTICE/REPLACE_SPECIES/OLD_SPECIES",species\n'
                                 )
-                                out.write(
+                                body.write(
                                     'print *,"    LATTICE/REPLACE_SPECIES/NEW_SPECIES","null_species"\n'
                                 )
-                            out.write(
-                                "    call replace_species(site, species, null_species)\n\n"
+                            body.write(
+                                self._replace_species_call("species", "null_species")
                             )
 
                         for process in data.process_list:
@@ -2529,34 +3079,37 @@ class ProcListWriter:
                                     coord = process.executing_coord() - condition.coord
                                     disabled_procs.append((process, coord))
                         if disabled_procs:
-                            out.write("    ! disable affected processes\n")
+                            body.write("    ! disable affected processes\n")
                             for process, coord in disabled_procs:
                                 if data.meta.debug > 1:
-                                    out.write(
+                                    body.write(
                                         'print *,"    LATTICE/CAN_DO/PROC",%s\n'
                                         % process.name
                                     )
-                                    out.write(
+                                    body.write(
                                         'print *,"    LATTICE/CAN_DO/VSITE","site%s"\n'
                                         % (coord).radd_ff()
                                     )
-                                    out.write(
+                                    body.write(
                                         'print *,"    LATTICE/CAN_DO/SITE",site%s\n'
                                         % (coord).radd_ff()
                                     )
-                                out.write(
-                                    (
-                                        "    if(can_do(%(proc)s, site%(coord)s))then\n"
-                                        + "        call del_proc(%(proc)s, site%(coord)s)\n"
-                                        + "    endif\n\n"
+                                site_coord = "site%s" % (coord).radd_ff()
+                                body.write(
+                                    "    if(%s)then\n%s    endif\n\n"
+                                    % (
+                                        self._can_do_expr(process.name, site_coord),
+                                        self._proc_call(
+                                            "del_proc", process.name, site_coord, 8
+                                        ),
                                     )
-                                    % {"coord": (coord).radd_ff(), "proc": process.name}
                                 )
                         if enabled_procs:
-                            out.write("    ! enable affected processes\n")
+                            body.write("    ! enable affected processes\n")
                             self._write_optimal_iftree(
-                                items=enabled_procs, indent=4, out=out
+                                items=enabled_procs, indent=4, out=body
                             )
+                        self._end_inline_routine(out, body)
                         out.write("\nend subroutine %s\n\n" % routine_name)
 
     def write_proclist_end(self, out):
@@ -2565,6 +3118,77 @@ class ProcListWriter:
     def write_proclist_acf_end(self, out):
         out.write("end module proclist_acf\n")
 
+    def _start_inline_routine(self, out):
+        """Return the stream the body of a put/take/touchup routine is
+        written to. With --inline the body is buffered, so that the
+        lattice2nr lookups it needs can be declared and computed once
+        at the top of the routine by _end_inline_routine.
+        """
+        if not self.options.inline:
+            return out
+        from io import StringIO
+
+        self._inline_sites = {}
+        return StringIO()
+
+    def _end_inline_routine(self, out, body):
+        if self._inline_sites is None:
+            return
+        sites = list(self._inline_sites.items())
+        for _, nr in sites:
+            out.write("    integer(kind=iint) :: %s\n" % nr)
+        out.write("\n")
+        for coord, nr in sites:
+            out.write("    %s = lattice2nr(%s)\n" % (nr, _site_offset_unpacked(coord)))
+        out.write("\n")
+        out.write(body.getvalue())
+        self._inline_sites = None
+
+    def _inline_site(self, coord):
+        """Name of the local variable holding the site index of coord,
+        e.g. 'site + (/0, 1, 0, 0/)', in the routine being written.
+        """
+        if coord not in self._inline_sites:
+            self._inline_sites[coord] = "nr_site_%s" % (len(self._inline_sites) + 1)
+        return self._inline_sites[coord]
+
+    def _replace_species_call(self, old_species, new_species):
+        if self._inline_sites is not None:
+            return "    call base_replace_species(%s, %s, %s)\n\n" % (
+                self._inline_site("site"),
+                old_species,
+                new_species,
+            )
+        return "    call replace_species(site, %s, %s)\n\n" % (
+            old_species,
+            new_species,
+        )
+
+    def _proc_call(self, routine, proc, coord, indent):
+        """routine is either add_proc or del_proc"""
+        if self._inline_sites is not None:
+            return "%scall base_%s(%s, %s)\n" % (
+                " " * indent,
+                routine,
+                proc,
+                self._inline_site(coord),
+            )
+        return "%scall %s(%s, %s)\n" % (" " * indent, routine, proc, coord)
+
+    def _can_do_expr(self, proc, coord):
+        if self._inline_sites is None:
+            return "can_do(%s, %s)" % (proc, coord)
+        elif self.options.sparse:
+            # there is no avail_sites array to peek into
+            return "base_can_do(%s, %s)" % (proc, self._inline_site(coord))
+        else:
+            return "avail_sites(%s, %s, 2).ne.0" % (proc, self._inline_site(coord))
+
+    def _get_species_expr(self, coord):
+        if self._inline_sites is not None:
+            return "base_lattice(%s)" % self._inline_site(coord)
+        return "get_species(%s)" % coord
+
     def _write_optimal_iftree(self, items, indent, out):
         # this function is called recursively
         # so first we define the ANCHORS or SPECIAL CASES
@@ -2577,13 +3201,9 @@ class ProcListWriter:
             # [1][2] field of the item determine if this search is intended for enabling (=True) or
             # disabling (=False) a process
             if item[1][2]:
-                out.write(
-                    "%scall add_proc(%s, %s)\n" % (" " * indent, item[1][0], item[1][1])
-                )
+                out.write(self._proc_call("add_proc", item[1][0], item[1][1], indent))
             else:
-                out.write(
-                    "%scall del_proc(%s, %s)\n" % (" " * indent, item[1][0], item[1][1])
-                )
+                out.write(self._proc_call("del_proc", item[1][0], item[1][1], indent))
 
         # and only keep those that have conditions
         items = list(filter(lambda x: x[0], items))
@@ -2618,7 +3238,8 @@ class ProcListWriter:
             )
 
         out.write(
-            "%sselect case(get_species(%s))\n" % ((indent) * " ", most_common_coord)
+            "%sselect case(%s)\n"
+            % ((indent) * " ", self._get_species_expr(most_common_coord))
         )
         for answer in uniq_answers:
             out.write("%scase(%s)\n" % ((indent) * " ", answer))
@@ -2748,6 +3369,13 @@ class ProcListWriter:
                 % len(chempot_list)
             )
 
+        if self.options.rate_tables:
+            out.write(
+                "\n! Counts the changes of userpar and chempots, so that the rate\n"
+                "! tables know when to fill themselves again\n"
+                "integer(kind=ilong), public :: userpar_version = 0\n"
+            )
+
         after_contains = ""
 
         # Once this is done, we need to build routines that update user parameters and chempots
@@ -2762,6 +3390,10 @@ class ProcListWriter:
             "    real(kind=rdouble), intent(in) :: val\n"
         )
         after_contains = after_contains + ("    userpar(param) = val\n")
+        if self.options.rate_tables:
+            after_contains = after_contains + (
+                "    userpar_version = userpar_version + 1\n"
+            )
         after_contains = after_contains + ("end subroutine update_user_parameter\n\n")
 
         after_contains = after_contains + ("subroutine get_user_parameter(param,val)\n")
@@ -2783,6 +3415,10 @@ class ProcListWriter:
                 "    real(kind=rdouble), intent(in) :: val\n"
             )
             after_contains = after_contains + ("    chempots(index) = val\n")
+            if self.options.rate_tables:
+                after_contains = after_contains + (
+                    "    userpar_version = userpar_version + 1\n"
+                )
             after_contains = after_contains + ("end subroutine update_chempot\n\n")
 
         # out.write('\n! On-the-fly calculators for rate constants\n\n')
@@ -2797,6 +3433,40 @@ class ProcListWriter:
             after_contains2 = after_contains
         # out.close()
 
+        # Processes whose bystanders lie on the same sites up to a
+        # translation share a routine that reads the species on them, so
+        # that run_proc_* reads them once for all of these processes
+        bystander_groups, process_groups = self._get_bystander_groups()
+        for group, sites in enumerate(bystander_groups, 1):
+            after_contains2 = after_contains2 + (
+                "\nsubroutine read_bystanders_{1}(cell, species)\n"
+                "{0}! Reads the species on the bystander sites of\n"
+                "{0}! {2}\n"
+                "{0}! in the frame of the first one, see gs_*\n"
+                "{0}integer(kind=iint), dimension(4), intent(in) :: cell\n"
+                "{0}integer(kind=iint), dimension({3}), intent(out) :: species\n"
+                "\n".format(
+                    " " * indent,
+                    group,
+                    ", ".join(
+                        name
+                        for name, (number, _) in process_groups.items()
+                        if number == group
+                    ),
+                    len(sites),
+                )
+            )
+            for isite, (layer, name, offset) in enumerate(sites, 1):
+                coord = Coord(layer=layer, name=name, offset=np.array(offset))
+                after_contains2 = after_contains2 + (
+                    "{0}species({1}) = get_species(cell{2})\n".format(
+                        " " * indent, isite, coord.radd_ff()
+                    )
+                )
+            after_contains2 = after_contains2 + (
+                "\nend subroutine read_bystanders_{0}\n".format(group)
+            )
+
         # And finally, we need to write the subroutines to return each of the rate constants
 
         for iproc, process in enumerate(data.get_processes()):
@@ -2827,6 +3497,16 @@ class ProcListWriter:
                         nr_vars.append(nr_var)
             nr_vars = sorted(nr_vars, key=lambda x: (x.split("_")[2], x.split("_")[1]))
 
+            # With --rate-tables the rates for all combinations of nr_vars
+            # are stored in a table that is filled again when the
+            # parameters change, unless it would have too many entries
+            table_size = 0
+            if self.options.rate_tables and nr_vars:
+                maxima, strides = self._get_rate_table_layout(process, nr_vars)
+                table_size = strides[-1] * (maxima[-1] + 1)
+                if table_size > self.options.rate_tables:
+                    table_size = 0
+
             if separate_files:
                 out2 = open("{0}/gr_{1:04d}.f90".format(self.dir, iproc + 1), "w")
                 out2.write("module gr_{0:04d}\n".format(iproc + 1))
@@ -2847,65 +3527,142 @@ class ProcListWriter:
                     nr_vars_str_len, process.name, nr_vars_print
                 )
             )
-
-            after_contains2 = after_contains2 + (
-                "\nfunction gr_{0}(cell)\n".format(process.name)
-            )
-            after_contains2 = after_contains2 + (
-                "%sinteger(kind=iint), dimension(4), intent(in) :: cell\n"
-                % (" " * indent)
-            )
-            if nr_vars:
-                after_contains2 = after_contains2 + (
-                    "{0}integer(kind=iint), dimension({1}) :: nr_vars\n".format(
-                        " " * indent,
-                        len(nr_vars),
+            if table_size:
+                out2.write(
+                    "real(kind=rdouble), dimension(0:{0}), private :: "
+                    "rate_table_{1}\n".format(table_size - 1, process.name)
+                )
+                out2.write(
+                    "real(kind=rdouble), private :: rate_table_base_{0} = -1.\n".format(
+                        process.name
                     )
                 )
-
-            after_contains2 = after_contains2 + (
-                "{0}real(kind=rdouble) :: gr_{1}\n".format(" " * indent, process.name)
-            )
-            after_contains2 = after_contains2 + ("\n")
-
-            if nr_vars:
+                out2.write(
+                    "integer(kind=ilong), private :: rate_table_version_{0} = -1\n".format(
+                        process.name
+                    )
+                )
+                if self.options.openmp:
+                    out2.write(
+                        "!$omp threadprivate(rate_table_{0}, rate_table_base_{0}, &\n"
+                        "!$omp& rate_table_version_{0})\n".format(process.name)
+                    )
+                out2.write("private :: fill_rate_table_{0}\n".format(process.name))
+
+            # gr_<proc> reads the bystanders from the lattice, gs_<proc>
+            # takes them from read_bystanders_* if they are shared with
+            # other processes
+            variants = [("gr", "cell", "dimension(4)", None)]
+            if process.name in process_groups:
+                group, origin = process_groups[process.name]
+                variants.append(
+                    (
+                        "gs",
+                        "species",
+                        "dimension({0})".format(len(bystander_groups[group - 1])),
+                        (group, origin),
+                    )
+                )
+            for prefix, argument, dimension, shared in variants:
                 after_contains2 = after_contains2 + (
-                    "{0}nr_vars(:) = 0\n".format(" " * indent)
+                    "\nfunction {0}_{1}({2})\n".format(prefix, process.name, argument)
                 )
-
-            for byst in process.bystander_list:
                 after_contains2 = after_contains2 + (
-                    "%sselect case(get_species(cell%s))\n"
-                    % (" " * indent, byst.coord.radd_ff())
+                    "{0}integer(kind=iint), {1}, intent(in) :: {2}\n".format(
+                        " " * indent, dimension, argument
+                    )
                 )
-                for spec in byst.allowed_species:
+                if nr_vars:
                     after_contains2 = after_contains2 + (
-                        "%scase(%s)\n" % (" " * 2 * indent, spec)
-                    )
-                    for flg in byst.flag.split():
-                        nrv_indx = nr_vars.index("nr_{0}_{1}".format(spec, flg)) + 1
-                        after_contains2 = (
-                            after_contains2
-                            + "{0:s}nr_vars({1:d}) = nr_vars({1:d}) + 1\n".format(
-                                " " * 3 * indent,
-                                nrv_indx,
-                            )
+                        "{0}integer(kind=iint), dimension({1}) :: nr_vars\n".format(
+                            " " * indent,
+                            len(nr_vars),
                         )
-                after_contains2 = after_contains2 + ("%send select\n" % (" " * indent))
-            after_contains2 = after_contains2 + ("\n")
-            if nr_vars:
+                    )
+
                 after_contains2 = after_contains2 + (
-                    "{0}gr_{1} = rate_{1}(nr_vars)\n".format(" " * indent, process.name)
+                    "{0}real(kind=rdouble) :: {1}_{2}\n".format(
+                        " " * indent, prefix, process.name
+                    )
                 )
-            else:
+                after_contains2 = after_contains2 + ("\n")
+
+                if nr_vars:
+                    after_contains2 = after_contains2 + (
+                        "{0}nr_vars(:) = 0\n".format(" " * indent)
+                    )
+
+                for byst in process.bystander_list:
+                    if shared:
+                        site = (
+                            byst.coord.layer,
+                            byst.coord.name,
+                            tuple(
+                                int(x) for x in np.array(byst.coord.offset) - shared[1]
+                            ),
+                        )
+                        species = "species({0})".format(
+                            bystander_groups[shared[0] - 1].index(site) + 1
+                        )
+                    else:
+                        species = "get_species(cell%s)" % byst.coord.radd_ff()
+                    after_contains2 = after_contains2 + (
+                        "%sselect case(%s)\n" % (" " * indent, species)
+                    )
+                    for spec in byst.allowed_species:
+                        after_contains2 = after_contains2 + (
+                            "%scase(%s)\n" % (" " * 2 * indent, spec)
+                        )
+                        for flg in byst.flag.split():
+                            nrv_indx = nr_vars.index("nr_{0}_{1}".format(spec, flg)) + 1
+                            after_contains2 = (
+                                after_contains2
+                                + "{0:s}nr_vars({1:d}) = nr_vars({1:d}) + 1\n".format(
+                                    " " * 3 * indent,
+                                    nrv_indx,
+                                )
+                            )
+                    after_contains2 = after_contains2 + (
+                        "%send select\n" % (" " * indent)
+                    )
+                after_contains2 = after_contains2 + ("\n")
+                if table_size:
+                    index = " + ".join(
+                        ["nr_vars(1)"]
+                        + [
+                            "{0}*nr_vars({1})".format(stride, iv + 1)
+                            for iv, stride in enumerate(strides[1:], 1)
+                        ]
+                    )
+                    after_contains2 = after_contains2 + (
+                        "{0}if(rate_table_version_{1}.ne.userpar_version.or. &\n"
+                        "{0}    rate_table_base_{1}.ne.rates({1}))then\n"
+                        "{0}{0}call fill_rate_table_{1}()\n"
+                        "{0}endif\n"
+                        "{0}{3}_{1} = rate_table_{1}({2})\n".format(
+                            " " * indent,
+                            process.name,
+                            self._wrap_fortran_line(index, indent * 2),
+                            prefix,
+                        )
+                    )
+                elif nr_vars:
+                    after_contains2 = after_contains2 + (
+                        "{0}{2}_{1} = rate_{1}(nr_vars)\n".format(
+                            " " * indent, process.name, prefix
+                        )
+                    )
+                else:
+                    after_contains2 = after_contains2 + (
+                        "{0}{2}_{1} = rate_{1}()\n".format(
+                            " " * indent, process.name, prefix
+                        )
+                    )
+
+                after_contains2 = after_contains2 + ("{0}return\n".format(" " * indent))
                 after_contains2 = after_contains2 + (
-                    "{0}gr_{1} = rate_{1}()\n".format(" " * indent, process.name)
+                    "\nend function {1}_{0}\n\n".format(process.name, prefix)
                 )
-
-            after_contains2 = after_contains2 + ("{0}return\n".format(" " * indent))
-            after_contains2 = after_contains2 + (
-                "\nend function gr_{0}\n\n".format(process.name)
-            )
             ####
 
             if nr_vars:
@@ -2951,6 +3708,38 @@ class ProcListWriter:
                 "\nend function rate_{0}\n\n".format(process.name)
             )
 
+            if table_size:
+                after_contains2 = after_contains2 + (
+                    "subroutine fill_rate_table_{1}()\n"
+                    "{0}! Evaluates rate_{1} for all nr_vars up to\n"
+                    "{0}! ({2})\n"
+                    "{0}integer(kind=iint), dimension({3}) :: nr_vars\n"
+                    "{0}integer(kind=iint) :: entry\n"
+                    "\n"
+                    "{0}do entry = 0, {4}\n".format(
+                        " " * indent,
+                        process.name,
+                        ", ".join(str(maximum) for maximum in maxima),
+                        len(nr_vars),
+                        table_size - 1,
+                    )
+                )
+                for iv, (maximum, stride) in enumerate(zip(maxima, strides)):
+                    after_contains2 = after_contains2 + (
+                        "{0}{0}nr_vars({1}) = mod(entry/{2}, {3})\n".format(
+                            " " * indent, iv + 1, stride, maximum + 1
+                        )
+                    )
+                after_contains2 = after_contains2 + (
+                    "{0}{0}rate_table_{1}(entry) = rate_{1}(nr_vars)\n"
+                    "{0}enddo\n"
+                    "{0}rate_table_base_{1} = rates({1})\n"
+                    "{0}rate_table_version_{1} = userpar_version\n"
+                    "\nend subroutine fill_rate_table_{1}\n\n".format(
+                        " " * indent, process.name
+                    )
+                )
+
             if separate_files:
                 out2.write("\ncontains\n")
                 out2.write(after_contains2)
@@ -2963,6 +3752,69 @@ class ProcListWriter:
             out.write(after_contains2)
             out.write("\nend module proclist_pars\n")
 
+    def _get_rate_table_layout(self, process, nr_vars):
+        """Return the largest value of each of the nr_vars of process,
+        i.e. the number of its bystanders that count towards it, and
+        the stride of each one in the flattened rate table.
+        """
+        maxima = [0] * len(nr_vars)
+        for byst in process.bystander_list:
+            for spec in set(byst.allowed_species):
+                for flg in set(byst.flag.split()):
+                    maxima[nr_vars.index("nr_{0}_{1}".format(spec, flg))] += 1
+        strides = [1]
+        for maximum in maxima[:-1]:
+            strides.append(strides[-1] * (maximum + 1))
+        return maxima, strides
+
+    def _get_bystander_groups(self):
+        """Return the groups of otf processes whose bystanders lie on the
+        same sites up to a translation: a list with the sites (layer,
+        site, offset) of each group and a dictionary with the group
+        (starting at 1) of each process in one and the offset of its
+        bystanders relative to the sites of the group.
+        """
+        signatures = {}
+        for process in self.data.get_processes():
+            if not process.bystander_list:
+                continue
+            offsets = np.array([byst.coord.offset for byst in process.bystander_list])
+            origin = tuple(int(x) for x in offsets.min(axis=0))
+            sites = tuple(
+                sorted(
+                    set(
+                        (
+                            byst.coord.layer,
+                            byst.coord.name,
+                            tuple(int(x) for x in np.array(byst.coord.offset) - origin),
+                        )
+                        for byst in process.bystander_list
+                    )
+                )
+            )
+            signatures.setdefault(sites, []).append((process.name, origin))
+
+        bystander_groups = []
+        process_groups = {}
+        for sites, members in signatures.items():
+            if len(members) < 2:
+                continue
+            bystander_groups.append(sites)
+            for name, origin in members:
+                process_groups[name] = (len(bystander_groups), origin)
+        return bystander_groups, process_groups
+
+    def _wrap_fortran_line(self, expr, indent, maxlen=65):
+        """Break expr at spaces into continuation lines of at most
+        about maxlen characters.
+        """
+        lines = [""]
+        for word in expr.split(" "):
+            if lines[-1] and len(lines[-1]) + len(word) >= maxlen:
+                lines.append("")
+            lines[-1] += word + " "
+        return (" &\n%s&" % (" " * indent)).join(line.rstrip() for line in lines)
+
     def _otf_get_auxilirary_params(self, data):
         from io import StringIO
         import tokenize
@@ -3132,19 +3984,28 @@ class ProcListWriter:
             progress_bar = ProgressBar("blue", width=80)
             progress_bar.render(10, "generic part")
 
+        out.write("module proclist\nuse kind_values\n")
+        if self.options.rng == "xoshiro":
+            out.write("use rng, only: rng_seed, rng_uniform\n")
         out.write(
             (
-                "module proclist\n"
-                "use kind_values\n"
                 "use base, only: &\n"
                 "    update_accum_rate, &\n"
                 "    update_integ_rate, &\n"
                 "    reaccumulate_rates_matrix, &\n"
                 "    determine_procsite, &\n"
                 "    update_clocks, &\n"
-                "    avail_sites, &\n"
+                "    recorder_active, &\n"
+                "    recorder_due, &\n"
+                "    record_samples, &\n"
+                "    get_kmc_time, &\n"
+                "    get_procstats, &\n"
+                "    rewind_clocks, &\n"
+                "    species_count, &\n"
             )
         )
+        if not self.options.sparse:
+            out.write("    avail_sites, &\n")
         if len(data.layer_list) == 1:  # multi-lattice mode
             out.write("    null_species, &\n")
         else:
@@ -3167,6 +4028,9 @@ class ProcListWriter:
             "    replace_species, &\n"
             "    del_proc, &\n"
             "    reset_site, &\n"
+            "    enter_instance, &\n"
+            "    leave_instance, &\n"
+            "    current_instance, &\n"
             "    system_size, &\n"
             "    update_rates_matrix, &\n"
             "    spuck, &\n"
@@ -3185,11 +4049,11 @@ class ProcListWriter:
                 out.write("    %s\n" % process.name)
         # Import only gr_* functions from proclist_pars to avoid conflicts with user parameters
         out.write("use proclist_pars, only: &\n")
-        for i, process in enumerate(data.process_list):
-            if i < len(data.process_list) - 1:
-                out.write("    gr_%s, &\n" % process.name)
-            else:
-                out.write("    gr_%s\n" % process.name)
+        rate_functions = ["gr_%s" % process.name for process in data.process_list]
+        if not separate_files:
+            # the run_proc_* routines follow in this module
+            rate_functions += self._get_shared_bystander_functions()
+        out.write("    %s\n" % ", &\n    ".join(rate_functions))
         if separate_files and self.separate_proclist_pars:
             for i in range(len(data.process_list)):
                 out.write("use run_proc_{0:04d}; use gr_{0:04d}\n".format(i + 1))
@@ -3255,9 +4119,12 @@ class ProcListWriter:
         # First kill all processes from this site that are allowed
         out.write("    site = cell + (/0, 0, 0, 1/)\n")
         out.write("    do proc_nr = 1, nr_of_proc\n")
-        out.write(
-            "        if(avail_sites(proc_nr, lattice2nr(site(1), site(2), site(3), site(4)) , 2).ne.0)then\n"
-        )
+        if self.options.sparse:
+            out.write("        if(can_do(proc_nr, site))then\n")
+        else:
+            out.write(
+                "        if(avail_sites(proc_nr, lattice2nr(site(1), site(2), site(3), site(4)) , 2).ne.0)then\n"
+            )
         out.write("            call del_proc(proc_nr, site)\n")
         out.write("        endif\n")
         out.write("    end do\n\n")
@@ -3339,6 +4206,7 @@ class ProcListWriter:
         """
         nprocs = len(data.process_list)
         process_list = data.get_processes()
+        bystander_groups, process_groups = self._get_bystander_groups()
 
         debug = 0
 
@@ -3360,6 +4228,7 @@ class ProcListWriter:
                 out2.write("%sdel_proc, &\n" % (" " * indent))
                 out2.write("%sadd_proc, &\n" % (" " * indent))
                 out2.write("%sreplace_species, &\n" % (" " * indent))
+                out2.write("%supdate_rates_matrix, &\n" % (" " * indent))
                 out2.write("%sget_species\n" % (" " * indent))
                 # Import species and processes from proclist_constants to avoid conflict with parameter indices
                 out2.write("use proclist_constants, only: &\n")
@@ -3372,11 +4241,13 @@ class ProcListWriter:
                         out2.write("%s%s\n" % (" " * indent, process.name))
                 # Import only gr_* functions from proclist_pars to avoid conflicts with user parameters
                 out2.write("use proclist_pars, only: &\n")
-                for i, process in enumerate(data.process_list):
-                    if i < len(data.process_list) - 1:
-                        out2.write("%sgr_%s, &\n" % (" " * indent, process.name))
-                    else:
-                        out2.write("%sgr_%s\n" % (" " * indent, process.name))
+                rate_functions = [
+                    "gr_%s" % process.name for process in data.process_list
+                ] + self._get_shared_bystander_functions()
+                out2.write(
+                    "%s%s\n"
+                    % (" " * indent, (", &\n" + " " * indent).join(rate_functions))
+                )
                 if self.separate_proclist_pars:
                     for i in range(nprocs):
                         out2.write("use gr_{0:04d}\n".format(i + 1))
@@ -3465,6 +4336,30 @@ class ProcListWriter:
                 print(aff_procs)
                 print("  ")
 
+            ## Processes of one bystander group that are evaluated on the
+            ## same sites share the species read by read_bystanders_*
+            evaluations = [
+                (process_list[ip].name, rel_pos)
+                for procs in [aff_procs, enh_procs]
+                for ip, sublist in enumerate(procs)
+                for rel_pos in sublist
+            ]
+            shared = self._get_shared_bystanders(evaluations, process_groups)
+            nr_of_reads = len(set(read for read, _, _ in shared.values()))
+            for read in range(1, nr_of_reads + 1):
+                group = next(
+                    group for other, group, _ in shared.values() if other == read
+                )
+                out2.write(
+                    "%sinteger(kind=iint), dimension(%s) :: bystanders_%s\n"
+                    % (" " * indent, len(bystander_groups[group - 1]), read)
+                )
+            if shared:
+                out2.write(
+                    "%slogical, dimension(%s) :: bystanders_read\n"
+                    % (" " * indent, nr_of_reads)
+                )
+
             ## Write the del_proc calls for all inh_procs
             out2.write("\n! Disable processes\n\n")
             for ip, sublist in enumerate(inh_procs):
@@ -3517,6 +4412,9 @@ class ProcListWriter:
                     )
                 )
 
+            if shared:
+                out2.write("%sbystanders_read = .false.\n" % (" " * indent))
+
             ## Write the modification routines for already active processes
             out2.write("\n! Update rate constants\n\n")
             for ip, sublist in enumerate(aff_procs):
@@ -3532,14 +4430,15 @@ class ProcListWriter:
                         )
                     )
                     rel_site = "cell + (/ %s, %s, %s, 1/)" % rel_pos
-                    rel_cell = "cell + (/ %s, %s, %s, 0/)" % rel_pos
+                    rate = self._write_otf_rate_call(
+                        out2, 2 * indent, process_list[ip].name, rel_pos, shared
+                    )
                     out2.write(
-                        "{0}call update_rates_matrix({1},{2},gr_{3}({4}))\n".format(
+                        "{0}call update_rates_matrix({1},{2},{3})\n".format(
                             " " * 2 * indent,
                             process_list[ip].name,
                             rel_site,
-                            process_list[ip].name,
-                            rel_cell,
+                            rate,
                         )
                     )
                     out2.write("%send if\n" % (" " * indent))
@@ -3589,13 +4488,61 @@ class ProcListWriter:
                         (copy.deepcopy(other_conditions), copy.deepcopy(item2))
                     )
 
-            self._write_optimal_iftree_otf(enabling_items, indent, out2)
+            self._write_optimal_iftree_otf(enabling_items, indent, out2, shared)
             out2.write("\nend subroutine %s\n" % routine_name)
             if separate_files:
                 out2.write("\nend module run_proc_{0:04d}\n".format(iproc + 1))
                 out2.close()
 
-    def _write_optimal_iftree_otf(self, items, indent, out):
+    def _get_shared_bystander_functions(self):
+        """Return the names of the routines of proclist_pars that
+        run_proc_* uses for shared bystanders, see _get_bystander_groups.
+        """
+        bystander_groups, process_groups = self._get_bystander_groups()
+        return ["gs_%s" % name for name in process_groups] + [
+            "read_bystanders_%s" % group
+            for group in range(1, len(bystander_groups) + 1)
+        ]
+
+    def _get_shared_bystanders(self, evaluations, process_groups):
+        """Return for each (process name, relative position) of a run_proc_*
+        routine whose bystanders are read by other evaluations too the
+        number of the local bystanders_* array, its group and the
+        relative position to read it from, see read_bystanders_*.
+        """
+        reads = {}
+        for name, rel_pos in evaluations:
+            if name in process_groups:
+                group, origin = process_groups[name]
+                read_pos = tuple(int(x) + y for x, y in zip(rel_pos, origin))
+                reads.setdefault((group, read_pos), []).append((name, rel_pos))
+
+        shared = {}
+        for (group, read_pos), members in reads.items():
+            if len(members) < 2:
+                continue
+            read = len(set(other for other, _, _ in shared.values())) + 1
+            for member in members:
+                shared[member] = (read, group, read_pos)
+        return shared
+
+    def _write_otf_rate_call(self, out, indent, name, rel_pos, shared):
+        """Return the expression for the rate of process name at rel_pos
+        from cell. If its bystanders are shared, first write the lines
+        that read them unless another process did already.
+        """
+        if (name, rel_pos) not in shared:
+            return "gr_%s(cell + (/ %s, %s, %s, 0/))" % ((name,) + tuple(rel_pos))
+        read, group, read_pos = shared[name, rel_pos]
+        out.write(
+            "{0}if(.not.bystanders_read({1}))then\n"
+            "{0}    call read_bystanders_{2}(cell + (/ {3}, {4}, {5}, 0/), bystanders_{1})\n"
+            "{0}    bystanders_read({1}) = .true.\n"
+            "{0}endif\n".format(" " * indent, read, group, *read_pos)
+        )
+        return "gs_%s(bystanders_%s)" % (name, read)
+
+    def _write_optimal_iftree_otf(self, items, indent, out, shared=None):
         # this function is called recursively
         # so first we define the ANCHORS or SPECIAL CASES
         # if no conditions are left, enable process immediately
@@ -3623,9 +4570,15 @@ class ProcListWriter:
                     item[1][1][1],
                     item[1][1][2],
                 )
+                if shared:
+                    rate = self._write_otf_rate_call(
+                        out, indent, item[1][0], tuple(item[1][1]), shared
+                    )
+                else:
+                    rate = "gr_%s(%s)" % (item[1][0], rel_cell)
                 out.write(
-                    "%scall add_proc(%s, %s, gr_%s(%s))\n"
-                    % (" " * indent, item[1][0], rel_site, item[1][0], rel_cell)
+                    "%scall add_proc(%s, %s, %s)\n"
+                    % (" " * indent, item[1][0], rel_site, rate)
                 )
             else:
                 out.write(
@@ -3714,13 +4667,13 @@ class ProcListWriter:
                 pruned_items.append((conditions, nested_item[1]))
 
             items = list(filter(lambda x: x not in nested_items, items))
-            self._write_optimal_iftree_otf(pruned_items, indent + 4, out)
+            self._write_optimal_iftree_otf(pruned_items, indent + 4, out, shared)
         out.write("%send select\n\n" % (indent * " ",))
 
         if items:
             # if items are left
             # the RECURSION II
-            self._write_optimal_iftree_otf(items, indent, out)
+            self._write_optimal_iftree_otf(items, indent, out, shared)
 
     def write_settings(self, code_generator="lat_int"):
         """Write the kmc_settings.py. This contains all parameters, which
@@ -3844,6 +4797,111 @@ class ProcListWriter:
 
         out.close()
 
+    def _get_sublattice_range(self):
+        """Return for each axis the largest distance in unit cells between
+        the sites of one process (conditions, actions and bystanders).
+        Processes in sublattices that are at least this far apart
+        cannot see each other, see do_kmc_steps_sublattice.
+        """
+        sublattice_range = [0, 0, 0]
+        for process in self.data.process_list:
+            coords = [condition.coord for condition in process.condition_list]
+            coords += [action.coord for action in process.action_list]
+            coords += [
+                bystander.coord for bystander in getattr(process, "bystander_list", [])
+            ]
+            offsets = np.array([coord.offset for coord in coords] + [(0, 0, 0)])
+            extent = offsets.max(axis=0) - offsets.min(axis=0)
+            sublattice_range = [
+                max(old, int(new)) for old, new in zip(sublattice_range, extent)
+            ]
+        return sublattice_range
+
+    def _get_reverse_processes(self):
+        """Return for each process the number of its reverse process or 0.
+        Q is the reverse of P if it turns the sites that P changes back:
+        the conditions of Q are the sites after P and the actions of Q
+        the sites before P, translated by the same offset. Processes
+        that count towards a TOF have no reverse, since scaling them
+        would change the TOF, see do_kmc_steps_accelerated.
+        """
+
+        def normalized(state, sites):
+            origin = np.array([site[2] for site in sites]).min(axis=0)
+            return frozenset(
+                (state.get(site), site[0], site[1], tuple(np.array(site[2]) - origin))
+                for site in sites
+            )
+
+        states = []
+        for process in self.data.process_list:
+            before = {}
+            for condition in process.condition_list:
+                coord = condition.coord
+                before[coord.layer, coord.name, tuple(coord.offset)] = condition.species
+            after = dict(before)
+            for action in process.action_list:
+                coord = action.coord
+                after[coord.layer, coord.name, tuple(coord.offset)] = action.species
+            if before == after or getattr(process, "tof_count", None):
+                states.append(None)
+                continue
+            sites = sorted(set(before) | set(after))
+            states.append((normalized(before, sites), normalized(after, sites)))
+
+        reverse = [0] * len(states)
+        for i, state in enumerate(states):
+            if state is None:
+                continue
+            partners = [
+                j
+                for j, other in enumerate(states)
+                if j != i and other == (state[1], state[0])
+            ]
+            if len(partners) == 1:
+                reverse[i] = partners[0] + 1
+        # only keep pairs that are unique in both directions
+        return [
+            partner if partner and reverse[partner - 1] == i + 1 else 0
+            for i, partner in enumerate(reverse)
+        ]
+
+    def _get_lookup_halo(self):
+        """Return how many unit cells beyond the system the generated
+        code looks up along x, y and z. The lookups are relative to a
+        site that may already be shifted by the spread of one process
+        (local_smart) or by an offset of a process from its unit cell
+        (lat_int, table, otf), so up to twice the spread of a process
+        or its largest offset plus its spread are needed.
+        """
+        halo = [0, 0, 0]
+        for process in self.data.process_list:
+            coords = [
+                x.coord
+                for x in process.condition_list
+                + process.action_list
+                + list(getattr(process, "bystander_list", None) or [])
+            ]
+            for axis in range(3):
+                offsets = [int(coord.offset[axis]) for coord in coords]
+                spread = max(offsets) - min(offsets)
+                reach = max(abs(offset) for offset in offsets)
+                halo[axis] = max(halo[axis], 2 * spread, reach + spread)
+        return halo
+
+    def _get_species_kind(self):
+        """Return the smallest integer kind from kind_values that holds
+        every species number and null_species, which is what the
+        lattice array is declared with.
+        """
+        nr_of_species = len(self.data.species_list)
+        if nr_of_species < 10**2:
+            return "ibyte"
+        elif nr_of_species < 10**4:
+            return "ishort"
+        else:
+            return "iint"
+
     def _get_site_params(self):
         data = self.data
         site_params = []
@@ -3904,13 +4962,33 @@ def export_source(
         else:
             code_generator = "local_smart"
 
-    if options is None:
-
-        class Struct:
-            def __init__(self, **entries):
-                self.__dict__.update(entries)
-
-        options = Struct(backend=code_generator, acf=False)
+    options = _complete_options(options, backend=code_generator)
+    if options.sublattice:
+        if code_generator not in ["local_smart", "lat_int", "table"]:
+            raise UserWarning(
+                "--sublattice is only available for the local_smart, "
+                "lat_int and table backends"
+            )
+        if options.acf:
+            raise UserWarning("--sublattice cannot be combined with --acf")
+        if options.openmp:
+            raise UserWarning(
+                "--sublattice already uses OpenMP threads, "
+                "it cannot be combined with --openmp"
+            )
+    if options.acf and code_generator == "table":
+        raise UserWarning("--acf is not available for the table backend")
+    if options.rate_tables and code_generator != "otf":
+        raise UserWarning("--rate-tables is only available for the otf backend")
+    if options.inline:
+        if code_generator != "local_smart":
+            raise UserWarning("--inline is only available for the local_smart backend")
+        if options.sublattice:
+            raise UserWarning("--inline cannot be combined with --sublattice")
+    if options.site_order not in ["row", "morton", "hilbert"]:
+        raise UserWarning("Unknown --site-order '%s'" % options.site_order)
+    if options.site_order == "hilbert" and int(project_tree.meta.model_dimension) != 2:
+        raise UserWarning("--site-order=hilbert is only available for 2D models")
 
     if export_dir is None:
         export_dir = project_tree.meta.model_name
@@ -3936,12 +5014,19 @@ def export_source(
     elif code_generator == "otf":
         cp_files = [
             (os.path.join("fortran_src", "assert.ppc"), "assert.ppc"),
-            (os.path.join("fortran_src", "base_otf.f90"), "base.f90"),
+            (os.path.join("fortran_src", "kind_values.f90"), "kind_values.f90"),
+            (os.path.join("fortran_src", "main.f90"), "main.f90"),
+        ]
+    elif code_generator == "table":
+        cp_files = [
+            (os.path.join("fortran_src", "assert.ppc"), "assert.ppc"),
             (os.path.join("fortran_src", "kind_values.f90"), "kind_values.f90"),
             (os.path.join("fortran_src", "main.f90"), "main.f90"),
         ]
     else:
         raise UserWarning("Don't know this backend")
+    if options.rng == "xoshiro":
+        cp_files.append((os.path.join("fortran_src", "rng.f90"), "rng.f90"))
 
     exec_files = []
     print(APP_ABS_PATH)
@@ -3957,11 +5042,13 @@ def export_source(
 
     # SECOND
     # produce those source files that are written on the fly
-    writer = ProcListWriter(project_tree, export_dir)
+    writer = ProcListWriter(project_tree, export_dir, options=options)
     if code_generator == "local_smart":
         writer.write_template(filename="base", options=options)
-    elif code_generator == "lat_int":
+    elif code_generator in ["lat_int", "table"]:
         writer.write_template(filename="base_lat_int", target="base", options=options)
+    elif code_generator == "otf":
+        writer.write_template(filename="base_otf", target="base", options=options)
 
     if options is not None and options.acf:
         writer.write_template(filename="base_acf", options=options)
@@ -71,17 +71,22 @@ class ACFWriterBase:
     Attributes:
         data: Project data tree containing process and species information
         dir: Output directory for generated Fortran files
+        options: Export options, e.g. the parsed command line options
     """
 
-    def __init__(self, data, dir):
+    def __init__(self, data, dir, options=None):
         """Initialize the ACF writer.
 
         Args:
             data: Project data tree
             dir: Output directory path
+            options: Export options (defaults are filled in if missing)
         """
+        from kmos.io import _complete_options
+
         self.data = data
         self.dir = dir
+        self.options = _complete_options(options)
 
     def write_proclist_acf(self):
         """Write the proclist_acf.f90 module.
@@ -104,16 +109,22 @@ class ACFWriterBase:
         Args:
             out: File handle to write to
         """
+        out.write("module proclist_acf\nuse kind_values\n")
+        if self.options.rng == "xoshiro":
+            out.write("use rng, only: rng_uniform\n")
         out.write(
             (
-                "module proclist_acf\n"
-                "use kind_values\n"
                 "use base, only: &\n"
                 "    update_accum_rate, &\n"
                 "    update_integ_rate, &\n"
                 "    determine_procsite, &\n"
                 "    update_clocks, &\n"
-                "    avail_sites, &\n"
+            )
+        )
+        if not self.options.sparse:
+            out.write("    avail_sites, &\n")
+        out.write(
+            (
                 "    null_species, &\n"
                 "    increment_procstat\n\n"
                 "use base_acf, only: &\n"
@@ -1295,13 +1306,14 @@ class OTFACFWriter(ACFWriterBase):
         out.write("end subroutine get_diff_sites_displacement\n\n")
 
 
-def get_acf_writer(data, dir, code_generator="local_smart"):
+def get_acf_writer(data, dir, code_generator="local_smart", options=None):
     """Factory function to create appropriate ACF writer.
 
     Args:
         data: Project data tree
         dir: Output directory path
         code_generator: Backend type ('local_smart', 'otf', or 'lat_int')
+        options: Export options, e.g. the parsed command line options
 
     Returns:
         ACFWriter instance (SmartACFWriter or OTFACFWriter)
@@ -1314,8 +1326,8 @@ def get_acf_writer(data, dir, code_generator="local_smart"):
         >>> writer.write_proclist_acf()
     """
     if code_generator == "local_smart":
-        return SmartACFWriter(data, dir)
+        return SmartACFWriter(data, dir, options)
     elif code_generator in ("otf", "lat_int"):
-        return OTFACFWriter(data, dir)
+        return OTFACFWriter(data, dir, options)
     else:
         raise ValueError(f"Unknown code_generator: {code_generator}")
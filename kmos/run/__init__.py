@@ -37,7 +37,7 @@ the model happens through Queues.
 #    You should have received a copy of the GNU General Public License
 #    along with kmos.  If not, see <http://www.gnu.org/licenses/>.
 
-__all__ = ["base", "lattice", "proclist", "KMC_Model"]
+__all__ = ["base", "lattice", "proclist", "KMC_Model", "KMC_Ensemble"]
 
 from ase.atoms import Atoms
 from ase.io import write
@@ -82,6 +82,8 @@ import os
 import random
 import sys
 import types
+import warnings
+import weakref
 
 try:
     from kmc_model import base, lattice, proclist
@@ -113,6 +115,11 @@ try:
 except (ImportError, ModuleNotFoundError):
     base_acf = proclist_acf = None
 
+try:
+    from kmc_model import rng
+except (ImportError, ModuleNotFoundError):
+    rng = None
+
 try:
     import kmc_settings as settings
 except Exception as e:
@@ -150,7 +157,26 @@ class KMC_Model(Process):
     """API Front-end to initialize and run a kMC model using python bindings.
     Depending on the constructor call the model can be run either via directory
     calls or in a separate processes access via multiprocessing.Queues.
-    Only one model instance can exist simultaneously per process."""
+
+    Several models can exist in one process if each gets its own
+    instance number, e.g. KMC_Model(instance=1). The Fortran modules
+    hold the state of one instance at a time; while models of more than
+    one instance are allocated, accessing any public attribute or method
+    of a model switches to its instance, together with the values of the
+    parameters. Calls to the Fortran modules bypassing the model act on
+    the instance that was used last."""
+
+    # instance of this model and the one the Fortran modules hold
+    _instance = 0
+    _selected_instance = 0
+    # parameters of the instances that are not selected
+    _instance_parameters = {}
+    # models that are not deallocated yet, see _register_instance
+    _live_models = weakref.WeakSet()
+    # how base/set_lean_stepping accumulates integ_rates
+    _integ_modes = {"step": 0, "lazy": 1, "off": 2}
+    _walltime_interval = 1
+    _integ_mode = "step"
 
     def __init__(
         self,
@@ -165,7 +191,24 @@ class KMC_Model(Process):
         steps_per_frame=50000,
         random_seed=None,
         cache_file=None,
+        random_stream=None,
+        instance=None,
+        check_mapping=True,
+        walltime_interval=1,
+        integ_mode="step",
     ):
+        if instance is not None:
+            if base_acf is not None:
+                raise UserWarning("Model instances are not supported with --acf")
+            if not hasattr(lattice, "select_instance"):
+                raise UserWarning(
+                    "Model instances require a model exported by this kmos version"
+                )
+            if instance < 0:
+                raise UserWarning("instance has to be 0 or larger")
+            self._instance = instance
+        self._register_instance()
+
         # initialize multiprocessing.Process hooks
         super(KMC_Model, self).__init__()
 
@@ -188,6 +231,22 @@ class KMC_Model(Process):
         if random_seed is not None:
             settings.random_seed = random_seed
 
+        # the self-check of the lattice mapping in allocate_system takes
+        # two passes over all sites
+        if hasattr(lattice, "check_mapping"):
+            lattice.check_mapping = check_mapping
+
+        self._check_lean_stepping(walltime_interval, integ_mode)
+        self._walltime_interval = walltime_interval
+        self._integ_mode = integ_mode
+
+        if random_stream is not None:
+            if rng is None:
+                raise UserWarning(
+                    "random_stream requires a model exported with --rng=xoshiro"
+                )
+            rng.rng_stream = random_stream
+
         if size is None:
             size = settings.simulation_size
         if isinstance(size, int):
@@ -217,6 +276,7 @@ class KMC_Model(Process):
             self.base_acf = kmc_model.base_acf
         if proclist_acf is not None:
             self.proclist_acf = kmc_model.proclist_acf
+        self.rng = rng
 
         if hasattr(self.base, "null_species"):
             self.null_species = self.base.null_species
@@ -240,6 +300,75 @@ class KMC_Model(Process):
         """__enter/exit__ function for with-statement protocol."""
         self.deallocate()
 
+    def _getattribute_selecting_instance(self, attr):
+        """Select the instance of this model before it is used. Installed
+        as __getattribute__ only while models of several instances are
+        allocated, see _switch_instances.
+        """
+        if (
+            not attr.startswith("_")
+            and object.__getattribute__(self, "_instance")
+            != KMC_Model._selected_instance
+        ):
+            object.__getattribute__(self, "_select_instance")()
+        return object.__getattribute__(self, attr)
+
+    def _register_instance(self):
+        """Select the instance of a new model and count it as allocated
+        until deallocate."""
+        # a new model starts from the current parameters, not from those
+        # of an earlier model of the same instance
+        KMC_Model._instance_parameters.pop(self._instance, None)
+        if self._instance != KMC_Model._selected_instance:
+            self._select_instance()
+        KMC_Model._live_models.add(self)
+        KMC_Model._switch_instances()
+
+    @staticmethod
+    def _switch_instances():
+        """Install the instance check as __getattribute__ if allocated
+        models use more than one instance, and remove it otherwise, so
+        that single models keep the plain attribute lookup.
+        """
+        models = list(KMC_Model._live_models)
+        if len(set(model._instance for model in models)) > 1:
+            KMC_Model.__getattribute__ = KMC_Model._getattribute_selecting_instance
+        elif "__getattribute__" in KMC_Model.__dict__:
+            del KMC_Model.__getattribute__
+            # the models left have to find their instance selected
+            if models and models[0]._instance != KMC_Model._selected_instance:
+                models[0]._select_instance()
+
+    def _select_instance(self):
+        """Store the Fortran state and the parameters of the selected
+        instance and continue with the ones of this model.
+        """
+        parameters = {name: dict(entry) for name, entry in settings.parameters.items()}
+        # the otf backend keeps the parameters in proclist_pars as well
+        arrays = {}
+        if proclist_pars is not None:
+            for name in ["userpar", "chempots"]:
+                if getattr(proclist_pars, name, None) is not None:
+                    arrays[name] = np.array(getattr(proclist_pars, name))
+        KMC_Model._instance_parameters[KMC_Model._selected_instance] = (
+            parameters,
+            arrays,
+        )
+
+        lattice.select_instance(self._instance)
+        KMC_Model._selected_instance = self._instance
+
+        if self._instance in KMC_Model._instance_parameters:
+            parameters, arrays = KMC_Model._instance_parameters.pop(self._instance)
+            for name, entry in parameters.items():
+                settings.parameters[name].update(entry)
+            for name, array in arrays.items():
+                getattr(proclist_pars, name)[:] = array
+            # the rate tables of --rate-tables are filled again when
+            # they see a new version of the parameters
+            if arrays and hasattr(proclist_pars, "userpar_version"):
+                proclist_pars.userpar_version += 1
+
     def reset(self):
         self.size = np.array(self.size)
         try:
@@ -311,12 +440,19 @@ class KMC_Model(Process):
         else:
             self.lattice_representation = Atoms()
 
+        self._prepare_geometry()
+
         set_rate_constants(settings.parameters, self.print_rates)
 
         self.base.update_accum_rate()
         # S. matera 09/25/2012
         if hasattr(self.base, "update_integ_rate"):
             self.base.update_integ_rate()
+        # the settings of an earlier model stay in base otherwise
+        if hasattr(self.base, "set_lean_stepping"):
+            self.base.set_lean_stepping(
+                self._walltime_interval, self._integ_modes[self._integ_mode]
+            )
 
         # # for otf backend only
         # print('kmos.run : Updating proclist_pars!')
@@ -412,24 +548,285 @@ class KMC_Model(Process):
             print("Model is not allocated.")
         if base_acf is not None:
             base_acf.deallocate_acf()
+        KMC_Model._live_models.discard(self)
+        KMC_Model._switch_instances()
 
-    def do_steps(self, n=10000, progress=False):
+    def do_steps(
+        self,
+        n=10000,
+        progress=False,
+        until_time=None,
+        until_proc=None,
+        until_count=1,
+        until_coverage=None,
+    ):
         """Propagate the model `n` steps.
 
+        The `until_` conditions stop the run early. They are checked
+        after each step without returning to Python in between. If any
+        of them is given, the reason for stopping is returned: 'steps'
+        after `n` steps, 'time', 'proc' or 'coverage'.
+
         :param n: Number of steps to run (Default: 10000)
         :type n: int
+        :param until_time: Stop at this kMC time. The step that would
+                           pass it is not executed, the clock stops at
+                           until_time instead.
+        :type until_time: float
+        :param until_proc: Stop after this process (name or number)
+                           was executed `until_count` times.
+        :type until_proc: str or int
+        :param until_count: See `until_proc` (Default: 1)
+        :type until_count: int
+        :param until_coverage: (species, site, coverage): stop when the
+                               coverage of species on site crosses
+                               coverage, in sites per unit cell like
+                               get_occupation. site is a name from
+                               settings.site_names, its number within
+                               the unit cell or None for all sites.
+        :type until_coverage: tuple
+        :rtype: str
 
         """
-        if not progress:
-            proclist.do_kmc_steps(n)
-        else:
+        if until_time is None and until_proc is None and until_coverage is None:
+            if not progress:
+                proclist.do_kmc_steps(n)
+            else:
+                import kmos.utils.progressbar
+
+                progress_bar = kmos.utils.progressbar.ProgressBar()
+                for i in range(100):
+                    proclist.do_kmc_steps(n / 100)
+                    progress_bar.render(i + 1)
+                progress_bar.clear()
+            return
+
+        t_end = np.finfo(float).max if until_time is None else until_time
+        proc = until_proc or 0
+        if isinstance(proc, str):
+            proc = getattr(self.proclist, proc.lower())
+        species, site, coverage = until_coverage or (-1, 0, 0.0)
+        if isinstance(species, str):
+            species = getattr(self.proclist, species.lower())
+        if site is None:
+            site = 0
+        elif isinstance(site, str):
+            site = settings.site_names.index(site) + 1
+
+        chunks = 100 if progress else 1
+        if progress:
             import kmos.utils.progressbar
 
             progress_bar = kmos.utils.progressbar.ProgressBar()
-            for i in range(100):
-                proclist.do_kmc_steps(n / 100)
+        remaining = n
+        for i in range(chunks):
+            steps = remaining // (chunks - i)
+            remaining -= steps
+            procstat = base.get_procstat(proc) if proc else 0
+            stop_reason = proclist.do_kmc_steps_until(
+                steps, t_end, proc, until_count, species, site, coverage
+            )
+            if proc:
+                until_count -= base.get_procstat(proc) - procstat
+            if progress:
                 progress_bar.render(i + 1)
+            if stop_reason:
+                break
+        if progress:
             progress_bar.clear()
+        return ("steps", "time", "proc", "coverage")[stop_reason]
+
+    def _check_lean_stepping(self, walltime_interval, integ_mode):
+        if integ_mode not in self._integ_modes:
+            raise UserWarning(
+                "integ_mode has to be one of %s" % ", ".join(self._integ_modes)
+            )
+        if walltime_interval < 1:
+            raise UserWarning("walltime_interval has to be 1 or larger")
+        if (walltime_interval, integ_mode) != (1, "step") and not hasattr(
+            base, "set_lean_stepping"
+        ):
+            raise UserWarning(
+                "Lean stepping requires a model exported by this kmos version"
+            )
+
+    def set_lean_stepping(self, walltime_interval=1000, integ_mode="lazy"):
+        """Reduce the book-keeping in each kMC step that only serves the
+        output. The trajectory stays the same.
+
+        The CPU time is read every walltime_interval steps, so
+        base.get_walltime lags behind by up to as many steps. The
+        integrated rates behind tof_method="integ" and atoms.tof_integ
+        are summed up in every step by default ("step"). With "lazy"
+        each process only adds its total rate times the elapsed kMC time
+        when its number of available sites or its rate constant changes
+        and when the integrated rates are read, which gives the same
+        values up to rounding. With "off" they are not updated at all.
+
+        Call set_lean_stepping(1, "step") to switch back. Both can also
+        be passed to the constructor.
+
+        :param walltime_interval: Steps between readings of the CPU time
+        :type walltime_interval: int
+        :param integ_mode: One of "step", "lazy" or "off"
+        :type integ_mode: str
+        """
+        self._check_lean_stepping(walltime_interval, integ_mode)
+        self._walltime_interval = walltime_interval
+        self._integ_mode = integ_mode
+        if hasattr(self.base, "set_lean_stepping"):
+            self.base.set_lean_stepping(
+                walltime_interval, self._integ_modes[integ_mode]
+            )
+
+    def do_steps_sublattice(self, nr_of_cycles, t_window, domains=None):
+        """Advance the kMC time by nr_of_cycles * t_window with the
+        synchronous sublattice method in parallel OpenMP threads, see
+        proclist.do_kmc_steps_sublattice. The model has to be exported
+        with --sublattice.
+
+        Each domain is cut into two halves along each axis of the model
+        and in each cycle the same half of all domains runs for t_window
+        at a time. The halves have to be at least
+        proclist.get_sublattice_range() unit cells wide. Processes that
+        change sites of a neighbouring half make the result depend on
+        t_window, which should therefore be small compared to the
+        inverse of the largest rate constant, e.g. a tenth of it. The
+        recorder takes no samples meanwhile.
+
+        :param nr_of_cycles: Number of cycles
+        :type nr_of_cycles: int
+        :param t_window: kMC time of each cycle
+        :type t_window: float
+        :param domains: Number of domains along each axis of the model.
+                        By default as many as the range of the
+                        processes allows.
+        :type domains: tuple
+        """
+        if not hasattr(proclist, "do_kmc_steps_sublattice"):
+            raise UserWarning(
+                "do_steps_sublattice requires a model exported with --sublattice"
+            )
+        if self._integ_mode == "lazy":
+            raise UserWarning('do_steps_sublattice does not support integ_mode="lazy"')
+        size = lattice.system_size
+        sublattice_range = proclist.get_sublattice_range()
+        dimension = len(self.size)
+        if domains is None:
+            domains = []
+            for axis in range(dimension):
+                n = size[axis] // 2
+                while n > 1 and (
+                    size[axis] % (2 * n)
+                    or size[axis] // (2 * n) < sublattice_range[axis]
+                ):
+                    n -= 1
+                domains.append(n)
+        domains = list(domains) + [1] * (3 - len(domains))
+        for axis in range(3):
+            halves = 2 if axis < dimension else 1
+            if (
+                domains[axis] < 1
+                or size[axis] % (halves * domains[axis])
+                or halves * domains[axis] * sublattice_range[axis] > size[axis]
+            ):
+                raise UserWarning(
+                    "Domains %s do not split the lattice %s into halves of at "
+                    "least %s unit cells"
+                    % (
+                        domains[:dimension],
+                        list(size[:dimension]),
+                        list(sublattice_range[:dimension]),
+                    )
+                )
+        proclist.do_kmc_steps_sublattice(nr_of_cycles, t_window, domains)
+
+    def do_steps_accelerated(
+        self,
+        n=10000,
+        window=1000,
+        reverse_pairs=None,
+        min_events=100,
+        separation=100.0,
+        tolerance=0.05,
+    ):
+        """Propagate the model `n` steps while slowing down fast
+        quasi-equilibrated pairs of reverse processes, see
+        proclist.do_kmc_steps_accelerated.
+
+        After every `window` steps each pair whose two directions ran at
+        least `min_events` times with a net flux of at most `tolerance`
+        times their executions has both rate constants scaled by the
+        same factor, so that it still runs `separation` times as often
+        as any other process. This leaves its equilibrium unchanged and
+        spends the steps on the slow processes instead, so the TOF
+        converges in fewer steps. Pairs that leave the equilibrium get
+        their rate constants back at once and all rate constants are
+        restored at the end.
+
+        The pairs are detected from the model: two processes form a pair
+        if one turns back the sites the other one changes. Processes
+        with a tof_count are never scaled.
+
+        Returns a dictionary with an entry for each scaled process: the
+        smallest factor of its rate constant, the largest relative net
+        flux of its pair in a window while it was scaled, which bounds
+        the error of the scaling, and the smallest ratio of the
+        executions of its pair to those of the most frequent other
+        process.
+
+        :param n: Number of steps to run (Default: 10000)
+        :type n: int
+        :param window: Number of steps between two checks (Default: 1000)
+        :type window: int
+        :param reverse_pairs: Pairs of process names to use instead of
+                              the detected ones.
+        :type reverse_pairs: list
+        :param min_events: Executions of a pair per window that are kept
+                           (Default: 100)
+        :type min_events: int
+        :param separation: How much more often a scaled pair runs than
+                           any other process (Default: 100)
+        :type separation: float
+        :param tolerance: Largest net flux of a quasi-equilibrated pair
+                          relative to its executions (Default: 0.05)
+        :type tolerance: float
+        :rtype: dict
+
+        """
+        if not hasattr(proclist, "do_kmc_steps_accelerated"):
+            raise UserWarning(
+                "do_steps_accelerated requires a model exported with the "
+                "local_smart or lat_int backend"
+            )
+        if window < 1:
+            raise UserWarning("window has to be at least 1, not %s" % window)
+        if reverse_pairs is None:
+            reverse = proclist.get_reverse_procs()
+        else:
+            reverse = np.zeros(proclist.nr_of_proc, dtype=int)
+            for forward, backward in reverse_pairs:
+                forward = getattr(self.proclist, forward.lower())
+                backward = getattr(self.proclist, backward.lower())
+                if forward == backward or reverse[forward - 1] or reverse[backward - 1]:
+                    raise UserWarning(
+                        "Each process can only be part of one pair with "
+                        "another process: %s" % (reverse_pairs,)
+                    )
+                reverse[forward - 1] = backward
+                reverse[backward - 1] = forward
+        scaling, imbalance, ratio = proclist.do_kmc_steps_accelerated(
+            n, window, reverse, min_events, separation, tolerance
+        )
+        report = {}
+        for i, process_name in enumerate(sorted(self.settings.rate_constants)):
+            if scaling[i] < 1.0:
+                report[process_name] = {
+                    "scaling": scaling[i],
+                    "imbalance": imbalance[i],
+                    "separation": ratio[i],
+                }
+        return report
 
     def run(self):
         """Runs the model indefinitely. To control the
@@ -506,6 +903,9 @@ class KMC_Model(Process):
         rotation="15z,-70x",
         suffix="png",
         verbose=False,
+        processes=1,
+        max_pending=None,
+        raster=False,
         **kwargs,
     ):
         """Export series of snapshots of model instance to an image
@@ -568,102 +968,107 @@ class KMC_Model(Process):
                 :type rotation: str
                 :param suffix: File suffix (type) of exported file (Default: png).
                 :type suffix: str
+                :param processes: Number of worker processes which build and
+                                  write the frames while the model keeps
+                                  running (Default: 1, i.e. no workers).
+                :type processes: int
+                :param max_pending: Maximum number of frames waiting for a
+                                    worker (Default: 2 per process).
+                :type max_pending: int
+                :param raster: Paint the sites as flat PNG maps with
+                               kmos.run.png.LatticePNG instead of rendering
+                               the atoms, kwargs then go to LatticePNG
+                               (Default: False).
+                :type raster: bool
 
         """
 
-        import ase.io
-        import ase.data.colors
-
-        jmol_colors = ase.data.colors.jmol_colors
+        painter = kmos.run.png.LatticePNG(self, **kwargs) if raster else None
+        if processes > 1:
+            self._export_movie_pipelined(
+                frames,
+                skip,
+                prefix,
+                suffix,
+                verbose,
+                processes,
+                max_pending,
+                painter,
+                kwargs,
+            )
+            return
 
         for i in range(frames):
-            atoms = self.get_atoms(reset_time_overrun=False)
             filename = "{prefix:s}_{i:06d}.{suffix:s}".format(**locals())
-            # write('%s_%06i.%s' % (prefix, i, suffix),
-            # atoms,
-            # show_unit_cell=True,
-            # rotation=rotation,
-            # **kwargs)
-
-            if suffix == "png":
-                writer = kmos.run.png.MyPNG(
-                    atoms, show_unit_cell=True, scale=20, model=self, **kwargs
-                ).write(filename, resolution=150)
-            elif suffix == "pov":
-                rescale = 0.5
-                radii_dict2 = {
-                    "Ni": 0.9 * rescale,
-                    "O": 1.0 * rescale,
-                    "H": 0.5 * rescale,
-                }
-
-                radii2 = []
-                water_radii_dict2 = {
-                    "O": 1.0 * rescale,
-                    "H": 0.5 * rescale,
-                    "Ni": 0.9 * rescale,
-                }
-                colors = []
-                colors2 = []
-                for atom in atoms:
-                    radii2 += [water_radii_dict2[atom.symbol]]
-                    colors += [
-                        (
-                            jmol_colors[atom.number][0],
-                            jmol_colors[atom.number][1],
-                            jmol_colors[atom.number][2],
-                            0.00,
-                            0.00,
-                        )
-                    ]
-                    colors2 += [
-                        (
-                            jmol_colors[atom.number][0],
-                            jmol_colors[atom.number][1],
-                            jmol_colors[atom.number][2],
-                        )
-                    ]
-
-                BA = []
-                distances = atoms.get_all_distances()
-                for i, j in zip(*np.where(distances < 2.2)):
-                    if distances[i, j] < 0.1:
-                        continue
-                    if not (atoms[i].symbol == "H" or atoms[j].symbol == "H"):
-                        BA += [[i, j]]
-                    elif distances[i, j] < 1.5:
-                        BA += [[i, j]]
-
-                ase.io.write(
-                    filename,
-                    atoms,
-                    run_povray=False,
-                    display=False,
-                    pause=False,
-                    # rotation='-90x,30y',
-                    # rotation='-90x,30y',
-                    show_unit_cell=1,
-                    # bbox=(-7,17,0,20),
-                    # bbox=(-8,12,8,28),
-                    bbox=(-(3.0 * 20 + 2), -2, 7 * 20, 5.5 * 20),
-                    textures=["ase3" for atom in atoms],
-                    canvas_height=500,
-                    camera_type="orthographic",
-                    bondatoms=BA,
-                    radii=radii2,
-                    colors=colors2,
-                )
-            elif suffix == "traj":
-                write(filename, atoms)
+            if painter is None:
+                atoms = self.get_atoms(reset_time_overrun=False)
+                _write_movie_frame(atoms, filename, suffix, model=self, **kwargs)
             else:
-                writer = kmos.run.png.MyPNG(
-                    atoms, show_unit_cell=True, scale=20, model=self, **kwargs
-                ).write(filename, resolution=150)
+                # keeps the TOF trackers in line with the other frames
+                self.get_atoms(geometry=False, reset_time_overrun=False)
+                painter.write(filename, self._get_configuration())
 
             if verbose:
                 print("Wrote {filename}".format(**locals()))
             self.do_steps(skip)
 
+    def _export_movie_pipelined(
+        self,
+        frames,
+        skip,
+        prefix,
+        suffix,
+        verbose,
+        processes,
+        max_pending,
+        painter,
+        kwargs,
+    ):
+        """Let a pool of `processes` worker processes build and write the
+        frames of `export_movie`, while this process only copies the
+        configuration of each frame and goes on simulating. At most
+        `max_pending` frames (Default: 2 per process) wait to be written
+        at any time, so that memory does not grow with the number of frames.
+        """
+        import collections
+        import multiprocessing
+
+        if not max_pending:
+            max_pending = 2 * processes
+        pending = collections.deque()
+
+        def write_oldest():
+            filename, result = pending.popleft()
+            result.get()
+            if verbose:
+                print("Wrote {filename}".format(**locals()))
+
+        with multiprocessing.Pool(
+            processes,
+            initializer=_init_movie_worker,
+            initargs=(self._get_geometry(), suffix, painter, kwargs),
+        ) as pool:
+            for i in range(frames):
+                # keeps the TOF trackers in line with the serial export
+                kmc_time = self.get_atoms(
+                    geometry=False, reset_time_overrun=False
+                ).kmc_time
+                filename = "{prefix:s}_{i:06d}.{suffix:s}".format(**locals())
+                pending.append(
+                    (
+                        filename,
+                        pool.apply_async(
+                            _render_movie_frame,
+                            (self._get_configuration(), filename, kmc_time),
+                        ),
+                    )
+                )
+                if len(pending) == max_pending:
+                    write_oldest()
+                self.do_steps(skip)
+            while pending:
+                write_oldest()
+
     def show(self, *args, **kwargs):
         """Visualize the current configuration of the model using ASE ag."""
         tag = kwargs.pop("tag", None)
@@ -705,68 +1110,10 @@ class KMC_Model(Process):
         """
 
         if geometry:
-            kmos_tags = {}
             ase = import_ase()
-            atoms = ase.atoms.Atoms()
-            for i in range(lattice.system_size[0]):
-                for j in range(lattice.system_size[1]):
-                    for k in range(lattice.system_size[2]):
-                        for n in range(1, 1 + lattice.spuck):
-                            species = lattice.get_species([i, j, k, n])
-                            if species == self.null_species:
-                                continue
-                            if self.species_representation.get(species, ""):
-                                # create the ad_atoms
-                                ad_atoms = deepcopy(
-                                    self.species_representation[species]
-                                )
-
-                                if tag == "species":
-                                    ad_atoms.set_initial_magnetic_moments(
-                                        [species] * len(ad_atoms)
-                                    )
-                                elif tag == "site":
-                                    ad_atoms.set_initial_magnetic_moments(
-                                        [n] * len(ad_atoms)
-                                    )
-                                elif tag == "x":
-                                    ad_atoms.set_initial_magnetic_moments(
-                                        [i] * len(ad_atoms)
-                                    )
-                                elif tag == "y":
-                                    ad_atoms.set_initial_magnetic_moments(
-                                        [j] * len(ad_atoms)
-                                    )
-                                elif tag == "z":
-                                    ad_atoms.set_initial_magnetic_moments(
-                                        [k] * len(ad_atoms)
-                                    )
-
-                                # move to the correct location
-                                ad_atoms.translate(
-                                    np.dot(
-                                        np.array([i, j, k])
-                                        + lattice.site_positions[n - 1],
-                                        lattice.unit_cell_size,
-                                    )
-                                )
-                                # add to existing slab
-                                atoms += ad_atoms
-                                if self.species_tags:
-                                    for atom in range(
-                                        len(atoms) - len(ad_atoms), len(atoms)
-                                    ):
-                                        kmos_tags[atom] = list(
-                                            self.species_tags.values()
-                                        )[species]
-
-                        if self.lattice_representation:
-                            lattice_repr = deepcopy(self.lattice_representation)
-                            lattice_repr.translate(
-                                np.dot(np.array([i, j, k]), lattice.unit_cell_size)
-                            )
-                            atoms += lattice_repr
-            atoms.set_cell(self.cell_size)
+            atoms, kmos_tags = _build_atoms(
+                ase, self._get_configuration(), self._get_geometry(), tag
+            )
 
             # workaround for older ASE < 3.6
             if not hasattr(atoms, "info"):
@@ -789,15 +1136,11 @@ class KMC_Model(Process):
         ]
 
         # calculate TOF since last call
-        atoms.procstat = np.zeros((proclist.nr_of_proc,))
+        atoms.procstat = base.get_procstats(proclist.nr_of_proc).astype(float)
         atoms.occupation = proclist.get_occupation()
-        for i in range(proclist.nr_of_proc):
-            atoms.procstat[i] = base.get_procstat(i + 1)
         # S. Matera 09/25/2012
         if hasattr(self.base, "get_integ_rate"):
-            atoms.integ_rates = np.zeros((proclist.nr_of_proc,))
-            for i in range(proclist.nr_of_proc):
-                atoms.integ_rates[i] = base.get_integ_rate(i + 1)
+            atoms.integ_rates = base.get_integ_rates(proclist.nr_of_proc)
         # S. Matera 09/25/2012
         delta_t = atoms.kmc_time - self.time
         delta_steps = atoms.kmc_step - self.steps
@@ -869,6 +1212,8 @@ class KMC_Model(Process):
         tof_method="integ",
         output="str",
         show_progress=False,
+        callback=None,
+        callback_steps=100000,
     ):
         """Sample an average model and return TOFs and coverages
         in a standardized format :
@@ -900,9 +1245,21 @@ class KMC_Model(Process):
                            Differences resulting from the two methods can be used
                            as on estimate for the statistical error in samples.
         :type tof_method: str
+        :param callback: Called without arguments after every
+                         `callback_steps` kMC steps while sampling, e.g. to
+                         tell that the run is still alive.
+        :type callback: callable
+        :param callback_steps: See `callback` (Default: 100000).
+        :type callback_steps: int
 
         """
 
+        if tof_method == "integ" and self._integ_mode == "off":
+            raise UserWarning(
+                'tof_method="integ" requires integrated rates, '
+                'see set_lean_stepping(integ_mode="off")'
+            )
+
         # initialize lists for averages
         occs = []
         tofs = []
@@ -919,7 +1276,14 @@ class KMC_Model(Process):
 
         # sample over trajectory
         for sample in range(samples):
-            self.do_steps(sample_size / samples)
+            if callback is None:
+                self.do_steps(sample_size / samples)
+            else:
+                # the same trajectory in smaller pieces
+                steps = int(sample_size / samples)
+                for done in range(0, steps, callback_steps):
+                    self.do_steps(min(callback_steps, steps - done))
+                    callback()
             atoms = self.get_atoms(geometry=False, reset_time_overrun=False)
             delta_ts.append(atoms.delta_t)
             step_ts.append(self.base.get_kmc_time_step())
@@ -965,6 +1329,96 @@ class KMC_Model(Process):
                 "Output format {output} not defined. I only know 'str' and 'dict'"
             )
 
+    def start_recorder(
+        self, interval_time=None, interval_steps=None, buffer_size=10000
+    ):
+        """Start recording a time series within do_steps. Samples are
+        taken at a fixed interval of kMC time or every couple of kMC
+        steps and are written into a ring buffer inside the Fortran
+        module, so there is no Python overhead while stepping. Collect
+        the samples with drain_recorder before the buffer runs full.
+
+        A sample at time t holds the configuration the system was in
+        at t and the procstat and integ_rates counters up to t.
+
+        :param interval_time: kMC time between two samples.
+        :type interval_time: float
+        :param interval_steps: Number of kMC steps between two samples.
+        :type interval_steps: int
+        :param buffer_size: Number of samples kept in the ring buffer (Default: 10000).
+        :type buffer_size: int
+
+        """
+        if (interval_time is None) == (interval_steps is None):
+            raise UserWarning("Give either interval_time or interval_steps.")
+        if not (interval_time or interval_steps) > 0:
+            raise UserWarning("The sampling interval has to be positive.")
+        self._recorder_shape = self.proclist.get_occupation().shape
+        self.base.allocate_recorder(
+            buffer_size,
+            int(np.prod(self._recorder_shape)),
+            interval_time or 0.0,
+            interval_steps or 0,
+        )
+        self._recorder_drained = 0
+        self._recorder_procstat = self.base.get_procstats(proclist.nr_of_proc)
+        self._recorder_integ_rates = self.base.get_integ_rates(proclist.nr_of_proc)
+
+    def drain_recorder(self):
+        """Return all samples recorded since start_recorder or the last
+        call of drain_recorder and empty the buffer.
+
+        The result is a dictionary of arrays with one row per sample:
+        kmc_time, kmc_step, occupation (samples x species x sites like
+        get_occupation) and the increments of procstat and integ_rates
+        (samples x processes) since the previous sample. If the ring
+        buffer ran full, the oldest samples are lost and a warning is
+        issued; the increments of the first remaining sample then span
+        the lost samples.
+
+        :rtype: dict
+
+        """
+        size = int(self.base.recorder_size)
+        if size == 0:
+            raise UserWarning("No recorder running, call start_recorder first.")
+        total = int(self.base.recorder_nr_of_samples)
+        first = max(self._recorder_drained, total - size)
+        if first > self._recorder_drained:
+            warnings.warn(
+                "The recorder overwrote %s samples, drain it more often "
+                "or increase buffer_size." % (first - self._recorder_drained)
+            )
+        positions = np.arange(first, total) % size
+
+        nr_of_species, nr_of_sites = self._recorder_shape
+        occupation = self.base.recorder_occupation[:, positions].T
+        occupation = occupation.reshape(-1, nr_of_sites, nr_of_species)
+        procstat = self.base.recorder_procstat[:, positions].T
+        integ_rates = self.base.recorder_integ_rates[:, positions].T
+        samples = {
+            "kmc_time": self.base.recorder_time[positions],
+            "kmc_step": self.base.recorder_step[positions],
+            "occupation": occupation.transpose(0, 2, 1),
+            "procstat": np.diff(np.vstack([self._recorder_procstat, procstat]), axis=0),
+            "integ_rates": np.diff(
+                np.vstack([self._recorder_integ_rates, integ_rates]), axis=0
+            ),
+        }
+
+        if len(positions):
+            self._recorder_procstat = procstat[-1]
+            self._recorder_integ_rates = integ_rates[-1]
+        self._recorder_drained = total
+        return samples
+
+    def stop_recorder(self):
+        """Stop recording and free the buffer of the recorder.
+        Samples that were not drained are lost.
+
+        """
+        self.base.deallocate_recorder()
+
     def double(self):
         """
         Double the size of the model in each direction and initialize
@@ -981,17 +1435,8 @@ class KMC_Model(Process):
 
         # initialize new model w/ copies of current state in each of
         # the new copies
-        for x in range(self.lattice.system_size[0]):
-            for y in range(self.lattice.system_size[1]):
-                for z in range(self.lattice.system_size[2]):
-                    xi, yi, zi = np.array([x, y, z]) % old_system_size
-                    for n in range(self.lattice.spuck):
-                        self.lattice.replace_species(
-                            [x, y, z, n + 1],
-                            self.lattice.get_species([x, y, z, n + 1]),
-                            config[xi, yi, zi, n],
-                        )
-        self._adjust_database()
+        reps = list(self.lattice.system_size // old_system_size) + [1]
+        self._set_configuration(np.tile(config, reps))
 
     def switch_surface_processes_off(self):
         """Set rate constant to zero if process
@@ -1074,8 +1519,9 @@ class KMC_Model(Process):
     def print_procstat(self, to_stdout=True):
         entries = []
         longest_name = 0
+        procstats = self.base.get_procstats(proclist.nr_of_proc)
         for i, process_name in enumerate(sorted(self.settings.rate_constants)):
-            procstat = self.base.get_procstat(i + 1)
+            procstat = procstats[i]
             namelength = len(process_name)
             if namelength > longest_name:
                 longest_name = namelength
@@ -1324,35 +1770,28 @@ class KMC_Model(Process):
             return
 
         config = self._get_configuration()
+        old_system_size = deepcopy(self.lattice.system_size)
 
         self.deallocate()
-        self.size /= 2
+        self.size //= 2
         self.reset()
 
         X, Y, Z = self.lattice.system_size
         N = self.lattice.spuck
-        for x in range(X):
-            for y in range(Y):
-                for z in range(Z):
-                    for n in range(N):
-                        # collect species
-                        # from the 8 sites that are
-                        # reduced onto one
-                        choices = [
-                            config[(x + i * X) % X, (y + j * Y) % Y, (z + k * Z) % Z, n]
-                            for i in range(2)
-                            for j in range(2)
-                            for k in range(2)
-                        ]
-
-                        # use random.choice
-                        # to randomly select one
-                        self.lattice.replace_species(
-                            [x, y, z, n + 1],
-                            self.lattice.get_species([x, y, z, n + 1]),
-                            random.choice(choices),
-                        )
-        self._adjust_database()
+        # collect species from the (up to 8) sites
+        # that are reduced onto one ...
+        rx, ry, rz = old_system_size // self.lattice.system_size
+        choices = (
+            config.reshape(rx, X, ry, Y, rz, Z, N)
+            .transpose(1, 3, 5, 6, 0, 2, 4)
+            .reshape(X, Y, Z, N, rx * ry * rz)
+        )
+        # ... and randomly select one, with the random module, so that
+        # random.seed makes the choice reproducible
+        picks = np.array(
+            [random.randrange(rx * ry * rz) for _ in range(X * Y * Z * N)]
+        ).reshape(X, Y, Z, N, 1)
+        self._set_configuration(np.take_along_axis(choices, picks, axis=-1)[..., 0])
 
     def run_proc_nr(self, proc, site):
         if self.base.get_avail_site(proc, site, 2):
@@ -1393,6 +1832,35 @@ class KMC_Model(Process):
                             avail.append(SiteInt(nr))
         return avail
 
+    def _prepare_geometry(self):
+        """Calculate the position of every site once, so that `get_atoms`
+        only has to broadcast the representations over the occupied sites.
+        """
+        # unit cells in the order x, y, z and the offset of every site
+        # (and of the lattice representation) in each of them
+        self._geometry_cells = np.indices(self.lattice.system_size).reshape(3, -1).T
+        spuck = int(self.lattice.spuck)
+        offsets = np.vstack([self.lattice.site_positions[:spuck], np.zeros((1, 3))])
+        self._geometry_translations = np.dot(
+            self._geometry_cells[:, None, :] + offsets[None, :, :],
+            self.lattice.unit_cell_size,
+        )
+
+    def _get_geometry(self):
+        """Return everything `get_atoms` needs besides the configuration,
+        i.e. the representations and positions of the sites, as a
+        picklable dictionary.
+        """
+        return {
+            "species_representation": self.species_representation,
+            "lattice_representation": self.lattice_representation,
+            "species_tags": self.species_tags,
+            "null_species": self.null_species,
+            "cell_size": self.cell_size,
+            "cells": self._geometry_cells,
+            "translations": self._geometry_translations,
+        }
+
     def _get_configuration(self):
         """Return current configuration of model.
 
@@ -1401,11 +1869,11 @@ class KMC_Model(Process):
         config = np.zeros(
             list(self.lattice.system_size) + [int(self.lattice.spuck)], dtype=np.int8
         )
-        for x in range(self.lattice.system_size[0]):
-            for y in range(self.lattice.system_size[1]):
-                for z in range(self.lattice.system_size[2]):
-                    for n in range(self.lattice.spuck):
-                        config[x, y, z, n] = self.lattice.get_species([x, y, z, n + 1])
+        species = self.base.get_all_species(self.base.get_volume())
+        nr2lattice = self.lattice.nr2lattice
+        config[
+            nr2lattice[:, 0], nr2lattice[:, 1], nr2lattice[:, 2], nr2lattice[:, 3] - 1
+        ] = species
         return config
 
     def _set_configuration(self, config):
@@ -1426,35 +1894,39 @@ class KMC_Model(Process):
             print("Config shape %s does not match" % config.shape)
             print("with model shape %s." % [X, Y, Z, N])
             return
-        for x in range(X):
-            for y in range(Y):
-                for z in range(Z):
-                    for n in range(N):
-                        species = self.lattice.get_species([x, y, z, n + 1])
-                        self.lattice.replace_species(
-                            [x, y, z, n + 1], species, config[x, y, z, n]
-                        )
-        self._adjust_database()
+        # writes the lattice and rebuilds the database in one call
+        self.proclist.set_configuration(config)
 
     def _adjust_database(self):
         """Set the database of processes currently
         possible according to the current configuration.
 
         """
-        for x in range(self.lattice.system_size[0]):
-            for y in range(self.lattice.system_size[1]):
-                for z in range(self.lattice.system_size[2]):
-                    if self.get_backend() in ["lat_int", "otf"]:
-                        eval("self.proclist.touchup_cell([%i, %i, %i, 0])" % (x, y, z))
-                    else:
-                        for n in range(self.lattice.spuck):
-                            site_name = self.settings.site_names[n].lower()
-                            eval(
-                                "self.proclist.touchup_%s([%i, %i, %i, %i])"
-                                % (site_name, x, y, z, n + 1)
-                            )
-        # DEBUGGING, adjust database
-        self.base.update_accum_rate()
+        self.proclist.touchup_lattice()
+
+    def get_rng_state(self):
+        """Return the state of the random number generator, which
+        together with the configuration determines all further steps.
+        Requires a model exported with --rng=xoshiro.
+
+        :rtype: np.array
+
+        """
+        if self.rng is None:
+            raise UserWarning("RNG state requires a model exported with --rng=xoshiro")
+        return np.array(self.rng.rng_state)
+
+    def set_rng_state(self, state):
+        """Restore the state of the random number generator as returned
+        by get_rng_state.
+
+        :param state: Four 64 bit integers.
+        :type state: np.array
+
+        """
+        if self.rng is None:
+            raise UserWarning("RNG state requires a model exported with --rng=xoshiro")
+        self.rng.rng_state[:] = np.asarray(state, dtype=np.int64)
 
     def get_backend(self):
         """Return name of backend that model was compiled with.
@@ -1560,12 +2032,13 @@ class KMC_Model(Process):
 
         """
 
+        procstats = self.base.get_procstats(proclist.nr_of_proc)
         for i, name in enumerate(sorted(self.settings.rate_constants.keys())):
             if match is None:
-                print("%s : %.4e" % (name, self.base.get_procstat(i + 1)))
+                print("%s : %.4e" % (name, procstats[i]))
             else:
                 if fnmatch(name, match):
-                    print("%s : %.4e" % (name, self.base.get_procstat(i + 1)))
+                    print("%s : %.4e" % (name, procstats[i]))
 
     def procstat_normalized(self, match=None):
         """Print an overview view process names along with
@@ -1580,6 +2053,8 @@ class KMC_Model(Process):
 
         """
         kmc_time = self.base.get_kmc_time()
+        procstats = self.base.get_procstats(proclist.nr_of_proc)
+        rates = self.base.get_rates(proclist.nr_of_proc)
 
         for i, name in enumerate(sorted(self.settings.rate_constants.keys())):
             if match is None or fnmatch(name, match):
@@ -1588,10 +2063,10 @@ class KMC_Model(Process):
                         "%s : %.4e"
                         % (
                             name,
-                            self.base.get_procstat(i + 1)
+                            procstats[i]
                             / self.lattice.system_size.prod()
-                            / self.base.get_kmc_time()
-                            / self.base.get_rate(i + 1),
+                            / kmc_time
+                            / rates[i],
                         )
                     )
                 else:
@@ -1637,7 +2112,74 @@ class KMC_Model(Process):
         config = np.load("%s.npy" % filename)
 
         self._set_configuration(config)
-        self._adjust_database()
+
+
+class KMC_Ensemble(object):
+    """Independent replicas of a model in one process, e.g. to obtain
+    error bars from many random seeds without one process per seed.
+
+    The replicas are the model instances 1 to nr_of_replicas, see
+    KMC_Model(instance=...), and each one can be inspected through
+    ensemble.replicas. With --rng=xoshiro they share random_seed and
+    draw from the streams 0, 1, ..., otherwise they use the seeds
+    random_seed, random_seed + 1, .... All other keyword arguments are
+    passed on to KMC_Model.
+
+    do_steps advances all replicas with one call of
+    proclist.do_kmc_steps_ensemble, in parallel threads if the model
+    was exported with --openmp. The replicas should run with the same
+    parameters, since the otf backend evaluates the rate constants
+    with the parameters of the selected instance.
+    """
+
+    def __init__(self, nr_of_replicas, random_seed=None, **kwargs):
+        if not hasattr(proclist, "do_kmc_steps_ensemble"):
+            raise UserWarning(
+                "KMC_Ensemble requires a model exported by this kmos version"
+            )
+        if random_seed is None:
+            random_seed = getattr(settings, "random_seed", 1)
+        old_random_seed = getattr(settings, "random_seed", 1)
+
+        self.replicas = []
+        for replica in range(nr_of_replicas):
+            if rng is None:
+                seeds = {"random_seed": random_seed + replica}
+            else:
+                seeds = {"random_seed": random_seed, "random_stream": replica}
+            self.replicas.append(
+                KMC_Model(instance=replica + 1, **dict(kwargs, **seeds))
+            )
+
+        settings.random_seed = old_random_seed
+        if rng is not None:
+            rng.rng_stream = 0
+
+    def __enter__(self, *args, **kwargs):
+        """__enter/exit__ function for with-statement protocol."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        """__enter/exit__ function for with-statement protocol."""
+        self.deallocate()
+
+    def do_steps(self, n=10000):
+        """Perform n kMC steps in each replica.
+
+        Returns the kMC time (nr_of_replicas,), the procstat
+        (nr_of_replicas, nr_of_proc) and the occupation
+        (nr_of_replicas, nr_of_species, nr_of_sites_per_cell) of all
+        replicas afterwards.
+        """
+        kmc_times, procstats, occupations = proclist.do_kmc_steps_ensemble(
+            n, len(self.replicas)
+        )
+        return kmc_times, procstats.T, np.moveaxis(occupations, -1, 0)
+
+    def deallocate(self):
+        """Deallocate all replicas."""
+        for model in self.replicas:
+            model.deallocate()
 
 
 class Model_Parameters(object):
@@ -1928,6 +2470,15 @@ class ModelParameter(object):
     def get_grid(self):
         pass
 
+    def scale(self, value):
+        """Return the coordinate in which the grid of this parameter is
+        regular, e.g. log(p) for pressures."""
+        return value
+
+    def unscale(self, coordinate):
+        """Return the value of a coordinate as returned by `scale`."""
+        return coordinate
+
 
 class PressureParameter(ModelParameter):
     """Create a grid of p \in [p_min, p_max] such
@@ -1945,6 +2496,12 @@ class PressureParameter(ModelParameter):
 
         return p_grid(self.min, self.max, self.steps)
 
+    def scale(self, value):
+        return np.log(value)
+
+    def unscale(self, coordinate):
+        return np.exp(coordinate)
+
 
 class TemperatureParameter(ModelParameter):
     """Create a grid of p \in [T_min, T_max] such
@@ -1962,6 +2519,12 @@ class TemperatureParameter(ModelParameter):
 
         return T_grid(self.min, self.max, self.steps)
 
+    def scale(self, value):
+        return 1.0 / value
+
+    def unscale(self, coordinate):
+        return 1.0 / coordinate
+
 
 class LogParameter(ModelParameter):
     """Create a log grid  between 10^min and 10^max
@@ -1976,6 +2539,12 @@ class LogParameter(ModelParameter):
     def get_grid(self):
         return np.logspace(self.min, self.max, self.steps)
 
+    def scale(self, value):
+        return np.log10(value)
+
+    def unscale(self, coordinate):
+        return 10.0**coordinate
+
 
 class LinearParameter(ModelParameter):
     """Create a regular grid between min and max."""
@@ -2002,15 +2571,21 @@ class _ModelRunner(type):
         return obj
 
 
-class ModelRunner(object):
+class ModelRunner(object, metaclass=_ModelRunner):
     """
     Setup and initiate many runs in parallel over a regular grid
     of parameters. A standard type of script is given below.
 
-    To allow execution from multiple hosts connected
-    to the same filesystem calculated points are blocked
-    via <classname>.lock. To redo a calculation <classname>.dat
-    and <classname>.lock should be moved out of the way ::
+    The points of the grid are kept in a job queue in
+    <classname>.sqlite (see kmos.run.jobqueue), from which each worker
+    process takes one point at a time, so the work spreads evenly over
+    the workers. Several hosts can work on the same grid if they share
+    the file system. Points are only reserved for `lease_time` seconds
+    at a time, renewed by the worker every `renew_steps` kMC steps, so
+    the points of a crashed worker are handed out again, and running
+    the script again only computes the points that are missing. To redo
+    a calculation <classname>.sqlite should be moved out of the way. The
+    results are written to <classname>.npz (or .h5), see `save` ::
 
         from kmos.run import ModelRunner, PressureParameter, TemperatureParameter
 
@@ -2024,120 +2599,176 @@ class ModelRunner(object):
 
     """
 
-    __metaclass__ = _ModelRunner
-
-    def __product(self, *args, **kwds):
-        """Manual implementation of itertools.product for
-        python <= 2.5"""
-
-        # product('ABCD', 'xy') --> Ax Ay Bx By Cx Cy Dx Dy
-        # product(range(2), repeat=3) --> 000 001 010 011 100 101 110 111
-        pools = map(tuple, args) * kwds.get("repeat", 1)
-        result = [[]]
-        for pool in pools:
-            result = [x + [y] for x in result for y in pool]
-        for prod in result:
-            yield tuple(prod)
-
-    def __split_seq(self, seq, size):
-        """Split a list into n chunks of roughly equal size."""
-        newseq = []
-        splitsize = 1.0 / size * len(seq)
-        for i in range(size):
-            newseq.append(
-                seq[int(round(i * splitsize)) : int(round((i + 1) * splitsize))]
-            )
-        return newseq
+    # kMC steps between two renewals of the lease of a point
+    renew_steps = 100000
 
-    def __touch(self, fname, times=None):
-        """Pythonic version of Unix touch.
+    def get_queue(self, lease_time=3600.0):
+        """Return the job queue of this runner.
 
-        :param fname: filename.
-        :type fname: str
-        :param times: timestamp (Default: None meaning now).
-        :type times: datetime timestamp
+        :param lease_time: Seconds a worker may go without renewing its
+                           point before other workers take it over
+                           (Default: 3600).
+        :type lease_time: float
+        :rtype: kmos.run.jobqueue.JobQueue
 
         """
-        fhandle = open(fname, "a")
-        try:
-            os.utime(fname, times)
-        finally:
-            fhandle.close()
+        from kmos.run.jobqueue import JobQueue
 
-    def __run_sublist(
-        self, sublist, init_steps, sample_steps, samples, random_seed=None
+        return JobQueue("%s.sqlite" % self.runner_name, lease_time=lease_time)
+
+    def __run_point(
+        self, datapoint, init_steps, sample_steps, samples, random_seed, renew
     ):
         """
-        Run sampling run for a list of parameter-tuples.
+        Run sampling run for one parameter-tuple.
 
         :param init_steps: Steps to run model before sampling (.ie. to reach steady-state).
         :type init_steps: int
         :param sample_steps: Number of steps to sample over.
         :type sample_steps: int
-        :param cores: Number of parallel processes to launch.
-        :type cores: int
         :param samples: Number of samples. Use more samples if precise coverages are needed.
         :type samples: int
+        :param renew: Called every `renew_steps` kMC steps to keep the lease
+                      of the point.
+        :type renew: callable
+        :rtype: dict
 
         """
-        for i, datapoint in enumerate(sublist):
-            # ============================
-            # DEFINE labels
-            # ===========================
-            lockfile = "%s.lock" % (self.runner_name)
-            format_string = "_".join(["%s"] * (len(self.parameters) + 1))
-            arguments = tuple([self.runner_name] + list(datapoint))
-
-            input_line = format_string % arguments
-
-            outfile = os.path.abspath("%s.dat" % (self.runner_name))
-
-            # ============================
-            # lockfile mechanism
-            # ===========================
-            self.__touch(lockfile)
-            fdata = open(lockfile)
-            readlines = map(lambda x: x.strip(), fdata.readlines())
-            fdata.close()
-            if input_line in readlines:
-                continue
-            fdata = open(lockfile, "a")
-            fdata.write("%s\n" % input_line)
-            fdata.close()
-
-            # ============================
-            # SETUP Model
-            # ===========================
-            model = KMC_Model(
-                print_rates=False,
-                banner=False,
-                random_seed=random_seed,
-                cache_file="%s_configs/config_%s.pckl" % (self.runner_name, input_line),
-            )
+        input_line = "_".join(
+            ["%s" % self.runner_name] + ["%s" % value for value in datapoint]
+        )
+        with KMC_Model(
+            print_rates=False,
+            banner=False,
+            random_seed=random_seed,
+            cache_file="%s_configs/config_%s.pckl" % (self.runner_name, input_line),
+        ) as model:
             for name, value in zip(self.parameters.keys(), datapoint):
                 setattr(model.parameters, name, value)
 
-            # ============================
-            # EVALUATE model
-            # ===========================
-            model.do_steps(int(init_steps))
+            for done in range(0, int(init_steps), self.renew_steps):
+                model.do_steps(min(self.renew_steps, int(init_steps) - done))
+                renew()
             model.get_atoms(geometry=False)
-            data = model.get_std_sampled_data(
-                samples=samples, sample_size=int(sample_steps), tof_method="integ"
+            return model.get_std_sampled_data(
+                samples=samples,
+                sample_size=int(sample_steps),
+                tof_method="integ",
+                output="dict",
+                callback=renew,
+                callback_steps=self.renew_steps,
             )
 
-            if not os.path.exists(outfile):
-                out = open(outfile, "a")
-                out.write(model.get_std_header())
-                out.write(str(model.parameters))
-                out.write(
-                    """# If one or more parameters change between data lines\n# the set above corresponds to the first line.\n"""
+    def __run_worker(self, init_steps, sample_steps, samples, random_seed, lease_time):
+        """Run points from the job queue until none are left."""
+        import time
+
+        queue = self.get_queue(lease_time)
+        job = queue.claim()
+        while job is not None:
+            job_id, datapoint = job
+            start = renewed = time.time()
+
+            def renew():
+                # a write to the queue only every tenth of the lease
+                nonlocal renewed
+                if time.time() - renewed > lease_time / 10:
+                    queue.renew(job_id)
+                    renewed = time.time()
+
+            try:
+                result = self.__run_point(
+                    datapoint,
+                    init_steps,
+                    sample_steps,
+                    samples,
+                    random_seed,
+                    renew,
                 )
-                out.close()
-            out = open(outfile, "a")
-            out.write(data)
-            out.close()
-            model.deallocate()
+            except Exception as e:
+                print("Point %s failed: %s" % (datapoint, e))
+                if not queue.fail(job_id, e):
+                    print(
+                        "Point %s was taken over by another worker, "
+                        "failure dropped" % (datapoint,)
+                    )
+            else:
+                if not queue.finish(job_id, result, time.time() - start):
+                    print(
+                        "Point %s was taken over by another worker, "
+                        "result dropped" % (datapoint,)
+                    )
+            job = queue.claim()
+        queue.close()
+
+    def get_data(self):
+        """Return the results of all finished points as one record
+        array with a field for each parameter of the runner, each
+        quantity returned by KMC_Model.get_std_sampled_data (characters
+        other than letters, digits and _ removed from the names), the
+        `duration` of each point in seconds and the `worker` that ran it.
+
+        :rtype: np.recarray
+
+        """
+        import re
+
+        queue = self.get_queue()
+        results = queue.get_results()
+        queue.close()
+
+        names = list(self.parameters)
+        columns = {}
+        for i, name in enumerate(names):
+            columns[name] = [point[i] for point, _, _, _ in results]
+        for name in results[0][1] if results else []:
+            field = re.sub(r"\W", "", name)
+            if field not in columns:
+                names.append(field)
+                columns[field] = [result[name] for _, result, _, _ in results]
+        names.append("duration")
+        columns["duration"] = [duration for _, _, duration, _ in results]
+
+        data = np.zeros(
+            len(results), dtype=[(name, float) for name in names] + [("worker", "U64")]
+        )
+        for name in names:
+            data[name] = columns[name]
+        data["worker"] = [worker for _, _, _, worker in results]
+        return data.view(np.recarray)
+
+    def save(self, filename=None, format="npz"):
+        """Write the results of all finished points (see `get_data`)
+        with one array per field.
+
+        :param filename: Output file (Default: <classname>.npz or .h5).
+        :type filename: str
+        :param format: 'npz' or 'hdf5' (needs h5py) (Default: 'npz').
+        :type format: str
+        :rtype: str
+
+        """
+        data = self.get_data()
+        if format == "npz":
+            filename = filename or "%s.npz" % self.runner_name
+            np.savez(filename, **dict((name, data[name]) for name in data.dtype.names))
+        elif format == "hdf5":
+            try:
+                import h5py
+            except ImportError:
+                raise UserWarning("Writing HDF5 files requires h5py.")
+            filename = filename or "%s.h5" % self.runner_name
+            with h5py.File(filename, "w") as outfile:
+                for name in data.dtype.names:
+                    values = data[name]
+                    if name == "worker":
+                        values = values.astype("S")
+                    outfile.create_dataset(name, data=values)
+        else:
+            raise UserWarning(
+                "Output format %s not defined. I only know 'npz' and 'hdf5'" % format
+            )
+        return filename
 
     def plot(
         self,
@@ -2192,7 +2823,7 @@ class ModelRunner(object):
             "lines.linewidth": 1.0,
         }
 
-        data = np.recfromtxt("%s.dat" % self.runner_name, names=True, deletechars=None)
+        data = self.get_data()
 
         model = KMC_Model(
             print_rates=False,
@@ -2210,9 +2841,12 @@ class ModelRunner(object):
 
         if plot_occs is None:
             plot_occs = list(data.dtype.names)
-            plot_occs.remove("kmc_time")
-            plot_occs.remove("kmc_steps")
-            for header_param in model.get_param_header().split():
+            for name in ["kmc_time", "simulated_time", "kmc_steps", "duration"]:
+                plot_occs.remove(name)
+            plot_occs.remove("worker")
+            for header_param in set(model.get_param_header().split()) | set(
+                self.parameters
+            ):
                 plot_occs.remove(header_param)
 
             for tof in model.tofs:
@@ -2328,10 +2962,20 @@ class ModelRunner(object):
         model.deallocate()
 
     def run(
-        self, init_steps=1e8, sample_steps=1e8, cores=4, samples=1, random_seed=None
+        self,
+        init_steps=1e8,
+        sample_steps=1e8,
+        cores=4,
+        samples=1,
+        random_seed=None,
+        lease_time=3600.0,
+        output="npz",
     ):
         """Launch the ModelRunner instance. Creates a regular grid over
-        all ModelParameters defined in the ModelRunner class.
+        all ModelParameters defined in the ModelRunner class, adds the
+        points that are not yet known to the job queue and works on them
+        with `cores` processes until all are done. Points that failed in
+        an earlier run are tried again.
 
         :param init_steps: Steps to run model before sampling (.ie. to reach steady-state).
         (Default: 1e8)
@@ -2342,28 +2986,181 @@ class ModelRunner(object):
         :type cores: int
         :param samples: Number of samples. Use more samples if precise coverages are needed (Default: 1).
         :type samples: int
+        :param lease_time: Seconds after which a point whose worker stopped
+                           renewing it is given to another worker
+                           (Default: 3600).
+        :type lease_time: float
+        :param output: Format of the result file, see `save`, or None
+                       (Default: 'npz').
+        :type output: str
+        :rtype: Name of the result file.
 
         """
+        import itertools
 
         parameters = []
         for parameter in self.parameters.values():
             parameters.append(parameter.get_grid())
-        points = list(self.__product(*tuple(parameters)))
 
-        random.shuffle(points)
+        queue = self.get_queue(lease_time)
+        queue.add(itertools.product(*parameters))
+        queue.retry_failed()
+        queue.close()
+
+        self.__run_workers(
+            init_steps, sample_steps, cores, samples, random_seed, lease_time
+        )
+
+        if output is not None:
+            return self.save(format=output)
+
+    def run_adaptive(
+        self,
+        budget=100,
+        tolerance=0.05,
+        max_level=6,
+        quantities=None,
+        init_steps=1e8,
+        sample_steps=1e8,
+        cores=4,
+        samples=1,
+        random_seed=None,
+        lease_time=3600.0,
+        output="npz",
+    ):
+        """Like `run`, but start from the grid of the ModelParameters
+        as a coarse grid and then keep adding points where the results
+        change strongly, until `budget` points are calculated or the
+        results are resolved to `tolerance`.
+
+        Between two neighbouring points along one parameter the change
+        of each quantity is measured relative to the range of that
+        quantity over all points. The pairs with the largest change get
+        a point in between, half way in the coordinate in which the grid
+        of the parameter is regular (see ModelParameter.scale), i.e.
+        at the geometric mean for pressures and log parameters. At most
+        `cores` points are added at a time, so refinement follows the
+        lines of the coarse grid with each round using the results of
+        the previous one. Like `run` this can be resumed and shared
+        between hosts via the job queue.
+
+        :param budget: Maximum number of points including the coarse grid
+                       (Default: 100).
+        :type budget: int
+        :param tolerance: Relative change between two neighbouring points
+                          below which they are not refined (Default: 0.05).
+        :type tolerance: float
+        :param max_level: Maximum number of times a spacing of the coarse
+                          grid is halved (Default: 6).
+        :type max_level: int
+        :param quantities: Names of the results to resolve, as returned
+                           by KMC_Model.get_std_sampled_data(output='dict')
+                           (Default: all TOFs and coverages).
+        :type quantities: list
+        :rtype: Name of the result file.
+
+        The other parameters are the same as for `run`.
+
+        """
+        import itertools
+
+        parameters = list(self.parameters.values())
+        grids = [parameter.get_grid() for parameter in parameters]
+        # smallest spacing to which each parameter is refined
+        min_spacing = [
+            abs(parameter.scale(grid[-1]) - parameter.scale(grid[0]))
+            / max(1, len(grid) - 1)
+            / 2**max_level
+            for parameter, grid in zip(parameters, grids)
+        ]
+
+        queue = self.get_queue(lease_time)
+        queue.add(itertools.product(*grids))
+        queue.retry_failed()
+        if queue.count() > budget:
+            queue.close()
+            raise UserWarning(
+                "The coarse grid has more than budget=%s points." % budget
+            )
+
+        while True:
+            queue.close()
+            self.__run_workers(
+                init_steps, sample_steps, cores, samples, random_seed, lease_time
+            )
+            queue = self.get_queue(lease_time)
+
+            results = queue.get_results()
+            if not results:
+                break
+            if quantities is None:
+                names = [
+                    name
+                    for name in results[0][1]
+                    if name not in self.parameters
+                    and name not in ["kmc_time", "simulated_time", "kmc_steps"]
+                ]
+            else:
+                names = quantities
+            values = np.array(
+                [[result[name] for name in names] for _, result, _, _ in results]
+            )
+            ranges = values.max(axis=0) - values.min(axis=0)
+            ranges[ranges == 0] = np.inf
+            values = values / ranges
+
+            # pairs of neighbouring points along each parameter
+            candidates = []
+            for axis, parameter in enumerate(parameters):
+                lines = {}
+                for i, (point, _, _, _) in enumerate(results):
+                    line = tuple(point[:axis] + point[axis + 1 :])
+                    lines.setdefault(line, []).append((parameter.scale(point[axis]), i))
+                for line in lines.values():
+                    line.sort()
+                    for (x1, i1), (x2, i2) in zip(line[:-1], line[1:]):
+                        if x2 - x1 < 2 * min_spacing[axis]:
+                            continue
+                        change = np.abs(values[i1] - values[i2]).max()
+                        point = list(results[i1][0])
+                        point[axis] = parameter.unscale((x1 + x2) / 2.0)
+                        # failed points stay in the queue without result
+                        if change > tolerance and point not in queue:
+                            candidates.append((change, point))
+
+            candidates.sort(key=lambda candidate: -candidate[0])
+            new_points = [
+                point
+                for _, point in candidates[: max(0, min(cores, budget - queue.count()))]
+            ]
+            if not new_points:
+                break
+            queue.add(new_points)
+        queue.close()
+
+        if output is not None:
+            return self.save(format=output)
 
-        for sub_list in self.__split_seq(points, cores):
+    def __run_workers(
+        self, init_steps, sample_steps, cores, samples, random_seed, lease_time
+    ):
+        """Work on the job queue with `cores` processes until it is done."""
+        workers = []
+        for _ in range(cores):
             p = Process(
-                target=self.__run_sublist,
+                target=self.__run_worker,
                 args=(
-                    sub_list,
                     init_steps,
                     sample_steps,
                     samples,
                     random_seed,
+                    lease_time,
                 ),
             )
             p.start()
+            workers.append(p)
+        for p in workers:
+            p.join()
 
 
 def set_rate_constants(parameters=None, print_rates=None):
@@ -2416,8 +3213,10 @@ def set_rate_constants(parameters=None, print_rates=None):
     # update chemical potentials (works for otf backend only)
     if hasattr(proclist, "update_user_parameter"):
         for name, entry in settings.parameters.items():
+            # look up the index in proclist_pars, since a species of
+            # the same name would shadow it in proclist
             proclist.update_user_parameter(
-                getattr(proclist, name.lower()),
+                getattr(proclist_pars, name.lower()),
                 evaluate_rate_expression(
                     rate_expr=str(entry["value"]).split(" ")[
                         0
@@ -2429,7 +3228,7 @@ def set_rate_constants(parameters=None, print_rates=None):
     if hasattr(proclist, "update_chempot"):
         for chempot in settings.chemical_potentials:
             proclist.update_chempot(
-                getattr(proclist, chempot.lower()),
+                getattr(proclist_pars, chempot.lower()),
                 evaluate_rate_expression(rate_expr=chempot, parameters=parameters),
             )
 
@@ -2437,6 +3236,210 @@ def set_rate_constants(parameters=None, print_rates=None):
         proclist.recalculate_rates_matrix()
 
 
+def _write_movie_frame(atoms, filename, suffix, model=None, kmc_time=None, **kwargs):
+    """Write one frame of `KMC_Model.export_movie`."""
+    import ase.io
+    import ase.data.colors
+
+    jmol_colors = ase.data.colors.jmol_colors
+
+    if suffix == "png":
+        kmos.run.png.MyPNG(
+            atoms,
+            show_unit_cell=True,
+            scale=20,
+            model=model,
+            kmc_time=kmc_time,
+            **kwargs,
+        ).write(filename, resolution=150)
+    elif suffix == "pov":
+        rescale = 0.5
+        radii2 = []
+        water_radii_dict2 = {
+            "O": 1.0 * rescale,
+            "H": 0.5 * rescale,
+            "Ni": 0.9 * rescale,
+        }
+        colors = []
+        colors2 = []
+        for atom in atoms:
+            radii2 += [water_radii_dict2[atom.symbol]]
+            colors += [
+                (
+                    jmol_colors[atom.number][0],
+                    jmol_colors[atom.number][1],
+                    jmol_colors[atom.number][2],
+                    0.00,
+                    0.00,
+                )
+            ]
+            colors2 += [
+                (
+                    jmol_colors[atom.number][0],
+                    jmol_colors[atom.number][1],
+                    jmol_colors[atom.number][2],
+                )
+            ]
+
+        BA = []
+        distances = atoms.get_all_distances()
+        for i, j in zip(*np.where(distances < 2.2)):
+            if distances[i, j] < 0.1:
+                continue
+            if not (atoms[i].symbol == "H" or atoms[j].symbol == "H"):
+                BA += [[i, j]]
+            elif distances[i, j] < 1.5:
+                BA += [[i, j]]
+
+        ase.io.write(
+            filename,
+            atoms,
+            run_povray=False,
+            display=False,
+            pause=False,
+            # rotation='-90x,30y',
+            # rotation='-90x,30y',
+            show_unit_cell=1,
+            # bbox=(-7,17,0,20),
+            # bbox=(-8,12,8,28),
+            bbox=(-(3.0 * 20 + 2), -2, 7 * 20, 5.5 * 20),
+            textures=["ase3" for atom in atoms],
+            canvas_height=500,
+            camera_type="orthographic",
+            bondatoms=BA,
+            radii=radii2,
+            colors=colors2,
+        )
+    elif suffix == "traj":
+        write(filename, atoms)
+    else:
+        kmos.run.png.MyPNG(
+            atoms,
+            show_unit_cell=True,
+            scale=20,
+            model=model,
+            kmc_time=kmc_time,
+            **kwargs,
+        ).write(filename, resolution=150)
+
+
+_movie_worker = {}
+
+
+def _init_movie_worker(geometry, suffix, painter, kwargs):
+    """Store what all frames of a pipelined `export_movie` share in the
+    worker process."""
+    _movie_worker.update(
+        geometry=geometry, suffix=suffix, painter=painter, kwargs=kwargs
+    )
+
+
+def _render_movie_frame(config, filename, kmc_time):
+    """Build the Atoms of one configuration and write them in a worker
+    process of a pipelined `export_movie`."""
+    if _movie_worker["painter"] is not None:
+        _movie_worker["painter"].write(filename, config)
+        return
+    atoms, _ = _build_atoms(import_ase(), config, _movie_worker["geometry"])
+    _write_movie_frame(
+        atoms,
+        filename,
+        _movie_worker["suffix"],
+        kmc_time=kmc_time,
+        **_movie_worker["kwargs"],
+    )
+
+
+def _build_atoms(ase, config, geometry, tag=None):
+    """Assemble a configuration as one ASE Atoms object.
+
+    The atoms are ordered cell by cell (x slowest, z fastest) and
+    within a cell site by site followed by the lattice representation,
+    as if the representations were appended one after another.
+
+    :param ase: The imported ASE module.
+    :param config: Species of each site as returned by
+                   `KMC_Model._get_configuration`.
+    :param geometry: As returned by `KMC_Model._get_geometry`.
+    :param tag: Which index to store as initial magnetic moment of the
+                adsorbates: 'species', 'site', 'x', 'y', 'z' or None.
+    :rtype: (ase.atoms.Atoms, dict)
+    """
+    cells = geometry["cells"]
+    translations = geometry["translations"]
+    spuck = translations.shape[1] - 1
+    config = np.asarray(config, dtype=int).reshape(-1, spuck)
+
+    # blocks are (cell, slot) with slots 0..spuck-1 for the sites
+    # and slot spuck for the lattice representation
+    templates = []
+    sizes = np.zeros((len(cells), spuck + 1), dtype=int)
+    for species, representation in geometry["species_representation"].items():
+        if species == geometry["null_species"] or not representation:
+            continue
+        for n in range(spuck):
+            block_cells = np.nonzero(config[:, n] == species)[0]
+            if len(block_cells):
+                sizes[block_cells, n] = len(representation)
+                templates.append((representation, block_cells, n, species))
+    if geometry["lattice_representation"]:
+        sizes[:, spuck] = len(geometry["lattice_representation"])
+        templates.append(
+            (geometry["lattice_representation"], np.arange(len(cells)), spuck, None)
+        )
+    offsets = (np.cumsum(sizes) - sizes.ravel()).reshape(sizes.shape)
+    nr_of_atoms = int(sizes.sum())
+
+    tagged = tag in ("species", "site", "x", "y", "z")
+
+    # per-atom arrays of the representations, where a representation
+    # lacks an array it is filled as in Atoms.extend
+    arrays = {}
+    for representation, _, n, _ in templates:
+        names = list(representation.arrays)
+        if n < spuck and tagged:
+            names.append("initial_magmoms")
+        for name in names:
+            if name in arrays:
+                continue
+            if name == "initial_magmoms" and name not in representation.arrays:
+                shape, dtype = (), float
+            else:
+                value = representation.arrays[name]
+                shape, dtype = value.shape[1:], value.dtype
+            arrays[name] = np.zeros((nr_of_atoms,) + shape, dtype=dtype)
+
+    kmos_tags = {}
+    for representation, block_cells, n, species in templates:
+        index = offsets[block_cells, n][:, None] + np.arange(len(representation))
+        for name, value in arrays.items():
+            if name == "masses" and name not in representation.arrays:
+                value[index] = representation.get_masses()
+            elif name in representation.arrays:
+                value[index] = representation.arrays[name]
+        if n < spuck:
+            if tag == "species":
+                arrays["initial_magmoms"][index] = species
+            elif tag == "site":
+                arrays["initial_magmoms"][index] = n + 1
+            elif tagged:
+                axis = "xyz".index(tag)
+                arrays["initial_magmoms"][index] = cells[block_cells, axis, None]
+            if geometry["species_tags"]:
+                species_tag = list(geometry["species_tags"].values())[species]
+                kmos_tags.update(dict.fromkeys(index.ravel().tolist(), species_tag))
+        arrays["positions"][index] += translations[block_cells, n][:, None, :]
+
+    numbers = arrays.pop("numbers", np.zeros(nr_of_atoms, dtype=int))
+    positions = arrays.pop("positions", np.zeros((nr_of_atoms, 3)))
+    atoms = ase.atoms.Atoms(
+        numbers=numbers, positions=positions, cell=geometry["cell_size"]
+    )
+    for name, value in arrays.items():
+        atoms.new_array(name, value)
+    return atoms, dict(sorted(kmos_tags.items()))
+
+
 def import_ase():
     """Wrapper for import ASE."""
     try:
@@ -0,0 +1,204 @@
+"""
+A job queue for ModelRunner in a local SQLite file.
+
+Each point of a parameter grid is one row. Workers, i.e. processes on
+one or more hosts that see the same file, claim one pending point at a
+time for a limited lease, so fast workers simply take more points.
+A point whose lease ran out, e.g. because its worker was killed, is
+handed out again. Finished points keep their results, the time they
+took and the worker which ran them, so that running the same grid
+again only computes what is missing. ::
+
+    from kmos.run.jobqueue import JobQueue
+
+    queue = JobQueue("scan.sqlite")
+    queue.add([(1.0, 600.0), (2.0, 600.0)])
+    job = queue.claim()
+    while job is not None:
+        job_id, point = job
+        queue.finish(job_id, {"tof": 1.0}, duration=0.1)
+        job = queue.claim()
+
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import time
+
+
+class JobQueue(object):
+    """Points of a parameter grid with their state and results.
+
+    :param filename: SQLite file, created if it does not exist.
+    :type filename: str
+    :param lease_time: Seconds a claimed point stays reserved for its
+                       worker before others may take it (Default: 3600).
+    :type lease_time: float
+    :param worker: Name of this worker (Default: <host>:<pid>).
+    :type worker: str
+
+    """
+
+    def __init__(self, filename, lease_time=3600.0, worker=None):
+        self.filename = filename
+        self.lease_time = lease_time
+        self.worker = worker or "%s:%s" % (socket.gethostname(), os.getpid())
+        # autocommit, transactions are opened explicitly
+        self.connection = sqlite3.connect(filename, timeout=600, isolation_level=None)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS points ("
+            " id INTEGER PRIMARY KEY,"
+            " key TEXT UNIQUE,"
+            " point TEXT,"
+            " status TEXT DEFAULT 'pending',"
+            " worker TEXT,"
+            " lease_until REAL,"
+            " attempts INTEGER DEFAULT 0,"
+            " duration REAL,"
+            " result TEXT,"
+            " error TEXT)"
+        )
+
+    def close(self):
+        """Close the connection to the SQLite file."""
+        self.connection.close()
+
+    @staticmethod
+    def get_key(point):
+        """Return the text by which a point is recognized again."""
+        return " ".join(repr(float(value)) for value in point)
+
+    def __contains__(self, point):
+        """Whether the point was added to the queue before."""
+        return (
+            self.connection.execute(
+                "SELECT 1 FROM points WHERE key = ?", (self.get_key(point),)
+            ).fetchone()
+            is not None
+        )
+
+    def add(self, points):
+        """Add points which are not in the queue yet.
+
+        :param points: Parameter tuples.
+        :type points: list
+        """
+        self.connection.execute("BEGIN IMMEDIATE")
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO points (key, point) VALUES (?, ?)",
+            [
+                (self.get_key(point), json.dumps([float(value) for value in point]))
+                for point in points
+            ],
+        )
+        self.connection.execute("COMMIT")
+
+    def retry_failed(self):
+        """Hand out the points which failed before again."""
+        self.connection.execute(
+            "UPDATE points SET status = 'pending', error = NULL WHERE status = 'failed'"
+        )
+
+    def claim(self):
+        """Reserve the next pending point, or one whose lease ran out,
+        for this worker.
+
+        :rtype: (int, list) or None if there is nothing left to do.
+        """
+        now = time.time()
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.connection.execute(
+                "SELECT id, point FROM points WHERE status = 'pending'"
+                " OR (status = 'running' AND lease_until < ?) ORDER BY id LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is not None:
+                self.connection.execute(
+                    "UPDATE points SET status = 'running', worker = ?,"
+                    " lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                    (self.worker, now + self.lease_time, row[0]),
+                )
+        finally:
+            self.connection.execute("COMMIT")
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def renew(self, job_id):
+        """Extend the lease of a point this worker is still running.
+
+        :rtype: bool, False if another worker took the point over.
+        """
+        return (
+            self.connection.execute(
+                "UPDATE points SET lease_until = ? WHERE id = ? AND worker = ?",
+                (time.time() + self.lease_time, job_id, self.worker),
+            ).rowcount
+            > 0
+        )
+
+    def finish(self, job_id, result, duration):
+        """Store the result of a point, unless another worker took it
+        over after the lease of this one ran out.
+
+        :param result: Name and value of each sampled quantity.
+        :type result: dict
+        :param duration: Seconds spent on the point.
+        :type duration: float
+        :rtype: bool, False if the result was not stored.
+        """
+        return (
+            self.connection.execute(
+                "UPDATE points SET status = 'done', duration = ?, result = ?"
+                " WHERE id = ? AND worker = ?",
+                (
+                    duration,
+                    json.dumps(dict((k, float(v)) for k, v in result.items())),
+                    job_id,
+                    self.worker,
+                ),
+            ).rowcount
+            > 0
+        )
+
+    def fail(self, job_id, error):
+        """Mark a point as failed, it is retried by `retry_failed`,
+        unless another worker took it over after the lease of this one
+        ran out.
+
+        :rtype: bool, False if the point was not marked.
+        """
+        return (
+            self.connection.execute(
+                "UPDATE points SET status = 'failed', error = ?"
+                " WHERE id = ? AND worker = ?",
+                (str(error), job_id, self.worker),
+            ).rowcount
+            > 0
+        )
+
+    def count(self, status=None):
+        """Return the number of points, or of those with the given status
+        ('pending', 'running', 'done' or 'failed')."""
+        if status is None:
+            return self.connection.execute("SELECT COUNT(*) FROM points").fetchone()[0]
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM points WHERE status = ?", (status,)
+        ).fetchone()[0]
+
+    def get_results(self):
+        """Return point, result, duration and worker of all finished
+        points in the order they were added.
+
+        :rtype: list of tuples
+        """
+        return [
+            (json.loads(point), json.loads(result), duration, worker)
+            for point, result, duration, worker in self.connection.execute(
+                "SELECT point, result, duration, worker FROM points"
+                " WHERE status = 'done' ORDER BY id"
+            )
+        ]
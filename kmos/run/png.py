@@ -16,10 +16,12 @@ class MyPNG(PNG):
         colors=None,
         model=None,
         scale=20,
+        kmc_time=None,
     ):
         self.numbers = atoms.get_atomic_numbers()
         self.colors = colors
         self.model = model
+        self.kmc_time = kmc_time
         if colors is None:
             self.colors = jmol_colors[self.numbers]
 
@@ -131,8 +133,11 @@ class MyPNG(PNG):
 
         import matplotlib.text
 
-        if self.model is not None:
-            time = latex_float(self.model.base.get_kmc_time())
+        kmc_time = self.kmc_time
+        if kmc_time is None and self.model is not None:
+            kmc_time = self.model.base.get_kmc_time()
+        if kmc_time is not None:
+            time = latex_float(kmc_time)
 
             text = matplotlib.text.Text(
                 0.05 * self.w,
@@ -194,3 +199,174 @@ class MyPNG(PNG):
                     self.filename,
                     resolution,
                 )
+
+
+def write_png(filename, rgb, compression=1):
+    """Write an RGB image without ASE or matplotlib.
+
+    :param filename: Name of the PNG file.
+    :param rgb: Image as (height, width, 3) array of uint8.
+    :param compression: zlib level, flat colour maps compress well
+                        already at the fast levels (Default: 1).
+    """
+    import struct
+    import zlib
+
+    height, width, _ = rgb.shape
+    rows = np.zeros((height, 1 + 3 * width), dtype=np.uint8)
+    rows[:, 1:] = rgb.reshape(height, 3 * width)
+
+    def chunk(kind, data):
+        return (
+            struct.pack(">I", len(data))
+            + kind
+            + data
+            + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+        )
+
+    with open(filename, "wb") as outfile:
+        outfile.write(b"\x89PNG\r\n\x1a\n")
+        outfile.write(
+            chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        )
+        outfile.write(chunk(b"IDAT", zlib.compress(rows.tobytes(), compression)))
+        outfile.write(chunk(b"IEND", b""))
+
+
+class LatticePNG(object):
+    """Paint configurations of a model as flat top-view maps, where each
+    site is a small glyph in the colour of its species, and write them
+    as PNG files. Everything that does not change between frames is
+    prepared here, so that painting a frame takes only a few array
+    assignments per site type and no ASE. Instances only hold arrays and
+    can be passed to other processes. ::
+
+        painter = LatticePNG(model, glyphs={"hollow": "circle"})
+        painter.write("snapshot.png", model)
+
+    :param model: The KMC_Model whose lattice is painted.
+    :param scale: Pixels per unit of length (Default: 8).
+    :param size: Edge length of the glyphs in pixels (Default: 80% of the
+                 mean distance between the sites).
+    :param glyphs: Shape per site name, 'square', 'circle', 'diamond' or
+                   a 2D boolean array (Default: 'square' for all sites).
+    :param colors: RGB tuple (0-255) per species name. Species without a
+                   representation are drawn light grey, the others
+                   in distinct colours by default.
+    :param background: RGB tuple of the background (Default: white).
+    :param compression: zlib level of the PNG files (Default: 1).
+    """
+
+    palette = [
+        (31, 119, 180),
+        (255, 127, 14),
+        (44, 160, 44),
+        (214, 39, 40),
+        (148, 103, 189),
+        (140, 86, 75),
+        (227, 119, 194),
+        (127, 127, 127),
+        (188, 189, 34),
+        (23, 190, 207),
+    ]
+    empty_color = (220, 220, 220)
+
+    def __init__(
+        self,
+        model,
+        scale=8,
+        size=None,
+        glyphs=None,
+        colors=None,
+        background=(255, 255, 255),
+        compression=1,
+    ):
+        settings = model.settings
+        spuck = int(model.lattice.spuck)
+        # x, y of each site in each cell, the z layers are painted in order
+        positions = model._get_geometry()["translations"][:, :spuck, :2]
+
+        species_names = sorted(settings.representations)
+        colors = colors or {}
+        # the last entry is picked by null_species = -1
+        lookup = np.zeros((len(species_names) + 1, 3), dtype=np.uint8)
+        lookup[-1] = background
+        nr_of_colors = 0
+        for species, name in enumerate(species_names):
+            if name in colors:
+                lookup[species] = colors[name]
+            elif settings.representations[name].strip():
+                lookup[species] = self.palette[nr_of_colors % len(self.palette)]
+                nr_of_colors += 1
+            else:
+                lookup[species] = self.empty_color
+        self.lookup = lookup
+
+        if size is None:
+            # as if the sites of a unit cell were evenly spread over it
+            unit_cell = np.asarray(model.lattice.unit_cell_size)[:2, :2]
+            size = 0.8 * scale * np.sqrt(abs(np.linalg.det(unit_cell)) / spuck)
+        size = max(1, int(size))
+
+        glyphs = glyphs or {}
+        offsets = []
+        for site_name in settings.site_names[:spuck]:
+            mask = self.get_glyph(glyphs.get(site_name, "square"), size)
+            rows, columns = np.nonzero(mask)
+            offsets.append((rows - mask.shape[0] // 2, columns - mask.shape[1] // 2))
+        margin = max(max(np.abs(r).max(), np.abs(c).max()) for r, c in offsets) + 1
+        self.margin = margin
+
+        lower = positions.reshape(-1, 2).min(0)
+        upper = positions.reshape(-1, 2).max(0)
+        self.width = int(round((upper[0] - lower[0]) * scale)) + 2 * margin + 1
+        self.height = int(round((upper[1] - lower[1]) * scale)) + 2 * margin + 1
+        columns = np.rint((positions[..., 0] - lower[0]) * scale).astype(int) + margin
+        rows = np.rint((upper[1] - positions[..., 1]) * scale).astype(int) + margin
+
+        # index of the first pixel of each site in the flattened image and
+        # of the other glyph pixels relative to it
+        self.pixels = rows * self.width + columns
+        self.offsets = [r * self.width + c for r, c in offsets]
+        self.background = np.array(background, dtype=np.uint8)
+        self.compression = compression
+
+    @staticmethod
+    def get_glyph(glyph, size):
+        """Return the pixels of a glyph of the given edge length as
+        boolean array."""
+        if not isinstance(glyph, str):
+            return np.asarray(glyph, dtype=bool)
+        center = (size - 1) / 2.0
+        y, x = np.mgrid[:size, :size] - center
+        if glyph == "square":
+            return np.ones((size, size), dtype=bool)
+        elif glyph == "circle":
+            return x**2 + y**2 <= (size / 2.0) ** 2
+        elif glyph == "diamond":
+            return np.abs(x) + np.abs(y) <= size / 2.0
+        else:
+            raise UserWarning("Unknown glyph %s" % glyph)
+
+    def paint(self, config):
+        """Return the image of a configuration.
+
+        :param config: Species of each site, as (X, Y, Z, N) array, or a
+                       KMC_Model whose current configuration is painted.
+        :rtype: (height, width, 3) array of uint8
+        """
+        if hasattr(config, "_get_configuration"):
+            config = config._get_configuration()
+        config = np.asarray(config).reshape(len(self.pixels), -1)
+
+        image = np.empty((self.height * self.width, 3), dtype=np.uint8)
+        image[:] = self.background
+        for n, offsets in enumerate(self.offsets):
+            colors = self.lookup[config[:, n]]
+            for offset in offsets:
+                image[self.pixels[:, n] + offset] = colors
+        return image.reshape(self.height, self.width, 3)
+
+    def write(self, filename, config):
+        """Paint a configuration (see `paint`) and write it to a PNG file."""
+        write_png(filename, self.paint(config), self.compression)
@@ -413,7 +413,10 @@ def build(options):
     import sys
     from glob import glob
 
-    src_files = ["kind_values_f2py.f90", "base.f90"]
+    src_files = ["kind_values_f2py.f90"]
+    if isfile("rng.f90"):
+        src_files.append("rng.f90")
+    src_files.append("base.f90")
 
     if isfile("base_acf.f90"):
         src_files.append("base_acf.f90")
@@ -478,6 +481,18 @@ def build(options):
 
     if options.debug:
         extra_flags += " -DDEBUG"
+    if getattr(options, "openmp", False) or getattr(options, "sublattice", False):
+        openmp_flags = {
+            "gfortran": ("-fopenmp", "-lgomp"),
+            "gnu95": ("-fopenmp", "-lgomp"),
+            "intel": ("-qopenmp", "-liomp5"),
+            "intelem": ("-qopenmp", "-liomp5"),
+        }
+        compile_flag, link_flag = openmp_flags.get(
+            options.fcompiler, openmp_flags["gfortran"]
+        )
+        extra_flags += " " + compile_flag
+        call.append(link_flag)
     call.append("--f90flags=%s" % extra_flags)
     call.append("-m")
     call.append(module_name)
@@ -521,6 +536,102 @@ def build(options):
     sys.argv = true_argv
 
 
+def benchmark_backends(
+    xml_file, backends=("local_smart", "lat_int", "table"), nsteps=1000000, size=None
+):
+    """Export, build and run the model of xml_file with each of the
+    backends and return a list of dictionaries with the keys backend,
+    files and lines (of the generated Fortran code), export_time,
+    build_time, binary_size (in bytes) and steps_per_second.
+
+    A backend may be followed by further export options, e.g.
+    'local_smart --inline', to compare them against the plain backend.
+    size is passed on to KMC_Model and defaults to the simulation_size
+    of the model.
+
+    Each backend is exported into a temporary directory and built and
+    run in a separate Python process, as kmc_model can only be imported
+    once per process.
+    """
+    import shutil
+    import subprocess
+    import sys
+    import tempfile
+    import time
+    from glob import glob
+
+    xml_file = os.path.abspath(xml_file)
+    run_script = (
+        "import sys, time\n"
+        "sys.path.insert(0, '.')\n"
+        "from kmos.run import KMC_Model\n"
+        "model = KMC_Model(print_rates=False, banner=False, size=%r)\n"
+        "time0 = time.time()\n"
+        "model.proclist.do_kmc_steps(%s)\n"
+        "print(time.time() - time0)\n"
+        "model.deallocate()\n" % (size, nsteps)
+    )
+    results = []
+    for variant in backends:
+        backend, _, flags = variant.partition(" ")
+        export_dir = tempfile.mkdtemp(prefix="kmos_benchmark_%s_" % backend)
+        src_dir = os.path.join(export_dir, "src")
+        try:
+            time0 = time.time()
+            subprocess.check_call(
+                [
+                    sys.executable,
+                    "-c",
+                    "import kmos.cli; kmos.cli.main(%r)"
+                    % (
+                        "export %s %s -s -o -b%s %s"
+                        % (xml_file, export_dir, backend, flags)
+                    ),
+                ],
+                stdout=subprocess.DEVNULL,
+            )
+            export_time = time.time() - time0
+
+            source_files = glob(os.path.join(src_dir, "*.f90"))
+            lines = 0
+            for source_file in source_files:
+                with open(source_file) as infile:
+                    lines += sum(1 for _ in infile)
+
+            time0 = time.time()
+            subprocess.check_call(
+                [sys.executable, "-c", "import kmos.cli; kmos.cli.main('build')"],
+                cwd=src_dir,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            build_time = time.time() - time0
+            binary_size = sum(
+                os.path.getsize(binary)
+                for binary in glob(os.path.join(src_dir, "kmc_model*"))
+            )
+
+            output = subprocess.check_output(
+                [sys.executable, "-c", run_script], cwd=src_dir
+            )
+            run_time = float(output.decode().strip().split("\n")[-1])
+        finally:
+            shutil.rmtree(export_dir, ignore_errors=True)
+
+        results.append(
+            {
+                "backend": variant,
+                "files": len(source_files),
+                "lines": lines,
+                "export_time": export_time,
+                "build_time": build_time,
+                "binary_size": binary_size,
+                "steps_per_second": nsteps / run_time,
+            }
+        )
+    return results
+
+
 def _run_docker_command(cmd, src_dir, operation_name, timeout=300):
     """Helper to run Docker commands with consistent error handling.
 
@@ -913,10 +1024,10 @@ end subroutine custom_random_number
 
             # Replace lattice = null_species with explicit loop
             base_content = re.sub(
-                r"(\s+)allocate\(lattice\(volume\)\)\s*\n\s+lattice = null_species",
+                r"(\s+)allocate\(lattice\(volume\)\)\s*\n\s+lattice = (int\(null_species, \w+\)|null_species)",
                 r"\1allocate(lattice(volume))\n"
                 r"\1do i_vol = 1, volume\n"
-                r"\1    lattice(i_vol) = null_species\n"
+                r"\1    lattice(i_vol) = \2\n"
                 r"\1end do",
                 base_content,
             )
@@ -941,12 +1052,24 @@ end subroutine custom_random_number
                 base_content,
             )
 
-            # Replace accum_rates = 0 with explicit loop
+            # Replace proc_tree = 0 and the dirty process book-keeping
+            # with explicit loops
+            base_content = re.sub(
+                r"(\s+)allocate\(proc_tree\(nr_of_proc_leaves - 1\)\)\s*\n\s+proc_tree = 0",
+                r"\1allocate(proc_tree(nr_of_proc_leaves - 1))\n"
+                r"\1do i_proc = 1, nr_of_proc_leaves - 1\n"
+                r"\1    proc_tree(i_proc) = 0\n"
+                r"\1end do",
+                base_content,
+            )
             base_content = re.sub(
-                r"(\s+)allocate\(accum_rates\(nr_of_proc\)\)\s*\n\s+accum_rates = 0",
-                r"\1allocate(accum_rates(nr_of_proc))\n"
+                r"(\s+)allocate\(dirty_procs\(nr_of_proc\)\)\s*\n\s+dirty_procs = 0"
+                r"\s*\n\s+allocate\(proc_is_dirty\(nr_of_proc\)\)\s*\n\s+proc_is_dirty = \.false\.",
+                r"\1allocate(dirty_procs(nr_of_proc))\n"
+                r"\1allocate(proc_is_dirty(nr_of_proc))\n"
                 r"\1do i_proc = 1, nr_of_proc\n"
-                r"\1    accum_rates(i_proc) = 0\n"
+                r"\1    dirty_procs(i_proc) = 0\n"
+                r"\1    proc_is_dirty(i_proc) = .false.\n"
                 r"\1end do",
                 base_content,
             )
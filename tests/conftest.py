@@ -5,6 +5,8 @@ import os
 import tempfile
 from unittest.mock import MagicMock
 
+import pytest
+
 
 # Mock janaf_data module before any kmos imports
 # This prevents the interactive download prompt from triggering during test collection
@@ -34,3 +36,59 @@ def pytest_unconfigure(config):
                 import shutil
 
                 shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+# The Fortran modules of a compiled model as kmos.run binds them
+KMC_MODEL_MODULES = [
+    "base",
+    "lattice",
+    "proclist",
+    "proclist_constants",
+    "proclist_pars",
+    "rng",
+]
+
+
+@pytest.fixture
+def export_model(request):
+    """Export, compile and load a model next to the requesting test.
+
+    Returns a function which takes the export directory and the options
+    of `kmos export`, exports the model file found in the directory of
+    the test, changes into the export directory and binds the compiled
+    modules to kmos.run. It returns the kmc_model module and can be
+    called several times. The working directory, sys.path and kmos.run
+    are restored after the test.
+    """
+    import kmos.cli
+    import kmos.run
+
+    old_path = os.getcwd()
+    old_sys_path = list(sys.path)
+    test_dir = os.path.dirname(os.path.abspath(str(request.path)))
+
+    def export(export_dir, options="-blocal_smart", model="AB_model.ini"):
+        os.chdir(test_dir)
+        kmos.cli.main("export %s %s -o %s" % (model, export_dir, options))
+        # the export leaves us in <export_dir>/src
+        os.chdir("..")
+        sys.path.insert(0, os.getcwd())
+        # make sure this build is imported, not one from an earlier test
+        for module in ["kmc_model", "kmc_settings"]:
+            sys.modules.pop(module, None)
+
+        import kmc_model
+        import kmc_settings
+
+        kmos.run.settings = kmc_settings
+        for name in KMC_MODEL_MODULES:
+            setattr(kmos.run, name, getattr(kmc_model, name, None))
+        return kmc_model
+
+    yield export
+
+    os.chdir(old_path)
+    sys.path[:] = old_sys_path
+    kmos.run.settings = None
+    for name in KMC_MODEL_MODULES:
+        setattr(kmos.run, name, None)
@@ -6,6 +6,13 @@ use base, only: &
     reaccumulate_rates_matrix, &
     determine_procsite, &
     update_clocks, &
+    recorder_active, &
+    recorder_due, &
+    record_samples, &
+    get_kmc_time, &
+    get_procstats, &
+    rewind_clocks, &
+    species_count, &
     avail_sites, &
     null_species, &
     increment_procstat
@@ -22,6 +29,9 @@ use lattice, only: &
     replace_species, &
     del_proc, &
     reset_site, &
+    enter_instance, &
+    leave_instance, &
+    current_instance, &
     system_size, &
     update_rates_matrix, &
     spuck, &
@@ -96,6 +106,7 @@ subroutine do_kmc_steps(n)
     integer(kind=ilong) :: i
     real(kind=rsingle) :: ran_proc, ran_time, ran_site
     integer(kind=iint) :: nr_site, proc_nr
+    logical :: due
 
     do i = 1, n
     call random_number(ran_time)
@@ -105,12 +116,177 @@ subroutine do_kmc_steps(n)
     call update_clocks(ran_time)
 
     call update_integ_rate
+    if(recorder_active)then
+        call recorder_due(due)
+        if(due) call take_samples()
+    endif
     call determine_procsite(ran_proc, ran_site, proc_nr, nr_site)
     call run_proc_nr(proc_nr, nr_site)
     enddo
 
 end subroutine do_kmc_steps
 
+subroutine do_kmc_steps_until(n, t_end, proc, nr_of_runs, species, site, coverage, stop_reason)
+
+!****f* proclist/do_kmc_steps_until
+! FUNCTION
+!    Performs up to ``n`` kMC steps like do_kmc_steps, but stops as
+!    soon as one of the following conditions is met, without returning
+!    to Python in between:
+!
+!    * the next step would pass the kMC time ``t_end``. The step is
+!      not executed and the clock stops at ``t_end`` instead.
+!    * process ``proc`` was executed ``nr_of_runs`` times.
+!    * the coverage of ``species`` on site ``site`` of the unit cell
+!      (all sites of the unit cell for 0) crossed ``coverage``, i.e.
+!      reached it from below or fell below it.
+!
+! ARGUMENTS
+!
+!    * ``n`` maximum number of steps to run
+!    * ``t_end`` kMC time to stop at, switched off by huge(t_end)
+!    * ``proc`` process to count, switched off by 0
+!    * ``nr_of_runs`` number of executions of ``proc`` to stop after
+!    * ``species`` species to check the coverage of, switched off by -1
+!    * ``site`` site within the unit cell or 0
+!    * ``coverage`` coverage threshold in sites per unit cell
+!    * ``stop_reason`` 0 after ``n`` steps, 1 at ``t_end``, 2 after
+!      ``nr_of_runs`` executions of ``proc``, 3 at ``coverage``
+!******
+    integer(kind=ilong), intent(in) :: n, nr_of_runs
+    real(kind=rdouble), intent(in) :: t_end, coverage
+    integer(kind=iint), intent(in) :: proc, species, site
+    integer(kind=iint), intent(out) :: stop_reason
+
+    integer(kind=ilong) :: i, runs
+    real(kind=rsingle) :: ran_proc, ran_time, ran_site
+    real(kind=rdouble) :: current_time, threshold
+    integer(kind=iint) :: nr_site, proc_nr, occupied
+    logical :: due, rising
+
+    runs = 0
+    ! the coverage is checked on the number of occupied sites
+    threshold = coverage*real(system_size(1)*system_size(2)*system_size(3), rdouble)
+    rising = .true.
+    if(species.ge.0)then
+        rising = count_occupied(species, site).lt.threshold
+    endif
+
+    stop_reason = 0
+    do i = 1, n
+    call random_number(ran_time)
+    call random_number(ran_proc)
+    call random_number(ran_site)
+    call update_accum_rate
+    call update_clocks(ran_time)
+
+    call get_kmc_time(current_time)
+    if(current_time.gt.t_end)then
+        call rewind_clocks(t_end)
+        call update_integ_rate
+        if(recorder_active)then
+            call recorder_due(due)
+            if(due) call take_samples()
+        endif
+        stop_reason = 1
+        exit
+    endif
+
+    call update_integ_rate
+    if(recorder_active)then
+        call recorder_due(due)
+        if(due) call take_samples()
+    endif
+    call determine_procsite(ran_proc, ran_site, proc_nr, nr_site)
+    call run_proc_nr(proc_nr, nr_site)
+
+    if(proc_nr.eq.proc)then
+        runs = runs + 1
+        if(runs.ge.nr_of_runs)then
+            stop_reason = 2
+            exit
+        endif
+    endif
+    if(species.ge.0)then
+        occupied = count_occupied(species, site)
+        if(rising .eqv. occupied.ge.threshold)then
+            stop_reason = 3
+            exit
+        endif
+    endif
+    enddo
+
+end subroutine do_kmc_steps_until
+
+pure function count_occupied(species, site)
+
+!****f* proclist/count_occupied
+! FUNCTION
+!    Returns the number of sites ``site`` of the unit cell (all sites
+!    of the unit cell for 0) occupied by ``species``.
+!
+! ARGUMENTS
+!
+!    * ``species`` species to count
+!    * ``site`` site within the unit cell or 0
+!******
+    integer(kind=iint) :: count_occupied
+    integer(kind=iint), intent(in) :: species, site
+
+    if(site.gt.0)then
+        count_occupied = species_count(site, species)
+    else
+        count_occupied = sum(species_count(:, species))
+    endif
+
+end function count_occupied
+
+subroutine do_kmc_steps_ensemble(n, nr_of_replicas, kmc_times, procstats, occupations)
+
+!****f* proclist/do_kmc_steps_ensemble
+! FUNCTION
+!    Performs ``n`` kMC steps in each of the model instances 1 to
+!    nr_of_replicas, which have to be initialized before. If the model
+!    was exported with --openmp, the replicas are distributed over
+!    OpenMP threads: each thread has its own copy of the module state
+!    and moves one replica after the other in and out of it with
+!    enter_instance and leave_instance. Afterwards the instance that
+!    was selected before is selected again.
+!
+! ARGUMENTS
+!
+!    * ``n`` number of steps of each replica
+!    * ``nr_of_replicas`` number of replicas
+!    * ``kmc_times`` kMC time of each replica afterwards
+!    * ``procstats`` procstat of each replica afterwards
+!    * ``occupations`` occupation of each replica afterwards, see get_occupation
+!******
+    integer(kind=ilong), intent(in) :: n
+    integer(kind=iint), intent(in) :: nr_of_replicas
+    real(kind=rdouble), dimension(nr_of_replicas), intent(out) :: kmc_times
+    integer(kind=ilong), dimension(10, nr_of_replicas), intent(out) :: procstats
+    real(kind=rdouble), dimension(0:2, 1:1, nr_of_replicas), intent(out) :: occupations
+
+    integer(kind=iint) :: caller, replica
+
+    caller = current_instance
+    call leave_instance()
+
+    !$omp parallel do schedule(dynamic)
+    do replica = 1, nr_of_replicas
+        call enter_instance(replica)
+        call do_kmc_steps(n)
+        call get_kmc_time(kmc_times(replica))
+        call get_procstats(10, procstats(:, replica))
+        call get_occupation(occupations(:, :, replica))
+        call leave_instance()
+    enddo
+    !$omp end parallel do
+
+    call enter_instance(caller)
+
+end subroutine do_kmc_steps_ensemble
+
 subroutine do_kmc_step()
 
 !****f* proclist/do_kmc_step
@@ -126,6 +302,7 @@ subroutine do_kmc_step()
 !******
     real(kind=rsingle) :: ran_proc, ran_time, ran_site
     integer(kind=iint) :: nr_site, proc_nr
+    logical :: due
 
     call random_number(ran_time)
     call random_number(ran_proc)
@@ -134,6 +311,10 @@ subroutine do_kmc_step()
     call update_clocks(ran_time)
 
     call update_integ_rate
+    if(recorder_active)then
+        call recorder_due(due)
+        if(due) call take_samples()
+    endif
     call determine_procsite(ran_proc, ran_site, proc_nr, nr_site)
     call run_proc_nr(proc_nr, nr_site)
 end subroutine do_kmc_step
@@ -198,6 +379,24 @@ subroutine get_occupation(occupation)
     occupation = occupation/real(system_size(1)*system_size(2)*system_size(3))
 end subroutine get_occupation
 
+subroutine take_samples()
+
+!****f* proclist/take_samples
+! FUNCTION
+!    Passes the current occupation to base/record_samples, which stores
+!    the samples of the time-series recorder that are due. Called by
+!    do_kmc_steps and do_kmc_step before the process is executed.
+!
+! ARGUMENTS
+!
+!    ``none``
+!******
+    real(kind=rdouble), dimension(0:2, 1:1) :: occupation
+
+    call get_occupation(occupation)
+    call record_samples(size(occupation), occupation)
+end subroutine take_samples
+
 subroutine init(input_system_size, system_name, layer, seed_in, no_banner)
 
 !****f* proclist/init
@@ -300,13 +499,81 @@ subroutine initialize_state(layer, seed_in)
 
 end subroutine initialize_state
 
+subroutine set_configuration(config, size_x, size_y, size_z, size_n)
+
+!****f* proclist/set_configuration
+! FUNCTION
+!    Writes a whole configuration into the lattice and rebuilds the
+!    book-keeping of available processes in one go. This replaces
+!    calling replace_species for every site from Python.
+!
+! ARGUMENTS
+!
+!    * ``config`` species of all sites as array of the shape
+!      (system_size(1), system_size(2), system_size(3), spuck)
+!    * ``size_x``, ``size_y``, ``size_z``, ``size_n`` shape of config,
+!      inferred by f2py
+!******
+    integer(kind=iint), intent(in) :: size_x, size_y, size_z, size_n
+    integer(kind=iint), dimension(size_x, size_y, size_z, size_n), intent(in) :: config
+
+    integer(kind=iint) :: i, j, k, nr
+
+    if(size_x.ne.system_size(1).or.size_y.ne.system_size(2) &
+        .or.size_z.ne.system_size(3).or.size_n.ne.spuck)then
+        print *,"PROCLIST/SET_CONFIGURATION: shape of config", size_x, size_y, size_z, size_n
+        print *,"does not match the model", system_size, spuck
+        return
+    endif
+
+    do k = 0, system_size(3)-1
+        do j = 0, system_size(2)-1
+            do i = 0, system_size(1)-1
+                do nr = 1, spuck
+                    call replace_species((/i, j, k, nr/), &
+                        get_species((/i, j, k, nr/)), config(i+1, j+1, k+1, nr))
+                end do
+            end do
+        end do
+    end do
+
+    call touchup_lattice()
+
+end subroutine set_configuration
+
+subroutine touchup_lattice()
+
+!****f* proclist/touchup_lattice
+! FUNCTION
+!    Rebuilds the book-keeping of available processes of all sites from
+!    the current lattice configuration, e.g. after species have been
+!    replaced directly, and brings the accumulated rates up to date.
+!
+! ARGUMENTS
+!
+!    ``none``
+!******
+    integer(kind=iint) :: i, j, k
+
+    do k = 0, system_size(3)-1
+        do j = 0, system_size(2)-1
+            do i = 0, system_size(1)-1
+                call touchup_cell((/i, j, k, 0/))
+            end do
+        end do
+    end do
+
+    call update_accum_rate
+
+end subroutine touchup_lattice
+
 subroutine recalculate_rates_matrix()
 
     integer(kind=iint) :: i,j,k
 
-    do i=1, system_size(1)
-        do j=1, system_size(2)
-            do k=1, system_size(3)
+    do i=0, system_size(1)-1
+        do j=0, system_size(2)-1
+            do k=0, system_size(3)-1
                 if(can_do(CO_ads,(/ i, j, k, 1/))) then
                     call update_rates_matrix(CO_ads,(/ i, j, k, 1/),gr_CO_ads((/ i, j, k, 0/)))
                 end if
@@ -314,9 +581,9 @@ subroutine recalculate_rates_matrix()
         end do
     end do
 
-    do i=1, system_size(1)
-        do j=1, system_size(2)
-            do k=1, system_size(3)
+    do i=0, system_size(1)-1
+        do j=0, system_size(2)-1
+            do k=0, system_size(3)-1
                 if(can_do(CO_des,(/ i, j, k, 1/))) then
                     call update_rates_matrix(CO_des,(/ i, j, k, 1/),gr_CO_des((/ i, j, k, 0/)))
                 end if
@@ -324,9 +591,9 @@ subroutine recalculate_rates_matrix()
         end do
     end do
 
-    do i=1, system_size(1)
-        do j=1, system_size(2)
-            do k=1, system_size(3)
+    do i=0, system_size(1)-1
+        do j=0, system_size(2)-1
+            do k=0, system_size(3)-1
                 if(can_do(CO_oxidation_00,(/ i, j, k, 1/))) then
                     call update_rates_matrix(CO_oxidation_00,(/ i, j, k, 1/),gr_CO_oxidation_00((/ i, j, k, 0/)))
                 end if
@@ -334,9 +601,9 @@ subroutine recalculate_rates_matrix()
         end do
     end do
 
-    do i=1, system_size(1)
-        do j=1, system_size(2)
-            do k=1, system_size(3)
+    do i=0, system_size(1)-1
+        do j=0, system_size(2)-1
+            do k=0, system_size(3)-1
                 if(can_do(CO_oxidation_01,(/ i, j, k, 1/))) then
                     call update_rates_matrix(CO_oxidation_01,(/ i, j, k, 1/),gr_CO_oxidation_01((/ i, j, k, 0/)))
                 end if
@@ -344,9 +611,9 @@ subroutine recalculate_rates_matrix()
         end do
     end do
 
-    do i=1, system_size(1)
-        do j=1, system_size(2)
-            do k=1, system_size(3)
+    do i=0, system_size(1)-1
+        do j=0, system_size(2)-1
+            do k=0, system_size(3)-1
                 if(can_do(CO_oxidation_02,(/ i, j, k, 1/))) then
                     call update_rates_matrix(CO_oxidation_02,(/ i, j, k, 1/),gr_CO_oxidation_02((/ i, j, k, 0/)))
                 end if
@@ -354,9 +621,9 @@ subroutine recalculate_rates_matrix()
         end do
     end do
 
-    do i=1, system_size(1)
-        do j=1, system_size(2)
-            do k=1, system_size(3)
+    do i=0, system_size(1)-1
+        do j=0, system_size(2)-1
+            do k=0, system_size(3)-1
                 if(can_do(CO_oxidation_03,(/ i, j, k, 1/))) then
                     call update_rates_matrix(CO_oxidation_03,(/ i, j, k, 1/),gr_CO_oxidation_03((/ i, j, k, 0/)))
                 end if
@@ -364,9 +631,9 @@ subroutine recalculate_rates_matrix()
         end do
     end do
 
-    do i=1, system_size(1)
-        do j=1, system_size(2)
-            do k=1, system_size(3)
+    do i=0, system_size(1)-1
+        do j=0, system_size(2)-1
+            do k=0, system_size(3)-1
                 if(can_do(O2_des_right,(/ i, j, k, 1/))) then
                     call update_rates_matrix(O2_des_right,(/ i, j, k, 1/),gr_O2_des_right((/ i, j, k, 0/)))
                 end if
@@ -374,9 +641,9 @@ subroutine recalculate_rates_matrix()
         end do
     end do
 
-    do i=1, system_size(1)
-        do j=1, system_size(2)
-            do k=1, system_size(3)
+    do i=0, system_size(1)-1
+        do j=0, system_size(2)-1
+            do k=0, system_size(3)-1
                 if(can_do(O2_des_up,(/ i, j, k, 1/))) then
                     call update_rates_matrix(O2_des_up,(/ i, j, k, 1/),gr_O2_des_up((/ i, j, k, 0/)))
                 end if
@@ -384,9 +651,9 @@ subroutine recalculate_rates_matrix()
         end do
     end do
 
-    do i=1, system_size(1)
-        do j=1, system_size(2)
-            do k=1, system_size(3)
+    do i=0, system_size(1)-1
+        do j=0, system_size(2)-1
+            do k=0, system_size(3)-1
                 if(can_do(O_ads_00,(/ i, j, k, 1/))) then
                     call update_rates_matrix(O_ads_00,(/ i, j, k, 1/),gr_O_ads_00((/ i, j, k, 0/)))
                 end if
@@ -394,9 +661,9 @@ subroutine recalculate_rates_matrix()
         end do
     end do
 
-    do i=1, system_size(1)
-        do j=1, system_size(2)
-            do k=1, system_size(3)
+    do i=0, system_size(1)-1
+        do j=0, system_size(2)-1
+            do k=0, system_size(3)-1
                 if(can_do(O_ads_01,(/ i, j, k, 1/))) then
                     call update_rates_matrix(O_ads_01,(/ i, j, k, 1/),gr_O_ads_01((/ i, j, k, 0/)))
                 end if
@@ -95,6 +95,38 @@ subroutine get_user_parameter(param,val)
 end subroutine get_user_parameter
 
 
+subroutine read_bystanders_1(cell, species)
+    ! Reads the species on the bystander sites of
+    ! CO_oxidation_00, CO_oxidation_02, O_ads_00
+    ! in the frame of the first one, see gs_*
+    integer(kind=iint), dimension(4), intent(in) :: cell
+    integer(kind=iint), dimension(6), intent(out) :: species
+
+    species(1) = get_species(cell + (/0, 1, 0, square_default/))
+    species(2) = get_species(cell + (/1, 0, 0, square_default/))
+    species(3) = get_species(cell + (/1, 2, 0, square_default/))
+    species(4) = get_species(cell + (/2, 0, 0, square_default/))
+    species(5) = get_species(cell + (/2, 2, 0, square_default/))
+    species(6) = get_species(cell + (/3, 1, 0, square_default/))
+
+end subroutine read_bystanders_1
+
+subroutine read_bystanders_2(cell, species)
+    ! Reads the species on the bystander sites of
+    ! CO_oxidation_01, CO_oxidation_03, O_ads_01
+    ! in the frame of the first one, see gs_*
+    integer(kind=iint), dimension(4), intent(in) :: cell
+    integer(kind=iint), dimension(6), intent(out) :: species
+
+    species(1) = get_species(cell + (/0, 1, 0, square_default/))
+    species(2) = get_species(cell + (/0, 2, 0, square_default/))
+    species(3) = get_species(cell + (/1, 0, 0, square_default/))
+    species(4) = get_species(cell + (/1, 3, 0, square_default/))
+    species(5) = get_species(cell + (/2, 1, 0, square_default/))
+    species(6) = get_species(cell + (/2, 2, 0, square_default/))
+
+end subroutine read_bystanders_2
+
 function gr_CO_ads(cell)
     integer(kind=iint), dimension(4), intent(in) :: cell
     integer(kind=iint), dimension(2) :: nr_vars
@@ -212,6 +244,55 @@ function gr_CO_oxidation_00(cell)
 
 end function gr_CO_oxidation_00
 
+
+function gs_CO_oxidation_00(species)
+    integer(kind=iint), dimension(6), intent(in) :: species
+    integer(kind=iint), dimension(4) :: nr_vars
+    real(kind=rdouble) :: gs_CO_oxidation_00
+
+    nr_vars(:) = 0
+    select case(species(3))
+        case(O)
+            nr_vars(2) = nr_vars(2) + 1
+        case(CO)
+            nr_vars(1) = nr_vars(1) + 1
+    end select
+    select case(species(1))
+        case(O)
+            nr_vars(2) = nr_vars(2) + 1
+        case(CO)
+            nr_vars(1) = nr_vars(1) + 1
+    end select
+    select case(species(2))
+        case(O)
+            nr_vars(2) = nr_vars(2) + 1
+        case(CO)
+            nr_vars(1) = nr_vars(1) + 1
+    end select
+    select case(species(6))
+        case(O)
+            nr_vars(4) = nr_vars(4) + 1
+        case(CO)
+            nr_vars(3) = nr_vars(3) + 1
+    end select
+    select case(species(5))
+        case(O)
+            nr_vars(4) = nr_vars(4) + 1
+        case(CO)
+            nr_vars(3) = nr_vars(3) + 1
+    end select
+    select case(species(4))
+        case(O)
+            nr_vars(4) = nr_vars(4) + 1
+        case(CO)
+            nr_vars(3) = nr_vars(3) + 1
+    end select
+
+    gs_CO_oxidation_00 = rate_CO_oxidation_00(nr_vars)
+    return
+
+end function gs_CO_oxidation_00
+
 function rate_CO_oxidation_00(nr_vars)
 
     integer(kind=iint), dimension(4), intent(in) :: nr_vars
@@ -274,6 +355,55 @@ function gr_CO_oxidation_01(cell)
 
 end function gr_CO_oxidation_01
 
+
+function gs_CO_oxidation_01(species)
+    integer(kind=iint), dimension(6), intent(in) :: species
+    integer(kind=iint), dimension(4) :: nr_vars
+    real(kind=rdouble) :: gs_CO_oxidation_01
+
+    nr_vars(:) = 0
+    select case(species(5))
+        case(O)
+            nr_vars(2) = nr_vars(2) + 1
+        case(CO)
+            nr_vars(1) = nr_vars(1) + 1
+    end select
+    select case(species(1))
+        case(O)
+            nr_vars(2) = nr_vars(2) + 1
+        case(CO)
+            nr_vars(1) = nr_vars(1) + 1
+    end select
+    select case(species(3))
+        case(O)
+            nr_vars(2) = nr_vars(2) + 1
+        case(CO)
+            nr_vars(1) = nr_vars(1) + 1
+    end select
+    select case(species(6))
+        case(O)
+            nr_vars(4) = nr_vars(4) + 1
+        case(CO)
+            nr_vars(3) = nr_vars(3) + 1
+    end select
+    select case(species(4))
+        case(O)
+            nr_vars(4) = nr_vars(4) + 1
+        case(CO)
+            nr_vars(3) = nr_vars(3) + 1
+    end select
+    select case(species(2))
+        case(O)
+            nr_vars(4) = nr_vars(4) + 1
+        case(CO)
+            nr_vars(3) = nr_vars(3) + 1
+    end select
+
+    gs_CO_oxidation_01 = rate_CO_oxidation_01(nr_vars)
+    return
+
+end function gs_CO_oxidation_01
+
 function rate_CO_oxidation_01(nr_vars)
 
     integer(kind=iint), dimension(4), intent(in) :: nr_vars
@@ -336,6 +466,55 @@ function gr_CO_oxidation_02(cell)
 
 end function gr_CO_oxidation_02
 
+
+function gs_CO_oxidation_02(species)
+    integer(kind=iint), dimension(6), intent(in) :: species
+    integer(kind=iint), dimension(4) :: nr_vars
+    real(kind=rdouble) :: gs_CO_oxidation_02
+
+    nr_vars(:) = 0
+    select case(species(6))
+        case(O)
+            nr_vars(2) = nr_vars(2) + 1
+        case(CO)
+            nr_vars(1) = nr_vars(1) + 1
+    end select
+    select case(species(5))
+        case(O)
+            nr_vars(2) = nr_vars(2) + 1
+        case(CO)
+            nr_vars(1) = nr_vars(1) + 1
+    end select
+    select case(species(4))
+        case(O)
+            nr_vars(2) = nr_vars(2) + 1
+        case(CO)
+            nr_vars(1) = nr_vars(1) + 1
+    end select
+    select case(species(3))
+        case(O)
+            nr_vars(4) = nr_vars(4) + 1
+        case(CO)
+            nr_vars(3) = nr_vars(3) + 1
+    end select
+    select case(species(1))
+        case(O)
+            nr_vars(4) = nr_vars(4) + 1
+        case(CO)
+            nr_vars(3) = nr_vars(3) + 1
+    end select
+    select case(species(2))
+        case(O)
+            nr_vars(4) = nr_vars(4) + 1
+        case(CO)
+            nr_vars(3) = nr_vars(3) + 1
+    end select
+
+    gs_CO_oxidation_02 = rate_CO_oxidation_02(nr_vars)
+    return
+
+end function gs_CO_oxidation_02
+
 function rate_CO_oxidation_02(nr_vars)
 
     integer(kind=iint), dimension(4), intent(in) :: nr_vars
@@ -398,6 +577,55 @@ function gr_CO_oxidation_03(cell)
 
 end function gr_CO_oxidation_03
 
+
+function gs_CO_oxidation_03(species)
+    integer(kind=iint), dimension(6), intent(in) :: species
+    integer(kind=iint), dimension(4) :: nr_vars
+    real(kind=rdouble) :: gs_CO_oxidation_03
+
+    nr_vars(:) = 0
+    select case(species(6))
+        case(O)
+            nr_vars(2) = nr_vars(2) + 1
+        case(CO)
+            nr_vars(1) = nr_vars(1) + 1
+    end select
+    select case(species(4))
+        case(O)
+            nr_vars(2) = nr_vars(2) + 1
+        case(CO)
+            nr_vars(1) = nr_vars(1) + 1
+    end select
+    select case(species(2))
+        case(O)
+            nr_vars(2) = nr_vars(2) + 1
+        case(CO)
+            nr_vars(1) = nr_vars(1) + 1
+    end select
+    select case(species(5))
+        case(O)
+            nr_vars(4) = nr_vars(4) + 1
+        case(CO)
+            nr_vars(3) = nr_vars(3) + 1
+    end select
+    select case(species(1))
+        case(O)
+            nr_vars(4) = nr_vars(4) + 1
+        case(CO)
+            nr_vars(3) = nr_vars(3) + 1
+    end select
+    select case(species(3))
+        case(O)
+            nr_vars(4) = nr_vars(4) + 1
+        case(CO)
+            nr_vars(3) = nr_vars(3) + 1
+    end select
+
+    gs_CO_oxidation_03 = rate_CO_oxidation_03(nr_vars)
+    return
+
+end function gs_CO_oxidation_03
+
 function rate_CO_oxidation_03(nr_vars)
 
     integer(kind=iint), dimension(4), intent(in) :: nr_vars
@@ -500,6 +728,55 @@ function gr_O_ads_00(cell)
 
 end function gr_O_ads_00
 
+
+function gs_O_ads_00(species)
+    integer(kind=iint), dimension(6), intent(in) :: species
+    integer(kind=iint), dimension(2) :: nr_vars
+    real(kind=rdouble) :: gs_O_ads_00
+
+    nr_vars(:) = 0
+    select case(species(6))
+        case(O)
+            nr_vars(2) = nr_vars(2) + 1
+        case(CO)
+            nr_vars(1) = nr_vars(1) + 1
+    end select
+    select case(species(5))
+        case(O)
+            nr_vars(2) = nr_vars(2) + 1
+        case(CO)
+            nr_vars(1) = nr_vars(1) + 1
+    end select
+    select case(species(3))
+        case(O)
+            nr_vars(2) = nr_vars(2) + 1
+        case(CO)
+            nr_vars(1) = nr_vars(1) + 1
+    end select
+    select case(species(1))
+        case(O)
+            nr_vars(2) = nr_vars(2) + 1
+        case(CO)
+            nr_vars(1) = nr_vars(1) + 1
+    end select
+    select case(species(2))
+        case(O)
+            nr_vars(2) = nr_vars(2) + 1
+        case(CO)
+            nr_vars(1) = nr_vars(1) + 1
+    end select
+    select case(species(4))
+        case(O)
+            nr_vars(2) = nr_vars(2) + 1
+        case(CO)
+            nr_vars(1) = nr_vars(1) + 1
+    end select
+
+    gs_O_ads_00 = rate_O_ads_00(nr_vars)
+    return
+
+end function gs_O_ads_00
+
 function rate_O_ads_00(nr_vars)
 
     integer(kind=iint), dimension(2), intent(in) :: nr_vars
@@ -561,6 +838,55 @@ function gr_O_ads_01(cell)
 
 end function gr_O_ads_01
 
+
+function gs_O_ads_01(species)
+    integer(kind=iint), dimension(6), intent(in) :: species
+    integer(kind=iint), dimension(2) :: nr_vars
+    real(kind=rdouble) :: gs_O_ads_01
+
+    nr_vars(:) = 0
+    select case(species(5))
+        case(O)
+            nr_vars(2) = nr_vars(2) + 1
+        case(CO)
+            nr_vars(1) = nr_vars(1) + 1
+    end select
+    select case(species(6))
+        case(O)
+            nr_vars(2) = nr_vars(2) + 1
+        case(CO)
+            nr_vars(1) = nr_vars(1) + 1
+    end select
+    select case(species(4))
+        case(O)
+            nr_vars(2) = nr_vars(2) + 1
+        case(CO)
+            nr_vars(1) = nr_vars(1) + 1
+    end select
+    select case(species(2))
+        case(O)
+            nr_vars(2) = nr_vars(2) + 1
+        case(CO)
+            nr_vars(1) = nr_vars(1) + 1
+    end select
+    select case(species(1))
+        case(O)
+            nr_vars(2) = nr_vars(2) + 1
+        case(CO)
+            nr_vars(1) = nr_vars(1) + 1
+    end select
+    select case(species(3))
+        case(O)
+            nr_vars(2) = nr_vars(2) + 1
+        case(CO)
+            nr_vars(1) = nr_vars(1) + 1
+    end select
+
+    gs_O_ads_01 = rate_O_ads_01(nr_vars)
+    return
+
+end function gs_O_ads_01
+
 function rate_O_ads_01(nr_vars)
 
     integer(kind=iint), dimension(2), intent(in) :: nr_vars
@@ -7,6 +7,7 @@ use lattice, only: &
     del_proc, &
     add_proc, &
     replace_species, &
+    update_rates_matrix, &
     get_species
 use proclist_constants, only: &
     CO, &
@@ -32,7 +33,15 @@ use proclist_pars, only: &
     gr_O2_des_right, &
     gr_O2_des_up, &
     gr_O_ads_00, &
-    gr_O_ads_01
+    gr_O_ads_01, &
+    gs_CO_oxidation_00, &
+    gs_CO_oxidation_02, &
+    gs_O_ads_00, &
+    gs_CO_oxidation_01, &
+    gs_CO_oxidation_03, &
+    gs_O_ads_01, &
+    read_bystanders_1, &
+    read_bystanders_2
 
 implicit none
 contains
@@ -41,6 +50,29 @@ subroutine run_proc_CO_oxidation_00(cell)
 
     integer(kind=iint), dimension(4), intent(in) :: cell
 
+    integer(kind=iint), dimension(6) :: bystanders_1
+    integer(kind=iint), dimension(6) :: bystanders_2
+    integer(kind=iint), dimension(6) :: bystanders_3
+    integer(kind=iint), dimension(6) :: bystanders_4
+    integer(kind=iint), dimension(6) :: bystanders_5
+    integer(kind=iint), dimension(6) :: bystanders_6
+    integer(kind=iint), dimension(6) :: bystanders_7
+    integer(kind=iint), dimension(6) :: bystanders_8
+    integer(kind=iint), dimension(6) :: bystanders_9
+    integer(kind=iint), dimension(6) :: bystanders_10
+    integer(kind=iint), dimension(6) :: bystanders_11
+    integer(kind=iint), dimension(6) :: bystanders_12
+    integer(kind=iint), dimension(6) :: bystanders_13
+    integer(kind=iint), dimension(6) :: bystanders_14
+    integer(kind=iint), dimension(6) :: bystanders_15
+    integer(kind=iint), dimension(6) :: bystanders_16
+    integer(kind=iint), dimension(6) :: bystanders_17
+    integer(kind=iint), dimension(6) :: bystanders_18
+    integer(kind=iint), dimension(6) :: bystanders_19
+    integer(kind=iint), dimension(6) :: bystanders_20
+    integer(kind=iint), dimension(6) :: bystanders_21
+    integer(kind=iint), dimension(6) :: bystanders_22
+    logical, dimension(22) :: bystanders_read
 
 ! Disable processes
 
@@ -117,6 +149,7 @@ subroutine run_proc_CO_oxidation_00(cell)
 ! Update the lattice
     call replace_species(cell + (/0, 0, 0, square_default/),CO,empty)
     call replace_species(cell + (/1, 0, 0, square_default/),O,empty)
+    bystanders_read = .false.
 
 ! Update rate constants
 
@@ -145,166 +178,382 @@ subroutine run_proc_CO_oxidation_00(cell)
         call update_rates_matrix(CO_ads,cell + (/ 1, -1, 0, 1/),gr_CO_ads(cell + (/ 1, -1, 0, 0/)))
     end if
     if(can_do(CO_oxidation_00,cell + (/ 1, 1, 0, 1/))) then
-        call update_rates_matrix(CO_oxidation_00,cell + (/ 1, 1, 0, 1/),gr_CO_oxidation_00(cell + (/ 1, 1, 0, 0/)))
+        if(.not.bystanders_read(1))then
+            call read_bystanders_1(cell + (/ 0, 0, 0, 0/), bystanders_1)
+            bystanders_read(1) = .true.
+        endif
+        call update_rates_matrix(CO_oxidation_00,cell + (/ 1, 1, 0, 1/),gs_CO_oxidation_00(bystanders_1))
     end if
     if(can_do(CO_oxidation_00,cell + (/ 0, 1, 0, 1/))) then
-        call update_rates_matrix(CO_oxidation_00,cell + (/ 0, 1, 0, 1/),gr_CO_oxidation_00(cell + (/ 0, 1, 0, 0/)))
+        if(.not.bystanders_read(2))then
+            call read_bystanders_1(cell + (/ -1, 0, 0, 0/), bystanders_2)
+            bystanders_read(2) = .true.
+        endif
+        call update_rates_matrix(CO_oxidation_00,cell + (/ 0, 1, 0, 1/),gs_CO_oxidation_00(bystanders_2))
     end if
     if(can_do(CO_oxidation_00,cell + (/ 0, -1, 0, 1/))) then
-        call update_rates_matrix(CO_oxidation_00,cell + (/ 0, -1, 0, 1/),gr_CO_oxidation_00(cell + (/ 0, -1, 0, 0/)))
+        if(.not.bystanders_read(3))then
+            call read_bystanders_1(cell + (/ -1, -2, 0, 0/), bystanders_3)
+            bystanders_read(3) = .true.
+        endif
+        call update_rates_matrix(CO_oxidation_00,cell + (/ 0, -1, 0, 1/),gs_CO_oxidation_00(bystanders_3))
     end if
     if(can_do(CO_oxidation_00,cell + (/ -2, 0, 0, 1/))) then
-        call update_rates_matrix(CO_oxidation_00,cell + (/ -2, 0, 0, 1/),gr_CO_oxidation_00(cell + (/ -2, 0, 0, 0/)))
+        if(.not.bystanders_read(4))then
+            call read_bystanders_1(cell + (/ -3, -1, 0, 0/), bystanders_4)
+            bystanders_read(4) = .true.
+        endif
+        call update_rates_matrix(CO_oxidation_00,cell + (/ -2, 0, 0, 1/),gs_CO_oxidation_00(bystanders_4))
     end if
     if(can_do(CO_oxidation_00,cell + (/ -1, 1, 0, 1/))) then
-        call update_rates_matrix(CO_oxidation_00,cell + (/ -1, 1, 0, 1/),gr_CO_oxidation_00(cell + (/ -1, 1, 0, 0/)))
+        if(.not.bystanders_read(5))then
+            call read_bystanders_1(cell + (/ -2, 0, 0, 0/), bystanders_5)
+            bystanders_read(5) = .true.
+        endif
+        call update_rates_matrix(CO_oxidation_00,cell + (/ -1, 1, 0, 1/),gs_CO_oxidation_00(bystanders_5))
     end if
     if(can_do(CO_oxidation_00,cell + (/ 2, 0, 0, 1/))) then
-        call update_rates_matrix(CO_oxidation_00,cell + (/ 2, 0, 0, 1/),gr_CO_oxidation_00(cell + (/ 2, 0, 0, 0/)))
+        if(.not.bystanders_read(6))then
+            call read_bystanders_1(cell + (/ 1, -1, 0, 0/), bystanders_6)
+            bystanders_read(6) = .true.
+        endif
+        call update_rates_matrix(CO_oxidation_00,cell + (/ 2, 0, 0, 1/),gs_CO_oxidation_00(bystanders_6))
     end if
     if(can_do(CO_oxidation_00,cell + (/ 1, -1, 0, 1/))) then
-        call update_rates_matrix(CO_oxidation_00,cell + (/ 1, -1, 0, 1/),gr_CO_oxidation_00(cell + (/ 1, -1, 0, 0/)))
+        if(.not.bystanders_read(7))then
+            call read_bystanders_1(cell + (/ 0, -2, 0, 0/), bystanders_7)
+            bystanders_read(7) = .true.
+        endif
+        call update_rates_matrix(CO_oxidation_00,cell + (/ 1, -1, 0, 1/),gs_CO_oxidation_00(bystanders_7))
     end if
     if(can_do(CO_oxidation_00,cell + (/ -1, -1, 0, 1/))) then
-        call update_rates_matrix(CO_oxidation_00,cell + (/ -1, -1, 0, 1/),gr_CO_oxidation_00(cell + (/ -1, -1, 0, 0/)))
+        if(.not.bystanders_read(8))then
+            call read_bystanders_1(cell + (/ -2, -2, 0, 0/), bystanders_8)
+            bystanders_read(8) = .true.
+        endif
+        call update_rates_matrix(CO_oxidation_00,cell + (/ -1, -1, 0, 1/),gs_CO_oxidation_00(bystanders_8))
     end if
     if(can_do(CO_oxidation_01,cell + (/ 2, -1, 0, 1/))) then
-        call update_rates_matrix(CO_oxidation_01,cell + (/ 2, -1, 0, 1/),gr_CO_oxidation_01(cell + (/ 2, -1, 0, 0/)))
+        if(.not.bystanders_read(9))then
+            call read_bystanders_2(cell + (/ 1, -2, 0, 0/), bystanders_9)
+            bystanders_read(9) = .true.
+        endif
+        call update_rates_matrix(CO_oxidation_01,cell + (/ 2, -1, 0, 1/),gs_CO_oxidation_01(bystanders_9))
     end if
     if(can_do(CO_oxidation_01,cell + (/ 1, 1, 0, 1/))) then
-        call update_rates_matrix(CO_oxidation_01,cell + (/ 1, 1, 0, 1/),gr_CO_oxidation_01(cell + (/ 1, 1, 0, 0/)))
+        if(.not.bystanders_read(10))then
+            call read_bystanders_2(cell + (/ 0, 0, 0, 0/), bystanders_10)
+            bystanders_read(10) = .true.
+        endif
+        call update_rates_matrix(CO_oxidation_01,cell + (/ 1, 1, 0, 1/),gs_CO_oxidation_01(bystanders_10))
     end if
     if(can_do(CO_oxidation_01,cell + (/ 0, 1, 0, 1/))) then
-        call update_rates_matrix(CO_oxidation_01,cell + (/ 0, 1, 0, 1/),gr_CO_oxidation_01(cell + (/ 0, 1, 0, 0/)))
+        if(.not.bystanders_read(11))then
+            call read_bystanders_2(cell + (/ -1, 0, 0, 0/), bystanders_11)
+            bystanders_read(11) = .true.
+        endif
+        call update_rates_matrix(CO_oxidation_01,cell + (/ 0, 1, 0, 1/),gs_CO_oxidation_01(bystanders_11))
     end if
     if(can_do(CO_oxidation_01,cell + (/ 1, -2, 0, 1/))) then
-        call update_rates_matrix(CO_oxidation_01,cell + (/ 1, -2, 0, 1/),gr_CO_oxidation_01(cell + (/ 1, -2, 0, 0/)))
+        if(.not.bystanders_read(12))then
+            call read_bystanders_2(cell + (/ 0, -3, 0, 0/), bystanders_12)
+            bystanders_read(12) = .true.
+        endif
+        call update_rates_matrix(CO_oxidation_01,cell + (/ 1, -2, 0, 1/),gs_CO_oxidation_01(bystanders_12))
     end if
     if(can_do(CO_oxidation_01,cell + (/ 0, -2, 0, 1/))) then
-        call update_rates_matrix(CO_oxidation_01,cell + (/ 0, -2, 0, 1/),gr_CO_oxidation_01(cell + (/ 0, -2, 0, 0/)))
+        if(.not.bystanders_read(13))then
+            call read_bystanders_2(cell + (/ -1, -3, 0, 0/), bystanders_13)
+            bystanders_read(13) = .true.
+        endif
+        call update_rates_matrix(CO_oxidation_01,cell + (/ 0, -2, 0, 1/),gs_CO_oxidation_01(bystanders_13))
     end if
     if(can_do(CO_oxidation_01,cell + (/ -1, 0, 0, 1/))) then
-        call update_rates_matrix(CO_oxidation_01,cell + (/ -1, 0, 0, 1/),gr_CO_oxidation_01(cell + (/ -1, 0, 0, 0/)))
+        if(.not.bystanders_read(14))then
+            call read_bystanders_2(cell + (/ -2, -1, 0, 0/), bystanders_14)
+            bystanders_read(14) = .true.
+        endif
+        call update_rates_matrix(CO_oxidation_01,cell + (/ -1, 0, 0, 1/),gs_CO_oxidation_01(bystanders_14))
     end if
     if(can_do(CO_oxidation_01,cell + (/ 2, 0, 0, 1/))) then
-        call update_rates_matrix(CO_oxidation_01,cell + (/ 2, 0, 0, 1/),gr_CO_oxidation_01(cell + (/ 2, 0, 0, 0/)))
+        if(.not.bystanders_read(15))then
+            call read_bystanders_2(cell + (/ 1, -1, 0, 0/), bystanders_15)
+            bystanders_read(15) = .true.
+        endif
+        call update_rates_matrix(CO_oxidation_01,cell + (/ 2, 0, 0, 1/),gs_CO_oxidation_01(bystanders_15))
     end if
     if(can_do(CO_oxidation_01,cell + (/ -1, -1, 0, 1/))) then
-        call update_rates_matrix(CO_oxidation_01,cell + (/ -1, -1, 0, 1/),gr_CO_oxidation_01(cell + (/ -1, -1, 0, 0/)))
+        if(.not.bystanders_read(16))then
+            call read_bystanders_2(cell + (/ -2, -2, 0, 0/), bystanders_16)
+            bystanders_read(16) = .true.
+        endif
+        call update_rates_matrix(CO_oxidation_01,cell + (/ -1, -1, 0, 1/),gs_CO_oxidation_01(bystanders_16))
     end if
     if(can_do(CO_oxidation_02,cell + (/ 2, -1, 0, 1/))) then
-        call update_rates_matrix(CO_oxidation_02,cell + (/ 2, -1, 0, 1/),gr_CO_oxidation_02(cell + (/ 2, -1, 0, 0/)))
+        if(.not.bystanders_read(7))then
+            call read_bystanders_1(cell + (/ 0, -2, 0, 0/), bystanders_7)
+            bystanders_read(7) = .true.
+        endif
+        call update_rates_matrix(CO_oxidation_02,cell + (/ 2, -1, 0, 1/),gs_CO_oxidation_02(bystanders_7))
     end if
     if(can_do(CO_oxidation_02,cell + (/ 1, 1, 0, 1/))) then
-        call update_rates_matrix(CO_oxidation_02,cell + (/ 1, 1, 0, 1/),gr_CO_oxidation_02(cell + (/ 1, 1, 0, 0/)))
+        if(.not.bystanders_read(2))then
+            call read_bystanders_1(cell + (/ -1, 0, 0, 0/), bystanders_2)
+            bystanders_read(2) = .true.
+        endif
+        call update_rates_matrix(CO_oxidation_02,cell + (/ 1, 1, 0, 1/),gs_CO_oxidation_02(bystanders_2))
     end if
     if(can_do(CO_oxidation_02,cell + (/ 0, 1, 0, 1/))) then
-        call update_rates_matrix(CO_oxidation_02,cell + (/ 0, 1, 0, 1/),gr_CO_oxidation_02(cell + (/ 0, 1, 0, 0/)))
+        if(.not.bystanders_read(5))then
+            call read_bystanders_1(cell + (/ -2, 0, 0, 0/), bystanders_5)
+            bystanders_read(5) = .true.
+        endif
+        call update_rates_matrix(CO_oxidation_02,cell + (/ 0, 1, 0, 1/),gs_CO_oxidation_02(bystanders_5))
     end if
     if(can_do(CO_oxidation_02,cell + (/ 3, 0, 0, 1/))) then
-        call update_rates_matrix(CO_oxidation_02,cell + (/ 3, 0, 0, 1/),gr_CO_oxidation_02(cell + (/ 3, 0, 0, 0/)))
+        if(.not.bystanders_read(6))then
+            call read_bystanders_1(cell + (/ 1, -1, 0, 0/), bystanders_6)
+            bystanders_read(6) = .true.
+        endif
+        call update_rates_matrix(CO_oxidation_02,cell + (/ 3, 0, 0, 1/),gs_CO_oxidation_02(bystanders_6))
     end if
     if(can_do(CO_oxidation_02,cell + (/ 2, 1, 0, 1/))) then
-        call update_rates_matrix(CO_oxidation_02,cell + (/ 2, 1, 0, 1/),gr_CO_oxidation_02(cell + (/ 2, 1, 0, 0/)))
+        if(.not.bystanders_read(1))then
+            call read_bystanders_1(cell + (/ 0, 0, 0, 0/), bystanders_1)
+            bystanders_read(1) = .true.
+        endif
+        call update_rates_matrix(CO_oxidation_02,cell + (/ 2, 1, 0, 1/),gs_CO_oxidation_02(bystanders_1))
     end if
     if(can_do(CO_oxidation_02,cell + (/ 0, -1, 0, 1/))) then
-        call update_rates_matrix(CO_oxidation_02,cell + (/ 0, -1, 0, 1/),gr_CO_oxidation_02(cell + (/ 0, -1, 0, 0/)))
+        if(.not.bystanders_read(8))then
+            call read_bystanders_1(cell + (/ -2, -2, 0, 0/), bystanders_8)
+            bystanders_read(8) = .true.
+        endif
+        call update_rates_matrix(CO_oxidation_02,cell + (/ 0, -1, 0, 1/),gs_CO_oxidation_02(bystanders_8))
     end if
     if(can_do(CO_oxidation_02,cell + (/ -1, 0, 0, 1/))) then
-        call update_rates_matrix(CO_oxidation_02,cell + (/ -1, 0, 0, 1/),gr_CO_oxidation_02(cell + (/ -1, 0, 0, 0/)))
+        if(.not.bystanders_read(4))then
+            call read_bystanders_1(cell + (/ -3, -1, 0, 0/), bystanders_4)
+            bystanders_read(4) = .true.
+        endif
+        call update_rates_matrix(CO_oxidation_02,cell + (/ -1, 0, 0, 1/),gs_CO_oxidation_02(bystanders_4))
     end if
     if(can_do(CO_oxidation_02,cell + (/ 1, -1, 0, 1/))) then
-        call update_rates_matrix(CO_oxidation_02,cell + (/ 1, -1, 0, 1/),gr_CO_oxidation_02(cell + (/ 1, -1, 0, 0/)))
+        if(.not.bystanders_read(3))then
+            call read_bystanders_1(cell + (/ -1, -2, 0, 0/), bystanders_3)
+            bystanders_read(3) = .true.
+        endif
+        call update_rates_matrix(CO_oxidation_02,cell + (/ 1, -1, 0, 1/),gs_CO_oxidation_02(bystanders_3))
     end if
     if(can_do(CO_oxidation_03,cell + (/ 1, 2, 0, 1/))) then
-        call update_rates_matrix(CO_oxidation_03,cell + (/ 1, 2, 0, 1/),gr_CO_oxidation_03(cell + (/ 1, 2, 0, 0/)))
+        if(.not.bystanders_read(10))then
+            call read_bystanders_2(cell + (/ 0, 0, 0, 0/), bystanders_10)
+            bystanders_read(10) = .true.
+        endif
+        call update_rates_matrix(CO_oxidation_03,cell + (/ 1, 2, 0, 1/),gs_CO_oxidation_03(bystanders_10))
     end if
     if(can_do(CO_oxidation_03,cell + (/ 0, 2, 0, 1/))) then
-        call update_rates_matrix(CO_oxidation_03,cell + (/ 0, 2, 0, 1/),gr_CO_oxidation_03(cell + (/ 0, 2, 0, 0/)))
+        if(.not.bystanders_read(11))then
+            call read_bystanders_2(cell + (/ -1, 0, 0, 0/), bystanders_11)
+            bystanders_read(11) = .true.
+        endif
+        call update_rates_matrix(CO_oxidation_03,cell + (/ 0, 2, 0, 1/),gs_CO_oxidation_03(bystanders_11))
     end if
     if(can_do(CO_oxidation_03,cell + (/ 2, 1, 0, 1/))) then
-        call update_rates_matrix(CO_oxidation_03,cell + (/ 2, 1, 0, 1/),gr_CO_oxidation_03(cell + (/ 2, 1, 0, 0/)))
+        if(.not.bystanders_read(15))then
+            call read_bystanders_2(cell + (/ 1, -1, 0, 0/), bystanders_15)
+            bystanders_read(15) = .true.
+        endif
+        call update_rates_matrix(CO_oxidation_03,cell + (/ 2, 1, 0, 1/),gs_CO_oxidation_03(bystanders_15))
     end if
     if(can_do(CO_oxidation_03,cell + (/ 0, -1, 0, 1/))) then
-        call update_rates_matrix(CO_oxidation_03,cell + (/ 0, -1, 0, 1/),gr_CO_oxidation_03(cell + (/ 0, -1, 0, 0/)))
+        if(.not.bystanders_read(13))then
+            call read_bystanders_2(cell + (/ -1, -3, 0, 0/), bystanders_13)
+            bystanders_read(13) = .true.
+        endif
+        call update_rates_matrix(CO_oxidation_03,cell + (/ 0, -1, 0, 1/),gs_CO_oxidation_03(bystanders_13))
     end if
     if(can_do(CO_oxidation_03,cell + (/ -1, 0, 0, 1/))) then
-        call update_rates_matrix(CO_oxidation_03,cell + (/ -1, 0, 0, 1/),gr_CO_oxidation_03(cell + (/ -1, 0, 0, 0/)))
+        if(.not.bystanders_read(16))then
+            call read_bystanders_2(cell + (/ -2, -2, 0, 0/), bystanders_16)
+            bystanders_read(16) = .true.
+        endif
+        call update_rates_matrix(CO_oxidation_03,cell + (/ -1, 0, 0, 1/),gs_CO_oxidation_03(bystanders_16))
     end if
     if(can_do(CO_oxidation_03,cell + (/ -1, 1, 0, 1/))) then
-        call update_rates_matrix(CO_oxidation_03,cell + (/ -1, 1, 0, 1/),gr_CO_oxidation_03(cell + (/ -1, 1, 0, 0/)))
+        if(.not.bystanders_read(14))then
+            call read_bystanders_2(cell + (/ -2, -1, 0, 0/), bystanders_14)
+            bystanders_read(14) = .true.
+        endif
+        call update_rates_matrix(CO_oxidation_03,cell + (/ -1, 1, 0, 1/),gs_CO_oxidation_03(bystanders_14))
     end if
     if(can_do(CO_oxidation_03,cell + (/ 2, 0, 0, 1/))) then
-        call update_rates_matrix(CO_oxidation_03,cell + (/ 2, 0, 0, 1/),gr_CO_oxidation_03(cell + (/ 2, 0, 0, 0/)))
+        if(.not.bystanders_read(9))then
+            call read_bystanders_2(cell + (/ 1, -2, 0, 0/), bystanders_9)
+            bystanders_read(9) = .true.
+        endif
+        call update_rates_matrix(CO_oxidation_03,cell + (/ 2, 0, 0, 1/),gs_CO_oxidation_03(bystanders_9))
     end if
     if(can_do(CO_oxidation_03,cell + (/ 1, -1, 0, 1/))) then
-        call update_rates_matrix(CO_oxidation_03,cell + (/ 1, -1, 0, 1/),gr_CO_oxidation_03(cell + (/ 1, -1, 0, 0/)))
+        if(.not.bystanders_read(12))then
+            call read_bystanders_2(cell + (/ 0, -3, 0, 0/), bystanders_12)
+            bystanders_read(12) = .true.
+        endif
+        call update_rates_matrix(CO_oxidation_03,cell + (/ 1, -1, 0, 1/),gs_CO_oxidation_03(bystanders_12))
     end if
     if(can_do(O_ads_00,cell + (/ 1, 1, 0, 1/))) then
-        call update_rates_matrix(O_ads_00,cell + (/ 1, 1, 0, 1/),gr_O_ads_00(cell + (/ 1, 1, 0, 0/)))
+        if(.not.bystanders_read(1))then
+            call read_bystanders_1(cell + (/ 0, 0, 0, 0/), bystanders_1)
+            bystanders_read(1) = .true.
+        endif
+        call update_rates_matrix(O_ads_00,cell + (/ 1, 1, 0, 1/),gs_O_ads_00(bystanders_1))
     end if
     if(can_do(O_ads_00,cell + (/ 0, 1, 0, 1/))) then
-        call update_rates_matrix(O_ads_00,cell + (/ 0, 1, 0, 1/),gr_O_ads_00(cell + (/ 0, 1, 0, 0/)))
+        if(.not.bystanders_read(2))then
+            call read_bystanders_1(cell + (/ -1, 0, 0, 0/), bystanders_2)
+            bystanders_read(2) = .true.
+        endif
+        call update_rates_matrix(O_ads_00,cell + (/ 0, 1, 0, 1/),gs_O_ads_00(bystanders_2))
     end if
     if(can_do(O_ads_00,cell + (/ 0, -1, 0, 1/))) then
-        call update_rates_matrix(O_ads_00,cell + (/ 0, -1, 0, 1/),gr_O_ads_00(cell + (/ 0, -1, 0, 0/)))
+        if(.not.bystanders_read(3))then
+            call read_bystanders_1(cell + (/ -1, -2, 0, 0/), bystanders_3)
+            bystanders_read(3) = .true.
+        endif
+        call update_rates_matrix(O_ads_00,cell + (/ 0, -1, 0, 1/),gs_O_ads_00(bystanders_3))
     end if
     if(can_do(O_ads_00,cell + (/ 1, 0, 0, 1/))) then
-        call update_rates_matrix(O_ads_00,cell + (/ 1, 0, 0, 1/),gr_O_ads_00(cell + (/ 1, 0, 0, 0/)))
+        if(.not.bystanders_read(17))then
+            call read_bystanders_1(cell + (/ 0, -1, 0, 0/), bystanders_17)
+            bystanders_read(17) = .true.
+        endif
+        call update_rates_matrix(O_ads_00,cell + (/ 1, 0, 0, 1/),gs_O_ads_00(bystanders_17))
     end if
     if(can_do(O_ads_00,cell + (/ -2, 0, 0, 1/))) then
-        call update_rates_matrix(O_ads_00,cell + (/ -2, 0, 0, 1/),gr_O_ads_00(cell + (/ -2, 0, 0, 0/)))
+        if(.not.bystanders_read(4))then
+            call read_bystanders_1(cell + (/ -3, -1, 0, 0/), bystanders_4)
+            bystanders_read(4) = .true.
+        endif
+        call update_rates_matrix(O_ads_00,cell + (/ -2, 0, 0, 1/),gs_O_ads_00(bystanders_4))
     end if
     if(can_do(O_ads_00,cell + (/ -1, 0, 0, 1/))) then
-        call update_rates_matrix(O_ads_00,cell + (/ -1, 0, 0, 1/),gr_O_ads_00(cell + (/ -1, 0, 0, 0/)))
+        if(.not.bystanders_read(18))then
+            call read_bystanders_1(cell + (/ -2, -1, 0, 0/), bystanders_18)
+            bystanders_read(18) = .true.
+        endif
+        call update_rates_matrix(O_ads_00,cell + (/ -1, 0, 0, 1/),gs_O_ads_00(bystanders_18))
     end if
     if(can_do(O_ads_00,cell + (/ -1, 1, 0, 1/))) then
-        call update_rates_matrix(O_ads_00,cell + (/ -1, 1, 0, 1/),gr_O_ads_00(cell + (/ -1, 1, 0, 0/)))
+        if(.not.bystanders_read(5))then
+            call read_bystanders_1(cell + (/ -2, 0, 0, 0/), bystanders_5)
+            bystanders_read(5) = .true.
+        endif
+        call update_rates_matrix(O_ads_00,cell + (/ -1, 1, 0, 1/),gs_O_ads_00(bystanders_5))
     end if
     if(can_do(O_ads_00,cell + (/ 2, 0, 0, 1/))) then
-        call update_rates_matrix(O_ads_00,cell + (/ 2, 0, 0, 1/),gr_O_ads_00(cell + (/ 2, 0, 0, 0/)))
+        if(.not.bystanders_read(6))then
+            call read_bystanders_1(cell + (/ 1, -1, 0, 0/), bystanders_6)
+            bystanders_read(6) = .true.
+        endif
+        call update_rates_matrix(O_ads_00,cell + (/ 2, 0, 0, 1/),gs_O_ads_00(bystanders_6))
     end if
     if(can_do(O_ads_00,cell + (/ 1, -1, 0, 1/))) then
-        call update_rates_matrix(O_ads_00,cell + (/ 1, -1, 0, 1/),gr_O_ads_00(cell + (/ 1, -1, 0, 0/)))
+        if(.not.bystanders_read(7))then
+            call read_bystanders_1(cell + (/ 0, -2, 0, 0/), bystanders_7)
+            bystanders_read(7) = .true.
+        endif
+        call update_rates_matrix(O_ads_00,cell + (/ 1, -1, 0, 1/),gs_O_ads_00(bystanders_7))
     end if
     if(can_do(O_ads_00,cell + (/ -1, -1, 0, 1/))) then
-        call update_rates_matrix(O_ads_00,cell + (/ -1, -1, 0, 1/),gr_O_ads_00(cell + (/ -1, -1, 0, 0/)))
+        if(.not.bystanders_read(8))then
+            call read_bystanders_1(cell + (/ -2, -2, 0, 0/), bystanders_8)
+            bystanders_read(8) = .true.
+        endif
+        call update_rates_matrix(O_ads_00,cell + (/ -1, -1, 0, 1/),gs_O_ads_00(bystanders_8))
     end if
     if(can_do(O_ads_01,cell + (/ 2, -1, 0, 1/))) then
-        call update_rates_matrix(O_ads_01,cell + (/ 2, -1, 0, 1/),gr_O_ads_01(cell + (/ 2, -1, 0, 0/)))
+        if(.not.bystanders_read(9))then
+            call read_bystanders_2(cell + (/ 1, -2, 0, 0/), bystanders_9)
+            bystanders_read(9) = .true.
+        endif
+        call update_rates_matrix(O_ads_01,cell + (/ 2, -1, 0, 1/),gs_O_ads_01(bystanders_9))
     end if
     if(can_do(O_ads_01,cell + (/ 1, 1, 0, 1/))) then
-        call update_rates_matrix(O_ads_01,cell + (/ 1, 1, 0, 1/),gr_O_ads_01(cell + (/ 1, 1, 0, 0/)))
+        if(.not.bystanders_read(10))then
+            call read_bystanders_2(cell + (/ 0, 0, 0, 0/), bystanders_10)
+            bystanders_read(10) = .true.
+        endif
+        call update_rates_matrix(O_ads_01,cell + (/ 1, 1, 0, 1/),gs_O_ads_01(bystanders_10))
     end if
     if(can_do(O_ads_01,cell + (/ 0, 1, 0, 1/))) then
-        call update_rates_matrix(O_ads_01,cell + (/ 0, 1, 0, 1/),gr_O_ads_01(cell + (/ 0, 1, 0, 0/)))
+        if(.not.bystanders_read(11))then
+            call read_bystanders_2(cell + (/ -1, 0, 0, 0/), bystanders_11)
+            bystanders_read(11) = .true.
+        endif
+        call update_rates_matrix(O_ads_01,cell + (/ 0, 1, 0, 1/),gs_O_ads_01(bystanders_11))
     end if
     if(can_do(O_ads_01,cell + (/ 1, -2, 0, 1/))) then
-        call update_rates_matrix(O_ads_01,cell + (/ 1, -2, 0, 1/),gr_O_ads_01(cell + (/ 1, -2, 0, 0/)))
+        if(.not.bystanders_read(12))then
+            call read_bystanders_2(cell + (/ 0, -3, 0, 0/), bystanders_12)
+            bystanders_read(12) = .true.
+        endif
+        call update_rates_matrix(O_ads_01,cell + (/ 1, -2, 0, 1/),gs_O_ads_01(bystanders_12))
     end if
     if(can_do(O_ads_01,cell + (/ 0, 0, 0, 1/))) then
-        call update_rates_matrix(O_ads_01,cell + (/ 0, 0, 0, 1/),gr_O_ads_01(cell + (/ 0, 0, 0, 0/)))
+        if(.not.bystanders_read(19))then
+            call read_bystanders_2(cell + (/ -1, -1, 0, 0/), bystanders_19)
+            bystanders_read(19) = .true.
+        endif
+        call update_rates_matrix(O_ads_01,cell + (/ 0, 0, 0, 1/),gs_O_ads_01(bystanders_19))
     end if
     if(can_do(O_ads_01,cell + (/ 0, -2, 0, 1/))) then
-        call update_rates_matrix(O_ads_01,cell + (/ 0, -2, 0, 1/),gr_O_ads_01(cell + (/ 0, -2, 0, 0/)))
+        if(.not.bystanders_read(13))then
+            call read_bystanders_2(cell + (/ -1, -3, 0, 0/), bystanders_13)
+            bystanders_read(13) = .true.
+        endif
+        call update_rates_matrix(O_ads_01,cell + (/ 0, -2, 0, 1/),gs_O_ads_01(bystanders_13))
     end if
     if(can_do(O_ads_01,cell + (/ 0, -1, 0, 1/))) then
-        call update_rates_matrix(O_ads_01,cell + (/ 0, -1, 0, 1/),gr_O_ads_01(cell + (/ 0, -1, 0, 0/)))
+        if(.not.bystanders_read(20))then
+            call read_bystanders_2(cell + (/ -1, -2, 0, 0/), bystanders_20)
+            bystanders_read(20) = .true.
+        endif
+        call update_rates_matrix(O_ads_01,cell + (/ 0, -1, 0, 1/),gs_O_ads_01(bystanders_20))
     end if
     if(can_do(O_ads_01,cell + (/ 1, 0, 0, 1/))) then
-        call update_rates_matrix(O_ads_01,cell + (/ 1, 0, 0, 1/),gr_O_ads_01(cell + (/ 1, 0, 0, 0/)))
+        if(.not.bystanders_read(21))then
+            call read_bystanders_2(cell + (/ 0, -1, 0, 0/), bystanders_21)
+            bystanders_read(21) = .true.
+        endif
+        call update_rates_matrix(O_ads_01,cell + (/ 1, 0, 0, 1/),gs_O_ads_01(bystanders_21))
     end if
     if(can_do(O_ads_01,cell + (/ -1, 0, 0, 1/))) then
-        call update_rates_matrix(O_ads_01,cell + (/ -1, 0, 0, 1/),gr_O_ads_01(cell + (/ -1, 0, 0, 0/)))
+        if(.not.bystanders_read(14))then
+            call read_bystanders_2(cell + (/ -2, -1, 0, 0/), bystanders_14)
+            bystanders_read(14) = .true.
+        endif
+        call update_rates_matrix(O_ads_01,cell + (/ -1, 0, 0, 1/),gs_O_ads_01(bystanders_14))
     end if
     if(can_do(O_ads_01,cell + (/ 2, 0, 0, 1/))) then
-        call update_rates_matrix(O_ads_01,cell + (/ 2, 0, 0, 1/),gr_O_ads_01(cell + (/ 2, 0, 0, 0/)))
+        if(.not.bystanders_read(15))then
+            call read_bystanders_2(cell + (/ 1, -1, 0, 0/), bystanders_15)
+            bystanders_read(15) = .true.
+        endif
+        call update_rates_matrix(O_ads_01,cell + (/ 2, 0, 0, 1/),gs_O_ads_01(bystanders_15))
     end if
     if(can_do(O_ads_01,cell + (/ 1, -1, 0, 1/))) then
-        call update_rates_matrix(O_ads_01,cell + (/ 1, -1, 0, 1/),gr_O_ads_01(cell + (/ 1, -1, 0, 0/)))
+        if(.not.bystanders_read(22))then
+            call read_bystanders_2(cell + (/ 0, -2, 0, 0/), bystanders_22)
+            bystanders_read(22) = .true.
+        endif
+        call update_rates_matrix(O_ads_01,cell + (/ 1, -1, 0, 1/),gs_O_ads_01(bystanders_22))
     end if
     if(can_do(O_ads_01,cell + (/ -1, -1, 0, 1/))) then
-        call update_rates_matrix(O_ads_01,cell + (/ -1, -1, 0, 1/),gr_O_ads_01(cell + (/ -1, -1, 0, 0/)))
+        if(.not.bystanders_read(16))then
+            call read_bystanders_2(cell + (/ -2, -2, 0, 0/), bystanders_16)
+            bystanders_read(16) = .true.
+        endif
+        call update_rates_matrix(O_ads_01,cell + (/ -1, -1, 0, 1/),gs_O_ads_01(bystanders_16))
     end if
 
 ! Enable processes
@@ -314,32 +563,56 @@ subroutine run_proc_CO_oxidation_00(cell)
     call add_proc(O_ads_00, cell + (/ 0, 0, 0, 1/), gr_O_ads_00(cell + (/ 0, 0, 0, 0/)))
     select case(get_species(cell + (/2, 0, 0, square_default/)))
     case(empty)
-        call add_proc(O_ads_00, cell + (/ 1, 0, 0, 1/), gr_O_ads_00(cell + (/ 1, 0, 0, 0/)))
+        if(.not.bystanders_read(17))then
+            call read_bystanders_1(cell + (/ 0, -1, 0, 0/), bystanders_17)
+            bystanders_read(17) = .true.
+        endif
+        call add_proc(O_ads_00, cell + (/ 1, 0, 0, 1/), gs_O_ads_00(bystanders_17))
     end select
 
     select case(get_species(cell + (/-1, 0, 0, square_default/)))
     case(empty)
-        call add_proc(O_ads_00, cell + (/ -1, 0, 0, 1/), gr_O_ads_00(cell + (/ -1, 0, 0, 0/)))
+        if(.not.bystanders_read(18))then
+            call read_bystanders_1(cell + (/ -2, -1, 0, 0/), bystanders_18)
+            bystanders_read(18) = .true.
+        endif
+        call add_proc(O_ads_00, cell + (/ -1, 0, 0, 1/), gs_O_ads_00(bystanders_18))
     end select
 
     select case(get_species(cell + (/1, 1, 0, square_default/)))
     case(empty)
-        call add_proc(O_ads_01, cell + (/ 1, 0, 0, 1/), gr_O_ads_01(cell + (/ 1, 0, 0, 0/)))
+        if(.not.bystanders_read(21))then
+            call read_bystanders_2(cell + (/ 0, -1, 0, 0/), bystanders_21)
+            bystanders_read(21) = .true.
+        endif
+        call add_proc(O_ads_01, cell + (/ 1, 0, 0, 1/), gs_O_ads_01(bystanders_21))
     end select
 
     select case(get_species(cell + (/1, -1, 0, square_default/)))
     case(empty)
-        call add_proc(O_ads_01, cell + (/ 1, -1, 0, 1/), gr_O_ads_01(cell + (/ 1, -1, 0, 0/)))
+        if(.not.bystanders_read(22))then
+            call read_bystanders_2(cell + (/ 0, -2, 0, 0/), bystanders_22)
+            bystanders_read(22) = .true.
+        endif
+        call add_proc(O_ads_01, cell + (/ 1, -1, 0, 1/), gs_O_ads_01(bystanders_22))
     end select
 
     select case(get_species(cell + (/0, 1, 0, square_default/)))
     case(empty)
-        call add_proc(O_ads_01, cell + (/ 0, 0, 0, 1/), gr_O_ads_01(cell + (/ 0, 0, 0, 0/)))
+        if(.not.bystanders_read(19))then
+            call read_bystanders_2(cell + (/ -1, -1, 0, 0/), bystanders_19)
+            bystanders_read(19) = .true.
+        endif
+        call add_proc(O_ads_01, cell + (/ 0, 0, 0, 1/), gs_O_ads_01(bystanders_19))
     end select
 
     select case(get_species(cell + (/0, -1, 0, square_default/)))
     case(empty)
-        call add_proc(O_ads_01, cell + (/ 0, -1, 0, 1/), gr_O_ads_01(cell + (/ 0, -1, 0, 0/)))
+        if(.not.bystanders_read(20))then
+            call read_bystanders_2(cell + (/ -1, -2, 0, 0/), bystanders_20)
+            bystanders_read(20) = .true.
+        endif
+        call add_proc(O_ads_01, cell + (/ 0, -1, 0, 1/), gs_O_ads_01(bystanders_20))
     end select
 
 
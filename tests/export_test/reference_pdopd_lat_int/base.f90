@@ -19,6 +19,66 @@
 ! Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301
 ! USA
 
+module base_instances
+!****h* kmos/base_instances
+! FUNCTION
+!    Stored state of all model instances but the selected one, see
+!    base/select_instance. This is a module of its own, because f2py
+!    skips modules with derived types that are used by other modules.
+!******
+use kind_values
+implicit none
+
+type instance_state
+  !****t* base_instances/instance_state
+  ! FUNCTION
+  !   Holds the state of one model instance while another one is
+  !   selected.
+  !******
+  integer(kind=iint), dimension(:,:,:), allocatable :: avail_sites
+  integer(kind=ibyte), dimension(:), allocatable :: lattice
+  real(kind=rdouble), dimension(:), allocatable :: proc_tree
+  integer(kind=iint), dimension(:), allocatable :: dirty_procs
+  logical, dimension(:), allocatable :: proc_is_dirty
+  real(kind=rdouble), dimension(:), allocatable :: integ_rates
+  real(kind=rdouble), dimension(:), allocatable :: integ_times
+  real(kind=rdouble), dimension(:), allocatable :: integ_total_rates
+  integer(kind=iint), dimension(:), allocatable :: nr_of_sites
+  real(kind=rdouble), dimension(:), allocatable :: rates
+  integer(kind=ilong), dimension(:), allocatable :: procstat
+  real(kind=rdouble), dimension(:), allocatable :: recorder_time
+  integer(kind=ilong), dimension(:), allocatable :: recorder_step
+  real(kind=rdouble), dimension(:, :), allocatable :: recorder_occupation
+  integer(kind=ilong), dimension(:, :), allocatable :: recorder_procstat
+  real(kind=rdouble), dimension(:, :), allocatable :: recorder_integ_rates
+  integer(kind=iint) :: nr_of_proc_leaves = 0
+  integer(kind=iint) :: nr_of_dirty_procs = 0
+  real(kind=rdouble) :: kmc_time = 0.
+  real(kind=rsingle) :: walltime = 0.
+  real(kind=rsingle) :: start_time = 0.
+  integer(kind=iint) :: walltime_interval = 1
+  integer(kind=iint) :: integ_mode = 0
+  integer(kind=ilong) :: kmc_step = 0
+  real(kind=rdouble) :: kmc_time_step = 0.
+  logical :: recorder_active = .false.
+  integer(kind=iint) :: recorder_size = 0
+  integer(kind=ilong) :: recorder_nr_of_samples = 0
+  real(kind=rdouble) :: recorder_interval_time = 0.
+  integer(kind=ilong) :: recorder_interval_steps = 0
+  real(kind=rdouble) :: recorder_next_time = 0.
+  integer(kind=ilong) :: recorder_next_step = 0
+  integer(kind=iint), dimension(25, -1:4) :: species_count = 0
+  integer(kind=iint) :: nr_of_proc = 0
+  integer(kind=iint) :: volume = 0
+  character(len=200) :: system_name = ''
+  integer, dimension(:), allocatable :: random_state
+end type instance_state
+
+type(instance_state), dimension(:), allocatable :: instances
+
+end module base_instances
+
+
 !****h* kmos/base
 ! FUNCTION
 !    The base kMC module, which implements the kMC method on a :math:`d = 1`
@@ -34,6 +94,7 @@
 !******
 module base
 use kind_values
+use base_instances, only: instance_state, instances
 !------ No implicit definition of variables !
 implicit none
 
@@ -45,34 +106,47 @@ private
 ! The following subroutines and functions are made public
 public :: add_proc, &
   allocate_system, &
+  allocate_recorder, &
   assertion_fail, &
   can_do, &
   deallocate_system, &
+  deallocate_recorder, &
   del_proc, &
+  enter_instance, &
   determine_procsite, &
   replace_species, &
   get_accum_rate, &
   get_integ_rate, &
+  get_integ_rates, &
   get_avail_site, &
   get_kmc_step, &
   get_kmc_time, &
   set_kmc_time, &
+  set_lean_stepping, &
   set_system_name, &
   get_kmc_time_step, &
   get_nrofsites, &
   get_procstat, &
+  get_procstats, &
   get_rate, &
+  get_rates, &
   get_species, &
+  get_all_species, &
   get_system_name, &
   get_walltime, &
   get_volume , &
   increment_procstat, &
   interval_search_real, &
   is_allocated, &
+  leave_instance, &
+  record_samples, &
+  recorder_due, &
   null_species, &
   reload_system, &
   reset_site, &
+  rewind_clocks, &
   save_system, &
+  select_instance, &
   set_rate_const, &
   set_null_species, &
   get_null_species, &
@@ -105,7 +179,7 @@ integer(kind=iint), dimension(:,:,:), allocatable, public :: avail_sites
 !     or (2) the location where the site is stored in (1).
 !
 !******
-integer(kind=iint), dimension(:), allocatable :: lattice
+integer(kind=ibyte), dimension(:), allocatable :: lattice
 !****v* base/lattice
 ! FUNCTION
 !   Stores the actual physical lattice in a 1d array, where the value
@@ -114,16 +188,39 @@ integer(kind=iint), dimension(:), allocatable :: lattice
 !   Species constants can be conveniently defined
 !   in lattice\_... and later used directly in the process list.
 !******
-real(kind=rdouble), dimension(:), allocatable :: accum_rates
-!****v* base/accum_rates
+real(kind=rdouble), dimension(:), allocatable :: proc_tree
+!****v* base/proc_tree
 ! FUNCTION
-!   Stores the accumulated rate constant multiplied with the number
-!   of sites available for that process to be used by determine_procsite.
-!   Let :math:`\mathbf{c}` be the rate constants :math:`\mathbf{n}`
-!   the number of available sites, and :math:`\mathbf{a}`
-!   the accumulated rates, then :math:`a_{i}`
-!   is calculated according to :math:`a_{i}=\sum_{j=1}^{i} c_{j} n_{j}`.
-!
+!   Binary sum tree over the total rates nr_of_sites(i)*rates(i) of all
+!   processes, which replaces the accumulated rates. Node n has the
+!   children 2n and 2n+1. The leaves nr_of_proc_leaves, ...,
+!   2*nr_of_proc_leaves-1 are the processes and node 1 holds the total
+!   rate of the system. Changing the rate of one process costs
+!   O(log(nr_of_proc)) and so does the selection of a process in
+!   determine_procsite.
+!******
+integer(kind=iint) :: nr_of_proc_leaves
+!****v* base/nr_of_proc_leaves
+! FUNCTION
+!   Number of leaves of proc_tree: smallest power of 2 >= nr_of_proc.
+!******
+integer(kind=iint), dimension(:), allocatable :: dirty_procs
+!****v* base/dirty_procs
+! FUNCTION
+!   Processes whose total rate changed since the last call of
+!   update_accum_rate, i.e. whose path in proc_tree is out of date.
+!   Only the first nr_of_dirty_procs entries are used.
+!******
+logical, dimension(:), allocatable :: proc_is_dirty
+!****v* base/proc_is_dirty
+! FUNCTION
+!   Flags the processes listed in dirty_procs, so that each one is
+!   listed only once.
+!******
+integer(kind=iint) :: nr_of_dirty_procs
+!****v* base/nr_of_dirty_procs
+! FUNCTION
+!   Number of entries in dirty_procs.
 !******
 !------ S. Matera 09/18/2012------
 real(kind=rdouble), dimension(:), allocatable :: integ_rates
@@ -139,6 +236,17 @@ real(kind=rdouble), dimension(:), allocatable :: integ_rates
 !   is calculated according to :math:`a_{i}(t)=\sum_{i=1} c_{i} n_{i}\Delta t_i`.
 !
 !******
+real(kind=rdouble), dimension(:), allocatable :: integ_times
+!****v* base/integ_times
+! FUNCTION
+!   kMC time up to which integ_rates of each process is accumulated
+!   if integ_mode is 1.
+!******
+real(kind=rdouble), dimension(:), allocatable :: integ_total_rates
+!****v* base/integ_total_rates
+! FUNCTION
+!   Total rate of each process since integ_times if integ_mode is 1.
+!******
 !------ S. Matera 09/18/2012------
 integer(kind=iint), dimension(:), allocatable :: nr_of_sites
 !****v* base/nr_of_sites
@@ -172,6 +280,21 @@ real(kind=rsingle) :: start_time
 ! FUNCTION
 !   CPU time spent in simulation at least reload.
 !******
+integer(kind=iint) :: walltime_interval
+!****v* base/walltime_interval
+! FUNCTION
+!   update_clocks reads the CPU time only every walltime_interval kMC
+!   steps, see set_lean_stepping.
+!******
+integer(kind=iint) :: integ_mode
+!****v* base/integ_mode
+! FUNCTION
+!   How integ_rates is accumulated, see set_lean_stepping:
+!
+!   * 0 -- in every kMC step by update_integ_rate
+!   * 1 -- lazily per process, whenever its total rate changes
+!   * 2 -- not at all
+!******
 integer(kind=ilong) :: kmc_step
 !****v* base/kmc_step
 ! FUNCTION
@@ -182,6 +305,89 @@ real(kind=rdouble) :: kmc_time_step
 ! FUNCTION
 !   The time increment of the current kMC step.
 !******
+logical, public :: recorder_active = .false.
+!****v* base/recorder_active
+! FUNCTION
+!   Whether the time-series recorder is running, so that the stepping
+!   loops only call recorder_due while it is.
+!******
+integer(kind=iint), public :: recorder_size = 0
+!****v* base/recorder_size
+! FUNCTION
+!   Number of samples the ring buffer of the time-series recorder holds,
+!   0 if nothing is recorded.
+!******
+integer(kind=ilong), public :: recorder_nr_of_samples = 0
+!****v* base/recorder_nr_of_samples
+! FUNCTION
+!   Number of samples recorded since allocate_recorder. Sample s is
+!   stored at position mod(s - 1, recorder_size) + 1 of the ring buffer,
+!   so only the last recorder_size samples are kept.
+!******
+real(kind=rdouble), public :: recorder_interval_time = 0.
+!****v* base/recorder_interval_time
+! FUNCTION
+!   kMC time between two samples, 0 if samples are taken every
+!   recorder_interval_steps steps instead.
+!******
+integer(kind=ilong), public :: recorder_interval_steps = 0
+!****v* base/recorder_interval_steps
+! FUNCTION
+!   Number of kMC steps between two samples, if recorder_interval_time
+!   is 0.
+!******
+real(kind=rdouble) :: recorder_next_time
+!****v* base/recorder_next_time
+! FUNCTION
+!   kMC time of the next sample.
+!******
+integer(kind=ilong) :: recorder_next_step
+!****v* base/recorder_next_step
+! FUNCTION
+!   Number of executed kMC steps after which the next sample is taken.
+!******
+real(kind=rdouble), dimension(:), allocatable, public :: recorder_time
+!****v* base/recorder_time
+! FUNCTION
+!   kMC time of each sample in the ring buffer.
+!******
+integer(kind=ilong), dimension(:), allocatable, public :: recorder_step
+!****v* base/recorder_step
+! FUNCTION
+!   Number of kMC steps executed at each sample in the ring buffer.
+!******
+real(kind=rdouble), dimension(:, :), allocatable, public :: recorder_occupation
+!****v* base/recorder_occupation
+! FUNCTION
+!   Occupation of each sample in the ring buffer, flattened as returned
+!   by proclist/get_occupation.
+!******
+integer(kind=ilong), dimension(:, :), allocatable, public :: recorder_procstat
+!****v* base/recorder_procstat
+! FUNCTION
+!   procstat of each sample in the ring buffer.
+!******
+real(kind=rdouble), dimension(:, :), allocatable, public :: recorder_integ_rates
+!****v* base/recorder_integ_rates
+! FUNCTION
+!   integ_rates of each sample in the ring buffer, integrated exactly up
+!   to the time of the sample.
+!******
+integer(kind=iint), public :: current_instance = 0
+!****v* base/current_instance
+! FUNCTION
+!   Number of the model instance that all routines act on, see
+!   select_instance.
+!******
+integer(kind=iint), dimension(25, -1:4), public :: species_count = 0
+!****v* base/species_count
+! FUNCTION
+!   Number of sites of each site type within the unit cell (first index)
+!   occupied by each species (second index). Both values null_species can
+!   take, -1 and nr_of_species, are counted as well. Kept up to date by
+!   replace_species, so that coverages can be checked after each kMC step
+!   without looking at the whole lattice.
+!******
 
 
 integer(kind=iint), dimension(25, 0:3), public :: coverage = 0
@@ -265,6 +471,7 @@ subroutine del_proc(proc, site)
 
     ! decrement nr_of_sites(proc)
     nr_of_sites(proc) = nr_of_sites(proc) - 1
+    call mark_proc_dirty(proc)
   endif
 end subroutine del_proc
 
@@ -303,6 +510,7 @@ subroutine add_proc(proc, site)
 
     ! let address of added site point to nr_of_sites(proc)th slot
     avail_sites(proc, site, 2) = nr_of_sites(proc)
+    call mark_proc_dirty(proc)
   endif
 
 end subroutine add_proc
@@ -514,6 +722,11 @@ subroutine reload_system(input_system_name, reloaded)
 
     close(filehandler)
 
+    call rebuild_proc_tree()
+    if(integ_mode.eq.1) call restart_integ_rates()
+
+    call count_species()
+
     reloaded = .true.
   endif
 
@@ -603,13 +816,18 @@ subroutine set_rate_const(proc_nr, rate)
   !     under 'switch'
   ASSERT(proc_nr.le.nr_of_proc,"base/set_rate_const: proc_nr less or equal nr_of_proc.")
   rates(proc_nr) = rate
+  call mark_proc_dirty(proc_nr)
 
 end subroutine set_rate_const
 
 subroutine update_accum_rate()
   !****f* base/update_accum_rate
   ! FUNCTION
-  !    Updates the vector of accum_rates.
+  !    Brings proc_tree up to date. add_proc, del_proc and
+  !    set_rate_const only note which processes changed, so here just
+  !    the paths of these processes are refreshed instead of summing up
+  !    the rates of all processes. With lazy integ_rates (integ_mode 1)
+  !    these processes also accumulate their integ_rates here.
   !
   ! ARGUMENTS
   !
@@ -618,16 +836,107 @@ subroutine update_accum_rate()
 
   integer(kind=iint) :: i
 
-  accum_rates(1)=nr_of_sites(1)*rates(1)
-  do i = 2, nr_of_proc
-    accum_rates(i)=accum_rates(i-1)+nr_of_sites(i)*rates(i)
+  do i = 1, nr_of_dirty_procs
+    if(integ_mode.eq.1) call accumulate_integ_rate(dirty_procs(i))
+    call update_proc_tree(dirty_procs(i))
+    proc_is_dirty(dirty_procs(i)) = .false.
   enddo
+  nr_of_dirty_procs = 0
 
-  ASSERT(accum_rates(nr_of_proc).gt.0.,"base/update_accum_rate found &
+  ASSERT(proc_tree(1).gt.0.,"base/update_accum_rate found &
     accum_rates(nr_of_proc)=0, so no process is available at all")
 
 end subroutine update_accum_rate
 
+
+subroutine mark_proc_dirty(proc)
+  !****f* base/mark_proc_dirty
+  ! FUNCTION
+  !    Notes that the total rate of proc changed, so that
+  !    update_accum_rate refreshes its path in proc_tree.
+  !
+  ! ARGUMENTS
+  !
+  !    * ``proc`` positive integer number that represents the process
+  !******
+  integer(kind=iint), intent(in) :: proc
+
+  if(.not.proc_is_dirty(proc))then
+    proc_is_dirty(proc) = .true.
+    nr_of_dirty_procs = nr_of_dirty_procs + 1
+    dirty_procs(nr_of_dirty_procs) = proc
+  endif
+
+end subroutine mark_proc_dirty
+
+
+subroutine update_proc_tree(proc)
+  !****f* base/update_proc_tree
+  ! FUNCTION
+  !    Refreshes the partial sums of proc_tree on the path from the
+  !    total rate of process proc up to the root.
+  !
+  ! ARGUMENTS
+  !
+  !    * ``proc`` positive integer number that represents the process
+  !******
+  integer(kind=iint), intent(in) :: proc
+  integer(kind=iint) :: node
+
+  node = ISHFT(nr_of_proc_leaves + proc - 1, -1)
+  do while(node.ge.1)
+    proc_tree(node) = proc_node(2*node) + proc_node(2*node + 1)
+    node = ISHFT(node, -1)
+  enddo
+
+end subroutine update_proc_tree
+
+
+subroutine rebuild_proc_tree()
+  !****f* base/rebuild_proc_tree
+  ! FUNCTION
+  !    Recomputes all nodes of proc_tree from nr_of_sites and rates,
+  !    e.g. after these were read by reload_system.
+  !
+  ! ARGUMENTS
+  !
+  !    ``none``
+  !******
+  integer(kind=iint) :: node
+
+  do node = nr_of_proc_leaves - 1, 1, -1
+    proc_tree(node) = proc_node(2*node) + proc_node(2*node + 1)
+  enddo
+  proc_is_dirty = .false.
+  nr_of_dirty_procs = 0
+
+end subroutine rebuild_proc_tree
+
+
+pure function proc_node(node)
+  !****f* base/proc_node
+  ! FUNCTION
+  !    Returns the value of node in proc_tree, where the leaves are
+  !    nr_of_sites(proc)*rates(proc) and leaves beyond nr_of_proc
+  !    count as zero.
+  !
+  ! ARGUMENTS
+  !
+  !    * ``node`` heap index of the node
+  !******
+  real(kind=rdouble) :: proc_node
+  integer(kind=iint), intent(in) :: node
+
+  if(node.lt.nr_of_proc_leaves)then
+    proc_node = proc_tree(node)
+  elseif(node - nr_of_proc_leaves + 1 .le. nr_of_proc)then
+    proc_node = nr_of_sites(node - nr_of_proc_leaves + 1)*rates(node - nr_of_proc_leaves + 1)
+  else
+    proc_node = 0.
+  endif
+
+end function proc_node
+
 !------ S. Matera 09/18/2012------
 subroutine update_integ_rate()
     !****f* base/update_integ_rate
@@ -641,16 +950,111 @@ subroutine update_integ_rate()
 
     integer(kind=iint) :: i
 
+    if(integ_mode.ne.0) return
 
     do i = 1, nr_of_proc
         integ_rates(i)=integ_rates(i)+nr_of_sites(i)*rates(i)*kmc_time_step
     enddo
 
-    ASSERT(accum_rates(nr_of_proc).gt.0.,"base/update_accum_rate: no process available")
+    ASSERT(proc_tree(1).gt.0.,"base/update_accum_rate: no process available")
 
 end subroutine update_integ_rate
 !------ S. Matera 09/18/2012------
 
+
+subroutine accumulate_integ_rate(proc)
+  !****f* base/accumulate_integ_rate
+  ! FUNCTION
+  !    Adds the total rate process proc had since integ_times(proc) up
+  !    to kmc_time to integ_rates(proc) and continues from there with
+  !    its current total rate. With integ_mode 1 this is called for
+  !    every process whose total rate changed and before integ_rates
+  !    is read.
+  !
+  ! ARGUMENTS
+  !
+  !    * ``proc`` positive integer number that represents the process
+  !******
+  integer(kind=iint), intent(in) :: proc
+
+  integ_rates(proc) = integ_rates(proc) &
+    + integ_total_rates(proc)*(kmc_time - integ_times(proc))
+  integ_times(proc) = kmc_time
+  integ_total_rates(proc) = proc_node(nr_of_proc_leaves + proc - 1)
+
+end subroutine accumulate_integ_rate
+
+
+subroutine flush_integ_rates()
+  !****f* base/flush_integ_rates
+  ! FUNCTION
+  !    Brings integ_rates of all processes up to kmc_time if they are
+  !    accumulated lazily.
+  !
+  ! ARGUMENTS
+  !
+  !    ``none``
+  !******
+  integer(kind=iint) :: proc
+
+  if(integ_mode.ne.1) return
+  do proc = 1, nr_of_proc
+    call accumulate_integ_rate(proc)
+  enddo
+
+end subroutine flush_integ_rates
+
+
+subroutine restart_integ_rates()
+  !****f* base/restart_integ_rates
+  ! FUNCTION
+  !    Lets the lazy accumulation of integ_rates continue from kmc_time
+  !    with the current total rates, e.g. after the configuration or
+  !    kmc_time were replaced as a whole.
+  !
+  ! ARGUMENTS
+  !
+  !    ``none``
+  !******
+  integer(kind=iint) :: proc
+
+  do proc = 1, nr_of_proc
+    integ_times(proc) = kmc_time
+    integ_total_rates(proc) = proc_node(nr_of_proc_leaves + proc - 1)
+  enddo
+
+end subroutine restart_integ_rates
+
+
+subroutine set_lean_stepping(input_walltime_interval, input_integ_mode)
+  !****f* base/set_lean_stepping
+  ! FUNCTION
+  !    Switches the per-step book-keeping that only serves the output.
+  !    The CPU time is read every input_walltime_interval kMC steps, so
+  !    walltime lags behind by up to as many steps. integ_rates is
+  !    accumulated in every step (input_integ_mode 0), lazily (1) or
+  !    not at all (2). Lazily each process only adds its total rate
+  !    times the elapsed kMC time whenever its total rate changes and
+  !    when integ_rates is read, which gives the same integ_rates up to
+  !    rounding. The kMC trajectory is the same in all modes.
+  !
+  ! ARGUMENTS
+  !
+  !    * ``input_walltime_interval`` positive integer
+  !    * ``input_integ_mode`` 0, 1 or 2, see integ_mode
+  !******
+  integer(kind=iint), intent(in) :: input_walltime_interval, input_integ_mode
+
+  ASSERT(input_walltime_interval.gt.0,"base/set_lean_stepping: walltime interval has to be positive")
+  ASSERT(input_integ_mode.ge.0 .and. input_integ_mode.le.2,"base/set_lean_stepping: integ mode has to be 0, 1 or 2")
+
+  call flush_integ_rates()
+  walltime_interval = max(input_walltime_interval, 1)
+  integ_mode = input_integ_mode
+  if(integ_mode.eq.1) call restart_integ_rates()
+
+end subroutine set_lean_stepping
+
 subroutine allocate_system(input_nr_of_proc, input_volume, input_system_name)
   !****f* base/allocate_system
   ! FUNCTION
@@ -699,8 +1103,8 @@ subroutine allocate_system(input_nr_of_proc, input_volume, input_system_name)
     print *,"kmos/base/allocate_system: Tried to allocate rates twice, please deallocate first"
     system_allocated = .true.
   endif
-  if(allocated(accum_rates))then
-    print *,"kmos/base/allocate_system: Tried to allocate accum_rates twice, please deallocate first"
+  if(allocated(proc_tree))then
+    print *,"kmos/base/allocate_system: Tried to allocate proc_tree twice, please deallocate first"
     system_allocated = .true.
   endif
 !------ S. Matera 09/18/2012------
@@ -722,27 +1126,16 @@ subroutine allocate_system(input_nr_of_proc, input_volume, input_system_name)
 
     ! Set clocks and step counter to 0
     kmc_time = 0.
+    kmc_time_step = 0.
     walltime = 0.
     start_time = 0.
     kmc_step = 0
 
     ! allocate data structures and initialize with 0
-    allocate(avail_sites(nr_of_proc, volume, 2))
-    avail_sites = 0
     allocate(lattice(volume))
-    lattice = null_species
-    allocate(nr_of_sites(nr_of_proc))
-    nr_of_sites = 0
-    allocate(rates(nr_of_proc))
-    rates = 0
-    allocate(accum_rates(nr_of_proc))
-    accum_rates = 0
-!------ S. Matera 09/18/2012------
-        allocate(integ_rates(nr_of_proc))
-        integ_rates = 0
-!------ S. Matera 09/18/2012------
-    allocate(procstat(nr_of_proc))
-    procstat = 0
+    lattice = int(null_species, ibyte)
+    call count_species()
+    call allocate_book_keeping()
 
   endif
 
@@ -750,6 +1143,47 @@ subroutine allocate_system(input_nr_of_proc, input_volume, input_system_name)
 end subroutine allocate_system
 
 
+subroutine allocate_book_keeping()
+  !****f* base/allocate_book_keeping
+  ! FUNCTION
+  !   Allocates the book-keeping of available processes, rates and
+  !   counters for nr_of_proc processes and volume sites and
+  !   initializes it with 0.
+  !
+  ! ARGUMENTS
+  !
+  !    ``none``
+  !******
+  allocate(avail_sites(nr_of_proc, volume, 2))
+  avail_sites = 0
+  allocate(nr_of_sites(nr_of_proc))
+  nr_of_sites = 0
+  allocate(rates(nr_of_proc))
+  rates = 0
+  ! the tree needs at least two leaves, so that the root is an inner node
+  nr_of_proc_leaves = 2
+  do while(nr_of_proc_leaves.lt.nr_of_proc)
+    nr_of_proc_leaves = 2*nr_of_proc_leaves
+  enddo
+  allocate(proc_tree(nr_of_proc_leaves - 1))
+  proc_tree = 0
+  allocate(dirty_procs(nr_of_proc))
+  dirty_procs = 0
+  allocate(proc_is_dirty(nr_of_proc))
+  proc_is_dirty = .false.
+  nr_of_dirty_procs = 0
+  allocate(integ_rates(nr_of_proc))
+  integ_rates = 0
+  allocate(integ_times(nr_of_proc))
+  integ_times = kmc_time
+  allocate(integ_total_rates(nr_of_proc))
+  integ_total_rates = 0
+  allocate(procstat(nr_of_proc))
+  procstat = 0
+
+end subroutine allocate_book_keeping
+
+
 subroutine is_allocated(result)
   logical, intent(out) :: result
   result = allocated(avail_sites)
@@ -760,7 +1194,7 @@ subroutine deallocate_system()
   !****f* base/deallocate_system
   ! FUNCTION
   !    Deallocate all allocatable arrays: avail_sites, lattice, rates,
-  !    accum_rates, procstat.
+  !    proc_tree, procstat.
   !
   ! ARGUMENTS
   !
@@ -786,14 +1220,18 @@ subroutine deallocate_system()
   else
     print *,"Warning: rates was not allocated, tried to deallocate."
   endif
-  if(allocated(accum_rates))then
-    deallocate(accum_rates)
+  if(allocated(proc_tree))then
+    deallocate(proc_tree)
+    deallocate(dirty_procs)
+    deallocate(proc_is_dirty)
   else
-    print *,"Warning: rates was not allocated, tried to deallocate."
+    print *,"Warning: proc_tree was not allocated, tried to deallocate."
   endif
 !------ S. Matera 09/18/2012------
     if(allocated(integ_rates))then
         deallocate(integ_rates)
+        deallocate(integ_times)
+        deallocate(integ_total_rates)
     else
         print *,"Warning: integ_rates was not allocated, tried to deallocate."
     endif
@@ -803,6 +1241,7 @@ subroutine deallocate_system()
   else
     print *,"Warning: rates was not procstat, tried to deallocate."
   endif
+  call deallocate_recorder()
 
 end subroutine deallocate_system
 
@@ -852,7 +1291,9 @@ subroutine set_kmc_time(new_kmc_time)
   !---------------I/O variables---------------
   real(kind=rdouble), intent(in)  :: new_kmc_time
 
+  call flush_integ_rates()
   kmc_time = new_kmc_time
+  if(integ_mode.eq.1) call restart_integ_rates()
 
 end subroutine set_kmc_time
 
@@ -962,10 +1403,20 @@ subroutine get_accum_rate(proc_nr, return_accum_rate)
   integer(kind=iint), intent(in), optional :: proc_nr
   real(kind=rdouble), intent(out) :: return_accum_rate
 
+  integer(kind=iint) :: node
+
   if(.not. present(proc_nr) .or. proc_nr.eq.0) then
-    return_accum_rate=accum_rates(nr_of_proc)
+    return_accum_rate=proc_tree(1)
   else
-    return_accum_rate=accum_rates(proc_nr)
+    ! sum up all left siblings on the path from the leaf to the root
+    node = nr_of_proc_leaves + proc_nr - 1
+    return_accum_rate = proc_node(node)
+    do while(node.gt.1)
+      if(mod(node, 2).eq.1)then
+        return_accum_rate = return_accum_rate + proc_node(node - 1)
+      endif
+      node = ISHFT(node, -1)
+    enddo
   endif
 
 end subroutine get_accum_rate
@@ -985,6 +1436,7 @@ subroutine get_integ_rate(proc_nr, return_integ_rate)
     integer(kind=iint), intent(in), optional :: proc_nr
     real(kind=rdouble), intent(out) :: return_integ_rate
 
+    call flush_integ_rates()
     if(.not. present(proc_nr) .or. proc_nr.eq.0) then
       return_integ_rate=integ_rates(nr_of_proc)
     else
@@ -1013,6 +1465,269 @@ subroutine get_rate(proc_nr, return_rate)
 end subroutine get_rate
 
 
+subroutine get_procstats(n, return_procstats)
+  !****f* base/get_procstats
+  ! FUNCTION
+  !    Return the process counters of all processes at once, which
+  !    saves one call of get_procstat per process from Python.
+  !
+  ! ARGUMENTS
+  !
+  !    * ``n`` integer, the number of processes nr_of_proc.
+  !    * ``return_procstats`` writeable integer array, where the process counters will be stored.
+  !******
+  !---------------I/O variables---------------
+  integer(kind=iint), intent(in) :: n
+  integer(kind=ilong), dimension(n), intent(out) :: return_procstats
+
+  ASSERT(n.eq.nr_of_proc,"base/get_procstats: n has to be nr_of_proc")
+  return_procstats = procstat(1:n)
+
+end subroutine get_procstats
+
+
+subroutine get_integ_rates(n, return_integ_rates)
+  !****f* base/get_integ_rates
+  ! FUNCTION
+  !    Return the integrated rates of all processes at once.
+  !
+  ! ARGUMENTS
+  !
+  !    * ``n`` integer, the number of processes nr_of_proc.
+  !    * ``return_integ_rates`` writeable real array, where the integrated rates will be stored.
+  !******
+  !---------------I/O variables---------------
+  integer(kind=iint), intent(in) :: n
+  real(kind=rdouble), dimension(n), intent(out) :: return_integ_rates
+
+  ASSERT(n.eq.nr_of_proc,"base/get_integ_rates: n has to be nr_of_proc")
+  call flush_integ_rates()
+  return_integ_rates = integ_rates(1:n)
+
+end subroutine get_integ_rates
+
+
+subroutine get_rates(n, return_rates)
+  !****f* base/get_rates
+  ! FUNCTION
+  !    Return the rate constants of all processes at once.
+  !
+  ! ARGUMENTS
+  !
+  !    * ``n`` integer, the number of processes nr_of_proc.
+  !    * ``return_rates`` writeable real array, where the rates will be stored.
+  !******
+  !---------------I/O variables---------------
+  integer(kind=iint), intent(in) :: n
+  real(kind=rdouble), dimension(n), intent(out) :: return_rates
+
+  ASSERT(n.eq.nr_of_proc,"base/get_rates: n has to be nr_of_proc")
+  return_rates = rates(1:n)
+
+end subroutine get_rates
+
+
+subroutine get_all_species(n, return_species)
+  !****f* base/get_all_species
+  ! FUNCTION
+  !    Return the species of all sites at once, ordered by site
+  !    number. The lattice module maps site numbers to lattice
+  !    coordinates with nr2lattice.
+  !
+  ! ARGUMENTS
+  !
+  !    * ``n`` integer, the number of sites volume.
+  !    * ``return_species`` writeable integer array, where the species will be stored.
+  !******
+  !---------------I/O variables---------------
+  integer(kind=iint), intent(in) :: n
+  integer(kind=iint), dimension(n), intent(out) :: return_species
+
+  ASSERT(n.eq.volume,"base/get_all_species: n has to be volume")
+  return_species = lattice(1:n)
+
+end subroutine get_all_species
+
+
+subroutine allocate_recorder(buffer_size, nr_of_values, interval_time, interval_steps)
+  !****f* base/allocate_recorder
+  ! FUNCTION
+  !    Starts the time-series recorder with a ring buffer of buffer_size
+  !    samples, which do_kmc_steps fills every interval_time of kMC
+  !    time or, if interval_time is 0, every interval_steps kMC steps.
+  !    A running recorder is restarted.
+  !
+  ! ARGUMENTS
+  !
+  !    * ``buffer_size`` number of samples kept in the ring buffer
+  !    * ``nr_of_values`` number of values of the occupation
+  !    * ``interval_time`` kMC time between two samples or 0
+  !    * ``interval_steps`` number of kMC steps between two samples
+  !******
+  !---------------I/O variables---------------
+  integer(kind=iint), intent(in) :: buffer_size, nr_of_values
+  real(kind=rdouble), intent(in) :: interval_time
+  integer(kind=ilong), intent(in) :: interval_steps
+
+  ASSERT(buffer_size.gt.0,"base/allocate_recorder: buffer_size has to be positive")
+  ASSERT(interval_time.gt.0. .or. interval_steps.gt.0,"base/allocate_recorder: no interval given")
+
+  call deallocate_recorder()
+  allocate(recorder_time(buffer_size))
+  allocate(recorder_step(buffer_size))
+  allocate(recorder_occupation(nr_of_values, buffer_size))
+  allocate(recorder_procstat(nr_of_proc, buffer_size))
+  allocate(recorder_integ_rates(nr_of_proc, buffer_size))
+  recorder_time = 0.
+  recorder_step = 0
+  recorder_occupation = 0.
+  recorder_procstat = 0
+  recorder_integ_rates = 0.
+
+  recorder_size = buffer_size
+  recorder_active = .true.
+  recorder_nr_of_samples = 0
+  recorder_interval_time = interval_time
+  recorder_interval_steps = interval_steps
+  if(interval_time.gt.0.)then
+    recorder_next_time = kmc_time + interval_time
+    recorder_next_step = huge(kmc_step)
+  else
+    recorder_next_time = huge(kmc_time)
+    recorder_next_step = kmc_step + interval_steps
+  endif
+
+end subroutine allocate_recorder
+
+
+subroutine deallocate_recorder()
+  !****f* base/deallocate_recorder
+  ! FUNCTION
+  !    Stops the time-series recorder and frees its ring buffer.
+  !
+  ! ARGUMENTS
+  !
+  !    ``none``
+  !******
+
+  if(allocated(recorder_time))then
+    deallocate(recorder_time)
+    deallocate(recorder_step)
+    deallocate(recorder_occupation)
+    deallocate(recorder_procstat)
+    deallocate(recorder_integ_rates)
+  endif
+  recorder_size = 0
+  recorder_nr_of_samples = 0
+  recorder_active = .false.
+
+end subroutine deallocate_recorder
+
+
+subroutine recorder_due(result)
+  !****f* base/recorder_due
+  ! FUNCTION
+  !    Sets result to true if the time-series recorder is running and the
+  !    last time increment passed the next sample, so that
+  !    do_kmc_steps has to call record_samples before the step is
+  !    executed.
+  !
+  ! ARGUMENTS
+  !
+  !    * ``result`` logical, true if record_samples has to be called
+  !******
+  logical, intent(out) :: result
+
+  result = .false.
+  if(recorder_size.gt.0)then
+    result = kmc_time.gt.recorder_next_time .or. kmc_step.gt.recorder_next_step
+  endif
+
+end subroutine recorder_due
+
+
+subroutine record_samples(nr_of_values, occupation)
+  !****f* base/record_samples
+  ! FUNCTION
+  !    Stores all samples that are due in the ring buffer. It is called
+  !    after update_clocks and update_integ_rate but before the process
+  !    is executed, so the current configuration is the one the system
+  !    was in during the last time increment and thus at the sample
+  !    times.
+  !
+  ! ARGUMENTS
+  !
+  !    * ``nr_of_values`` number of values of the occupation
+  !    * ``occupation`` current occupation, see proclist/get_occupation
+  !******
+  !---------------I/O variables---------------
+  integer(kind=iint), intent(in) :: nr_of_values
+  real(kind=rdouble), dimension(nr_of_values), intent(in) :: occupation
+  !---------------internal variables---------------
+  real(kind=rdouble) :: passed
+  integer(kind=ilong) :: i, nr_due
+
+  if(kmc_time.gt.recorder_next_time)then
+    ! number of sample times passed by the last time increment; if a
+    ! long time increment passes more samples than the ring buffer
+    ! holds, the ones that would be overwritten right away are skipped
+    passed = (kmc_time - recorder_next_time)/recorder_interval_time
+    nr_due = int(min(passed, real(huge(nr_due)/2, rdouble)), ilong) + 1
+    if(nr_due.gt.recorder_size)then
+      recorder_nr_of_samples = recorder_nr_of_samples + nr_due - recorder_size
+      recorder_next_time = recorder_next_time + (nr_due - recorder_size)*recorder_interval_time
+      nr_due = recorder_size
+    endif
+    do i = 1, nr_due
+      call store_sample(recorder_next_time, nr_of_values, occupation)
+      recorder_next_time = recorder_next_time + recorder_interval_time
+    enddo
+  endif
+  if(kmc_step.gt.recorder_next_step)then
+    call store_sample(kmc_time - kmc_time_step, nr_of_values, occupation)
+    recorder_next_step = recorder_next_step + recorder_interval_steps
+  endif
+
+end subroutine record_samples
+
+
+subroutine store_sample(sample_time, nr_of_values, occupation)
+  !****f* base/store_sample
+  ! FUNCTION
+  !    Writes one sample at sample_time into the next slot of the
+  !    ring buffer.
+  !
+  ! ARGUMENTS
+  !
+  !    * ``sample_time`` kMC time of the sample within the last time increment
+  !    * ``nr_of_values`` number of values of the occupation
+  !    * ``occupation`` current occupation
+  !******
+  !---------------I/O variables---------------
+  real(kind=rdouble), intent(in) :: sample_time
+  integer(kind=iint), intent(in) :: nr_of_values
+  real(kind=rdouble), dimension(nr_of_values), intent(in) :: occupation
+  !---------------internal variables---------------
+  integer(kind=iint) :: pos, proc
+
+  recorder_nr_of_samples = recorder_nr_of_samples + 1
+  pos = int(mod(recorder_nr_of_samples - 1, int(recorder_size, ilong)), iint) + 1
+
+  recorder_time(pos) = sample_time
+  recorder_step(pos) = kmc_step - 1
+  recorder_occupation(:, pos) = occupation
+  recorder_procstat(:, pos) = procstat
+  call flush_integ_rates()
+  ! integ_rates already runs up to kmc_time, so the part after the
+  ! sample is taken back with the total rates of the current state
+  do proc = 1, nr_of_proc
+    recorder_integ_rates(proc, pos) = integ_rates(proc) &
+      - (kmc_time - sample_time)*proc_node(nr_of_proc_leaves + proc - 1)
+  enddo
+
+end subroutine store_sample
+
+
 subroutine increment_procstat(proc)
   !****f* base/increment_procstat
   ! FUNCTION
@@ -1082,7 +1797,7 @@ subroutine determine_procsite(ran_proc, ran_site, proc, site)
   !****f* base/determine_procsite
   ! FUNCTION
   !    Expects two random numbers between 0 and 1 and determines the
-  !    corresponding process and site from accum_rates and avail_sites.
+  !    corresponding process and site from proc_tree and avail_sites.
   !    Technically one random number would be sufficient but to circumvent
   !    issues with wrong interval_search_real implementation or rounding
   !    errors I decided to take two random numbers:
@@ -1098,6 +1813,8 @@ subroutine determine_procsite(ran_proc, ran_site, proc, site)
   real(kind=rsingle), intent(in) :: ran_proc, ran_site
   integer(kind=iint), intent(out) :: proc, site
   !---------------internal variables---------------
+  integer(kind=iint) :: node
+  real(kind=rdouble) :: value, left
 
 
   ASSERT(ran_proc.ge.0,"base/determine_procsite: ran_proc has to be positive")
@@ -1105,8 +1822,34 @@ subroutine determine_procsite(ran_proc, ran_site, proc, site)
   ASSERT(ran_site.ge.0,"base/determine_procsite: ran_site has to be positive")
   ASSERT(ran_site.le.1,"base/determine_procsite: ran_site has to be less or equal 1")
 
-  ! ran_proc <- [0,1] so we multiply with larger value in accum_rates
-  call interval_search_real(accum_rates, ran_proc*accum_rates(nr_of_proc), proc)
+  if(.not.proc_tree(1).gt.0.)then
+    print *,""
+    print *,""
+    print *,"ERROR: determine_procsite can't find available process"
+    print *,"This usually means one of the following:"
+    print *," - you forgot to define rate constants"
+    print *," - you create a dead-lock: e.g. adsorption without corresponding desorption."
+    print *," - you started the model in an initial state without transitions"
+    stop
+  endif
+
+  ! ran_proc <- [0,1] so we multiply with the total rate. Walking down
+  ! we enter the left subtree if the value lies within its partial sum
+  ! (or if the right one is empty), otherwise we subtract the left
+  ! partial sum and enter the right subtree. Empty subtrees are never
+  ! entered, so the selected process always has a non-zero rate.
+  value = ran_proc*proc_tree(1)
+  node = 1
+  do while(node.lt.nr_of_proc_leaves)
+    left = proc_node(2*node)
+    if(left.gt.0. .and. (value.lt.left .or. .not.proc_node(2*node + 1).gt.0.))then
+      node = 2*node
+    else
+      value = value - left
+      node = 2*node + 1
+    endif
+  enddo
+  proc = node - nr_of_proc_leaves + 1
 
 
   ! the result shall be between 1 and  nrofsite(proc) so we have to add 1 the
@@ -1143,14 +1886,12 @@ subroutine update_clocks(ran_time)
   ASSERT(ran_time.ge.0.,"base/update_clocks: ran_time variable has to be positive.")
   ASSERT(ran_time.le.1.,"base/update_clocks: ran_time variable has to be less than 1.")
 
-  kmc_time_step = -log(ran_time)/accum_rates(nr_of_proc)
+  kmc_time_step = -log(ran_time)/proc_tree(1)
   ! Make sure the difference is not so small, that it is rounded off
   ! ASSERT(kmc_time+kmc_time_step>kmc_time,"base/update_clocks: precision of kmc_time is not sufficient")
 
-  call CPU_TIME(runtime)
-
   ! Make sure we are not dividing by zero
-  ASSERT(accum_rates(nr_of_proc).gt.0,"base/update_clocks: total rate was found to be zero")
+  ASSERT(proc_tree(1).gt.0,"base/update_clocks: total rate was found to be zero")
   kmc_time = kmc_time + kmc_time_step
 
   ! Increment kMC steps
@@ -1159,7 +1900,10 @@ subroutine update_clocks(ran_time)
   ! Walltime is the time of this simulation run plus the walltime
   ! when the simulation was reloaded, so walltime represents the total
   ! walltime across reloads.
-  walltime = start_time + runtime
+  if(walltime_interval.eq.1 .or. mod(kmc_step, int(walltime_interval, ilong)).eq.0)then
+    call CPU_TIME(runtime)
+    walltime = start_time + runtime
+  endif
   !------ S. Matera 09/18/2012------
   !-- 'call update_integ_rate()' directly in do_kmc_step(s)
   ! call update_integ_rate()
@@ -1169,6 +1913,28 @@ subroutine update_clocks(ran_time)
 end subroutine update_clocks
 
 
+subroutine rewind_clocks(new_kmc_time)
+  !****f* base/rewind_clocks
+  ! FUNCTION
+  !    Takes back the time increment of the last call of update_clocks
+  !    beyond new_kmc_time together with the kMC step it counted. The
+  !    step is then not executed but the clock stops at new_kmc_time,
+  !    which is exact because the waiting time is memoryless.
+  !
+  ! ARGUMENTS
+  !
+  !    * ``new_kmc_time`` kMC time within the last time increment
+  !******
+  real(kind=rdouble), intent(in) :: new_kmc_time
+
+  ASSERT(new_kmc_time.le.kmc_time,"base/rewind_clocks: new_kmc_time has to lie within the last time increment")
+  kmc_time_step = kmc_time_step - (kmc_time - new_kmc_time)
+  kmc_time = new_kmc_time
+  kmc_step = kmc_step - 1
+
+end subroutine rewind_clocks
+
+
 pure function get_species(site)
   !****f* base/get_species
   ! FUNCTION
@@ -1227,10 +1993,35 @@ subroutine replace_species(site, old_species, new_species)
     stop
   endif
 
-  lattice(site) = new_species
+  lattice(site) = int(new_species, ibyte)
+  species_count(mod(site - 1, 25) + 1, old_species) = &
+    species_count(mod(site - 1, 25) + 1, old_species) - 1
+  species_count(mod(site - 1, 25) + 1, new_species) = &
+    species_count(mod(site - 1, 25) + 1, new_species) + 1
 end subroutine replace_species
 
 
+subroutine count_species()
+  !****f* base/count_species
+  ! FUNCTION
+  !    Recounts species_count from the whole lattice, e.g. after the
+  !    lattice was read by reload_system.
+  !
+  ! ARGUMENTS
+  !
+  !    ``none``
+  !******
+  integer(kind=iint) :: site
+
+  species_count = 0
+  do site = 1, volume
+    species_count(mod(site - 1, 25) + 1, lattice(site)) = &
+      species_count(mod(site - 1, 25) + 1, lattice(site)) + 1
+  enddo
+
+end subroutine count_species
+
+
 subroutine interval_search_real(arr, value, return_field)
   !****f* base/interval_search_real
   ! FUNCTION
@@ -1361,6 +2152,196 @@ subroutine assertion_fail(a, r)
 
 end subroutine assertion_fail
 
+subroutine select_instance(instance)
+  !****f* base/select_instance
+  ! FUNCTION
+  !    Stores the state of the current model instance and continues
+  !    with the state of instance, which is empty when it is selected
+  !    for the first time. Arrays are moved, not copied, so switching
+  !    between instances is cheap and each instance keeps its own
+  !    lattice, clocks, counters, recorder and random number state.
+  !
+  ! ARGUMENTS
+  !
+  !    * ``instance`` number of the instance, 0 or larger
+  !******
+  integer(kind=iint), intent(in) :: instance
+
+  if(instance.eq.current_instance) return
+
+  call leave_instance()
+  call enter_instance(instance)
+
+end subroutine select_instance
+
+
+subroutine leave_instance()
+  !****f* base/leave_instance
+  ! FUNCTION
+  !    First half of select_instance: stores the state of the current
+  !    instance, which leaves the module without any state.
+  !
+  ! ARGUMENTS
+  !
+  !    ``none``
+  !******
+
+  call reserve_instances(current_instance)
+  call store_instance(instances(current_instance))
+
+end subroutine leave_instance
+
+
+subroutine enter_instance(instance)
+  !****f* base/enter_instance
+  ! FUNCTION
+  !    Second half of select_instance: continues with the stored state
+  !    of instance. The module must not hold any state, i.e.
+  !    leave_instance was called before or, with --openmp, this is the
+  !    own copy of a thread. Threads may only enter instances that
+  !    exist already, see proclist/do_kmc_steps_ensemble.
+  !
+  ! ARGUMENTS
+  !
+  !    * ``instance`` number of the instance, 0 or larger
+  !******
+  integer(kind=iint), intent(in) :: instance
+
+  call reserve_instances(instance)
+  call load_instance(instances(instance))
+  current_instance = instance
+
+end subroutine enter_instance
+
+
+subroutine reserve_instances(instance)
+  !****f* base/reserve_instances
+  ! FUNCTION
+  !    Makes sure that instances has a slot for instance.
+  !
+  ! ARGUMENTS
+  !
+  !    * ``instance`` number of the instance, 0 or larger
+  !******
+  integer(kind=iint), intent(in) :: instance
+
+  type(instance_state), dimension(:), allocatable :: grown
+
+  if(.not.allocated(instances))then
+    allocate(instances(0:instance))
+  elseif(instance.gt.ubound(instances, 1))then
+    allocate(grown(0:max(instance, 2*ubound(instances, 1))))
+    grown(0:ubound(instances, 1)) = instances
+    call move_alloc(grown, instances)
+  endif
+
+end subroutine reserve_instances
+
+
+subroutine store_instance(state)
+  !****f* base/store_instance
+  ! FUNCTION
+  !    Moves the module state into state.
+  !
+  ! ARGUMENTS
+  !
+  !    * ``state`` instance_state that takes the state
+  !******
+  type(instance_state), intent(inout) :: state
+  integer :: seed_size
+
+  call move_alloc(avail_sites, state%avail_sites)
+  call move_alloc(lattice, state%lattice)
+  call move_alloc(proc_tree, state%proc_tree)
+  call move_alloc(dirty_procs, state%dirty_procs)
+  call move_alloc(proc_is_dirty, state%proc_is_dirty)
+  call move_alloc(integ_rates, state%integ_rates)
+  call move_alloc(integ_times, state%integ_times)
+  call move_alloc(integ_total_rates, state%integ_total_rates)
+  call move_alloc(nr_of_sites, state%nr_of_sites)
+  call move_alloc(rates, state%rates)
+  call move_alloc(procstat, state%procstat)
+  call move_alloc(recorder_time, state%recorder_time)
+  call move_alloc(recorder_step, state%recorder_step)
+  call move_alloc(recorder_occupation, state%recorder_occupation)
+  call move_alloc(recorder_procstat, state%recorder_procstat)
+  call move_alloc(recorder_integ_rates, state%recorder_integ_rates)
+  state%nr_of_proc_leaves = nr_of_proc_leaves
+  state%nr_of_dirty_procs = nr_of_dirty_procs
+  state%kmc_time = kmc_time
+  state%walltime = walltime
+  state%start_time = start_time
+  state%walltime_interval = walltime_interval
+  state%integ_mode = integ_mode
+  state%kmc_step = kmc_step
+  state%kmc_time_step = kmc_time_step
+  state%recorder_active = recorder_active
+  state%recorder_size = recorder_size
+  state%recorder_nr_of_samples = recorder_nr_of_samples
+  state%recorder_interval_time = recorder_interval_time
+  state%recorder_interval_steps = recorder_interval_steps
+  state%recorder_next_time = recorder_next_time
+  state%recorder_next_step = recorder_next_step
+  state%species_count = species_count
+  state%nr_of_proc = nr_of_proc
+  state%volume = volume
+  state%system_name = system_name
+  call random_seed(size=seed_size)
+  if(.not.allocated(state%random_state)) allocate(state%random_state(seed_size))
+  call random_seed(get=state%random_state)
+end subroutine store_instance
+
+
+subroutine load_instance(state)
+  !****f* base/load_instance
+  ! FUNCTION
+  !    Moves state into the module. A state that was never stored
+  !    keeps the random numbers going.
+  !
+  ! ARGUMENTS
+  !
+  !    * ``state`` instance_state to continue with
+  !******
+  type(instance_state), intent(inout) :: state
+  call move_alloc(state%avail_sites, avail_sites)
+  call move_alloc(state%lattice, lattice)
+  call move_alloc(state%proc_tree, proc_tree)
+  call move_alloc(state%dirty_procs, dirty_procs)
+  call move_alloc(state%proc_is_dirty, proc_is_dirty)
+  call move_alloc(state%integ_rates, integ_rates)
+  call move_alloc(state%integ_times, integ_times)
+  call move_alloc(state%integ_total_rates, integ_total_rates)
+  call move_alloc(state%nr_of_sites, nr_of_sites)
+  call move_alloc(state%rates, rates)
+  call move_alloc(state%procstat, procstat)
+  call move_alloc(state%recorder_time, recorder_time)
+  call move_alloc(state%recorder_step, recorder_step)
+  call move_alloc(state%recorder_occupation, recorder_occupation)
+  call move_alloc(state%recorder_procstat, recorder_procstat)
+  call move_alloc(state%recorder_integ_rates, recorder_integ_rates)
+  nr_of_proc_leaves = state%nr_of_proc_leaves
+  nr_of_dirty_procs = state%nr_of_dirty_procs
+  kmc_time = state%kmc_time
+  walltime = state%walltime
+  start_time = state%start_time
+  walltime_interval = state%walltime_interval
+  integ_mode = state%integ_mode
+  kmc_step = state%kmc_step
+  kmc_time_step = state%kmc_time_step
+  recorder_active = state%recorder_active
+  recorder_size = state%recorder_size
+  recorder_nr_of_samples = state%recorder_nr_of_samples
+  recorder_interval_time = state%recorder_interval_time
+  recorder_interval_steps = state%recorder_interval_steps
+  recorder_next_time = state%recorder_next_time
+  recorder_next_step = state%recorder_next_step
+  species_count = state%species_count
+  nr_of_proc = state%nr_of_proc
+  volume = state%volume
+  system_name = state%system_name
+  if(allocated(state%random_state)) call random_seed(put=state%random_state)
+end subroutine load_instance
+
 subroutine set_null_species(input_null_species)
     integer(kind=iint), intent(in) :: input_null_species
 
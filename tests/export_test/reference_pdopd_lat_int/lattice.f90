@@ -31,8 +31,34 @@
 !******
 
 
+module lattice_instances
+!****h* kmos/lattice_instances
+! FUNCTION
+!    Stored lookup tables of all model instances but the selected one,
+!    see lattice/select_instance and base_instances.
+!******
+use kind_values
+implicit none
+
+type lattice_instance_state
+    !****t* lattice_instances/lattice_instance_state
+    ! FUNCTION
+    !   Holds the lookup tables of one model instance while another
+    !   one is selected.
+    !******
+    integer(kind=iint), dimension(3) :: system_size = 0
+    integer(kind=iint), dimension(:, :), allocatable :: nr2lattice
+    integer(kind=iint), dimension(:,:,:,:), allocatable :: lattice2nr
+end type lattice_instance_state
+
+type(lattice_instance_state), dimension(:), allocatable :: instances
+
+end module lattice_instances
+
+
 module lattice
 use kind_values
+use lattice_instances, only: lattice_instance_state, instances
 use base, only: &
     assertion_fail, &
     base_deallocate_system => deallocate_system, &
@@ -52,6 +78,9 @@ use base, only: &
     base_get_volume => get_volume, &
     reload_system => reload_system, &
     save_system, &
+    base_enter_instance => enter_instance, &
+    base_leave_instance => leave_instance, &
+    current_instance, &
     assertion_fail, &
     set_rate_const, &
     update_accum_rate, &
@@ -61,6 +90,8 @@ use base, only: &
 
 implicit none
 
+private :: reserve_instances
+
 integer(kind=iint), dimension(3), public :: system_size
 !****v* lattice/system_size
 ! FUNCTION
@@ -165,6 +196,15 @@ integer(kind=iint), dimension(:,:,:,:), allocatable, public :: lattice2nr
 ! FUNCTION
 !   Caching array holding the mapping from index to lattice
 !   coordinate:  (x, y, z, n) -> i.
+!   Covers the system plus one periodic image in every direction.
+!******
+logical, public :: check_mapping = .true.
+!****v* lattice/check_mapping
+! FUNCTION
+!   If true (default) allocate_system checks with two passes over all
+!   sites that the mapping between lattice coordinates and indices
+!   is a bijection. Can be switched off to save startup time on large
+!   systems, e.g. with KMC_Model(check_mapping=False).
 !******
 
 
@@ -239,30 +279,32 @@ subroutine allocate_system(nr_of_proc, input_system_size, system_name)
     volume = system_size(1)*system_size(2)*system_size(3)*spuck
     ! Let's check if the works correctly, first
     ! and if so populate lookup tables
-    do k = 0, system_size(3)-1
-        do j = 0, system_size(2)-1
-            do i = 0, system_size(1)-1
-                do nr = 1, spuck
-                    if(.not.all((/i,j,k,nr/).eq. &
-                    calculate_nr2lattice(calculate_lattice2nr((/i,j,k,nr/)))))then
-                        print *,"Error in Mapping:"
-                        print *, (/i,j,k,nr/), "was mapped on", calculate_lattice2nr((/i,j,k,nr/))
-                        print *, "but that was mapped on", calculate_nr2lattice(calculate_lattice2nr((/i,j,k,nr/)))
-                        stop
-                    endif
+    if(check_mapping)then
+        do k = 0, system_size(3)-1
+            do j = 0, system_size(2)-1
+                do i = 0, system_size(1)-1
+                    do nr = 1, spuck
+                        if(.not.all((/i,j,k,nr/).eq. &
+                        calculate_nr2lattice(calculate_lattice2nr((/i,j,k,nr/)))))then
+                            print *,"Error in Mapping:"
+                            print *, (/i,j,k,nr/), "was mapped on", calculate_lattice2nr((/i,j,k,nr/))
+                            print *, "but that was mapped on", calculate_nr2lattice(calculate_lattice2nr((/i,j,k,nr/)))
+                            stop
+                        endif
+                    end do
                 end do
             end do
         end do
-    end do
 
-    do check_nr=1, system_size(1)*system_size(2)*system_size(3)*spuck
-        if(.not.check_nr.eq.calculate_lattice2nr(calculate_nr2lattice(check_nr)))then
-            print *, "ERROR in Mapping:", check_nr
-            print *, "was mapped on", calculate_nr2lattice(check_nr)
-            print *, "but that was mapped on",calculate_lattice2nr(calculate_nr2lattice(check_nr))
-            stop
-        endif
-    end do
+        do check_nr=1, system_size(1)*system_size(2)*system_size(3)*spuck
+            if(.not.check_nr.eq.calculate_lattice2nr(calculate_nr2lattice(check_nr)))then
+                print *, "ERROR in Mapping:", check_nr
+                print *, "was mapped on", calculate_nr2lattice(check_nr)
+                print *, "but that was mapped on",calculate_lattice2nr(calculate_nr2lattice(check_nr))
+                stop
+            endif
+        end do
+    endif
 
     allocate(nr2lattice(1:system_size(1)*system_size(2)*system_size(3)*spuck,4))
     allocate(lattice2nr(-system_size(1):2*system_size(1)-1, &
@@ -272,9 +314,9 @@ subroutine allocate_system(nr_of_proc, input_system_size, system_name)
     do check_nr=1, system_size(1)*system_size(2)*system_size(3)*spuck
         nr2lattice(check_nr, :) = calculate_nr2lattice(check_nr)
     end do
-    do k = -system_size(3), 2*system_size(3)-1
-        do j = -system_size(2), 2*system_size(2)-1
-            do i = -system_size(1), 2*system_size(1)-1
+    do k = lbound(lattice2nr, 3), ubound(lattice2nr, 3)
+        do j = lbound(lattice2nr, 2), ubound(lattice2nr, 2)
+            do i = lbound(lattice2nr, 1), ubound(lattice2nr, 1)
                 do nr = 1, spuck
                     lattice2nr(i, j, k, nr) = calculate_lattice2nr((/i, j, k, nr/))
                 end do
@@ -336,6 +378,91 @@ subroutine deallocate_system()
 
 end subroutine deallocate_system
 
+subroutine select_instance(instance)
+
+!****f* lattice/select_instance
+! FUNCTION
+!    Switches to another model instance, see base/select_instance,
+!    including the lookup tables and the system size.
+!
+! ARGUMENTS
+!
+!    * ``instance`` number of the instance, 0 or larger
+!******
+    integer(kind=iint), intent(in) :: instance
+
+    if(instance.eq.current_instance) return
+
+    call leave_instance()
+    call enter_instance(instance)
+
+end subroutine select_instance
+
+subroutine leave_instance()
+
+!****f* lattice/leave_instance
+! FUNCTION
+!    Stores the current instance including the lookup tables, see
+!    base/leave_instance.
+!
+! ARGUMENTS
+!
+!    ``none``
+!******
+
+    call reserve_instances(current_instance)
+    instances(current_instance)%system_size = system_size
+    call move_alloc(nr2lattice, instances(current_instance)%nr2lattice)
+    call move_alloc(lattice2nr, instances(current_instance)%lattice2nr)
+    call base_leave_instance()
+
+end subroutine leave_instance
+
+subroutine enter_instance(instance)
+
+!****f* lattice/enter_instance
+! FUNCTION
+!    Continues with a stored instance including the lookup tables, see
+!    base/enter_instance.
+!
+! ARGUMENTS
+!
+!    * ``instance`` number of the instance, 0 or larger
+!******
+    integer(kind=iint), intent(in) :: instance
+
+    call reserve_instances(instance)
+    system_size = instances(instance)%system_size
+    call move_alloc(instances(instance)%nr2lattice, nr2lattice)
+    call move_alloc(instances(instance)%lattice2nr, lattice2nr)
+    call base_enter_instance(instance)
+
+end subroutine enter_instance
+
+subroutine reserve_instances(instance)
+
+!****f* lattice/reserve_instances
+! FUNCTION
+!    Makes sure that instances has a slot for instance.
+!
+! ARGUMENTS
+!
+!    * ``instance`` number of the instance, 0 or larger
+!******
+    integer(kind=iint), intent(in) :: instance
+
+    type(lattice_instance_state), dimension(:), allocatable :: grown
+
+    if(.not.allocated(instances))then
+        allocate(instances(0:instance))
+    elseif(instance.gt.ubound(instances, 1))then
+        allocate(grown(0:max(instance, 2*ubound(instances, 1))))
+        grown(0:ubound(instances, 1)) = instances
+        call move_alloc(grown, instances)
+    endif
+
+end subroutine reserve_instances
+
 subroutine add_proc(proc, site)
 
     integer(kind=iint), intent(in) :: proc
@@ -28,10 +28,18 @@
 module proclist
 use kind_values
 use base, only: &
+    get_rates, &
     update_accum_rate, &
     update_integ_rate, &
     determine_procsite, &
     update_clocks, &
+    recorder_active, &
+    recorder_due, &
+    record_samples, &
+    get_kmc_time, &
+    get_procstats, &
+    rewind_clocks, &
+    species_count, &
     avail_sites, &
     set_null_species, &
     increment_procstat
@@ -73,6 +81,9 @@ use lattice, only: &
     replace_species, &
     del_proc, &
     reset_site, &
+    enter_instance, &
+    leave_instance, &
+    current_instance, &
     system_size, &
     spuck, &
     get_species
@@ -177,6 +188,7 @@ subroutine do_kmc_steps(n)
     integer(kind=ilong) :: i
     real(kind=rsingle) :: ran_proc, ran_time, ran_site
     integer(kind=iint) :: nr_site, proc_nr
+    logical :: due
 
     do i = 1, n
     call random_number(ran_time)
@@ -186,12 +198,327 @@ subroutine do_kmc_steps(n)
     call update_clocks(ran_time)
 
     call update_integ_rate
+    if(recorder_active)then
+        call recorder_due(due)
+        if(due) call take_samples()
+    endif
     call determine_procsite(ran_proc, ran_site, proc_nr, nr_site)
     call run_proc_nr(proc_nr, nr_site)
     enddo
 
 end subroutine do_kmc_steps
 
+subroutine do_kmc_steps_until(n, t_end, proc, nr_of_runs, species, site, coverage, stop_reason)
+
+!****f* proclist/do_kmc_steps_until
+! FUNCTION
+!    Performs up to ``n`` kMC steps like do_kmc_steps, but stops as
+!    soon as one of the following conditions is met, without returning
+!    to Python in between:
+!
+!    * the next step would pass the kMC time ``t_end``. The step is
+!      not executed and the clock stops at ``t_end`` instead.
+!    * process ``proc`` was executed ``nr_of_runs`` times.
+!    * the coverage of ``species`` on site ``site`` of the unit cell
+!      (all sites of the unit cell for 0) crossed ``coverage``, i.e.
+!      reached it from below or fell below it.
+!
+! ARGUMENTS
+!
+!    * ``n`` maximum number of steps to run
+!    * ``t_end`` kMC time to stop at, switched off by huge(t_end)
+!    * ``proc`` process to count, switched off by 0
+!    * ``nr_of_runs`` number of executions of ``proc`` to stop after
+!    * ``species`` species to check the coverage of, switched off by -1
+!    * ``site`` site within the unit cell or 0
+!    * ``coverage`` coverage threshold in sites per unit cell
+!    * ``stop_reason`` 0 after ``n`` steps, 1 at ``t_end``, 2 after
+!      ``nr_of_runs`` executions of ``proc``, 3 at ``coverage``
+!******
+    integer(kind=ilong), intent(in) :: n, nr_of_runs
+    real(kind=rdouble), intent(in) :: t_end, coverage
+    integer(kind=iint), intent(in) :: proc, species, site
+    integer(kind=iint), intent(out) :: stop_reason
+
+    integer(kind=ilong) :: i, runs
+    real(kind=rsingle) :: ran_proc, ran_time, ran_site
+    real(kind=rdouble) :: current_time, threshold
+    integer(kind=iint) :: nr_site, proc_nr, occupied
+    logical :: due, rising
+
+    runs = 0
+    ! the coverage is checked on the number of occupied sites
+    threshold = coverage*real(system_size(1)*system_size(2)*system_size(3), rdouble)
+    rising = .true.
+    if(species.ge.0)then
+        rising = count_occupied(species, site).lt.threshold
+    endif
+
+    stop_reason = 0
+    do i = 1, n
+    call random_number(ran_time)
+    call random_number(ran_proc)
+    call random_number(ran_site)
+    call update_accum_rate
+    call update_clocks(ran_time)
+
+    call get_kmc_time(current_time)
+    if(current_time.gt.t_end)then
+        call rewind_clocks(t_end)
+        call update_integ_rate
+        if(recorder_active)then
+            call recorder_due(due)
+            if(due) call take_samples()
+        endif
+        stop_reason = 1
+        exit
+    endif
+
+    call update_integ_rate
+    if(recorder_active)then
+        call recorder_due(due)
+        if(due) call take_samples()
+    endif
+    call determine_procsite(ran_proc, ran_site, proc_nr, nr_site)
+    call run_proc_nr(proc_nr, nr_site)
+
+    if(proc_nr.eq.proc)then
+        runs = runs + 1
+        if(runs.ge.nr_of_runs)then
+            stop_reason = 2
+            exit
+        endif
+    endif
+    if(species.ge.0)then
+        occupied = count_occupied(species, site)
+        if(rising .eqv. occupied.ge.threshold)then
+            stop_reason = 3
+            exit
+        endif
+    endif
+    enddo
+
+end subroutine do_kmc_steps_until
+
+pure function count_occupied(species, site)
+
+!****f* proclist/count_occupied
+! FUNCTION
+!    Returns the number of sites ``site`` of the unit cell (all sites
+!    of the unit cell for 0) occupied by ``species``.
+!
+! ARGUMENTS
+!
+!    * ``species`` species to count
+!    * ``site`` site within the unit cell or 0
+!******
+    integer(kind=iint) :: count_occupied
+    integer(kind=iint), intent(in) :: species, site
+
+    if(site.gt.0)then
+        count_occupied = species_count(site, species)
+    else
+        count_occupied = sum(species_count(:, species))
+    endif
+
+end function count_occupied
+
+subroutine do_kmc_steps_ensemble(n, nr_of_replicas, kmc_times, procstats, occupations)
+
+!****f* proclist/do_kmc_steps_ensemble
+! FUNCTION
+!    Performs ``n`` kMC steps in each of the model instances 1 to
+!    nr_of_replicas, which have to be initialized before. If the model
+!    was exported with --openmp, the replicas are distributed over
+!    OpenMP threads: each thread has its own copy of the module state
+!    and moves one replica after the other in and out of it with
+!    enter_instance and leave_instance. Afterwards the instance that
+!    was selected before is selected again.
+!
+! ARGUMENTS
+!
+!    * ``n`` number of steps of each replica
+!    * ``nr_of_replicas`` number of replicas
+!    * ``kmc_times`` kMC time of each replica afterwards
+!    * ``procstats`` procstat of each replica afterwards
+!    * ``occupations`` occupation of each replica afterwards, see get_occupation
+!******
+    integer(kind=ilong), intent(in) :: n
+    integer(kind=iint), intent(in) :: nr_of_replicas
+    real(kind=rdouble), dimension(nr_of_replicas), intent(out) :: kmc_times
+    integer(kind=ilong), dimension(46, nr_of_replicas), intent(out) :: procstats
+    real(kind=rdouble), dimension(0:3, 1:25, nr_of_replicas), intent(out) :: occupations
+
+    integer(kind=iint) :: caller, replica
+
+    caller = current_instance
+    call leave_instance()
+
+    !$omp parallel do schedule(dynamic)
+    do replica = 1, nr_of_replicas
+        call enter_instance(replica)
+        call do_kmc_steps(n)
+        call get_kmc_time(kmc_times(replica))
+        call get_procstats(46, procstats(:, replica))
+        call get_occupation(occupations(:, :, replica))
+        call leave_instance()
+    enddo
+    !$omp end parallel do
+
+    call enter_instance(caller)
+
+end subroutine do_kmc_steps_ensemble
+
+subroutine get_reverse_procs(return_reverse)
+
+!****f* proclist/get_reverse_procs
+! FUNCTION
+!    Returns for each process the number of its reverse process or 0,
+!    i.e. the process that turns its sites back. Processes that count
+!    towards a TOF have no reverse.
+!
+! ARGUMENTS
+!
+!    * ``return_reverse`` writeable integer array of length nr_of_proc
+!******
+    integer(kind=iint), dimension(46), intent(out) :: return_reverse
+
+    return_reverse = 0
+    return_reverse(12) = 22
+    return_reverse(13) = 23
+    return_reverse(14) = 24
+    return_reverse(15) = 25
+    return_reverse(16) = 26
+    return_reverse(17) = 27
+    return_reverse(18) = 28
+    return_reverse(19) = 29
+    return_reverse(20) = 30
+    return_reverse(21) = 31
+    return_reverse(22) = 12
+    return_reverse(23) = 13
+    return_reverse(24) = 14
+    return_reverse(25) = 15
+    return_reverse(26) = 16
+    return_reverse(27) = 17
+    return_reverse(28) = 18
+    return_reverse(29) = 19
+    return_reverse(30) = 20
+    return_reverse(31) = 21
+    return_reverse(32) = 36
+    return_reverse(33) = 37
+    return_reverse(34) = 38
+    return_reverse(35) = 39
+    return_reverse(36) = 32
+    return_reverse(37) = 33
+    return_reverse(38) = 34
+    return_reverse(39) = 35
+    return_reverse(42) = 44
+    return_reverse(43) = 45
+    return_reverse(44) = 42
+    return_reverse(45) = 43
+
+end subroutine get_reverse_procs
+
+subroutine do_kmc_steps_accelerated(n, window, reverse, min_events, separation, tolerance, &
+        scaling, imbalance, ratio)
+
+!****f* proclist/do_kmc_steps_accelerated
+! FUNCTION
+!    Performs ``n`` kMC steps like do_kmc_steps, but slows down fast
+!    quasi-equilibrated pairs of reverse processes. After every
+!    ``window`` steps each pair is checked: if both directions
+!    together ran at least min_events times and their net flux is at
+!    most tolerance times their executions, the pair is
+!    quasi-equilibrated. The rate constants of both directions are
+!    then scaled by the same factor, which leaves their equilibrium
+!    unchanged, so that the pair runs about max(min_events,
+!    separation times the most frequent other process) times in the
+!    next window. A pair that is no longer quasi-equilibrated gets
+!    its rate constants back at once, and all rate constants are
+!    restored at the end.
+!
+! ARGUMENTS
+!
+!    * ``n`` number of steps
+!    * ``window`` number of steps between two checks
+!    * ``reverse`` reverse process of each process or 0, see get_reverse_procs
+!    * ``min_events`` executions of a pair per window that are kept
+!    * ``separation`` how much more often a pair runs than any other process
+!    * ``tolerance`` largest net flux of a pair relative to its executions
+!    * ``scaling`` smallest factor the rate constant of each process had
+!    * ``imbalance`` largest net flux of each pair relative to its executions
+!      in a window while it was scaled, which bounds the error of the scaling
+!    * ``ratio`` smallest ratio of the executions of each pair to those of
+!      the most frequent other process in a window while it was scaled
+!******
+    integer(kind=ilong), intent(in) :: n, window, min_events
+    integer(kind=iint), dimension(46), intent(in) :: reverse
+    real(kind=rdouble), intent(in) :: separation, tolerance
+    real(kind=rdouble), dimension(46), intent(out) :: scaling, imbalance, ratio
+
+    integer(kind=ilong) :: done, steps, events, others
+    integer(kind=ilong), dimension(46) :: procstat_before, procstat_after, counts
+    real(kind=rdouble), dimension(46) :: unscaled_rates, factor
+    real(kind=rdouble) :: new_factor
+    logical, dimension(46) :: balanced
+    integer(kind=iint) :: proc, partner
+
+    call get_rates(46, unscaled_rates)
+    factor = 1.
+    scaling = 1.
+    imbalance = 0.
+    ratio = huge(ratio)
+
+    done = 0
+    do while(done.lt.n)
+        steps = min(window, n - done)
+        call get_procstats(46, procstat_before)
+        call do_kmc_steps(steps)
+        call get_procstats(46, procstat_after)
+        counts = procstat_after - procstat_before
+        done = done + steps
+
+        ! pairs whose net flux is small compared to their executions
+        balanced = .false.
+        do proc = 1, 46
+            partner = reverse(proc)
+            if(partner.gt.0)then
+                events = counts(proc) + counts(partner)
+                balanced(proc) = abs(counts(proc) - counts(partner)).le.tolerance*events &
+                    .and.(events.ge.min_events.or.factor(proc).lt.1.)
+            endif
+        enddo
+        ! the most frequent process outside of these pairs
+        others = max(1_ilong, maxval(counts, mask=.not.balanced))
+
+        do proc = 1, 46
+            partner = reverse(proc)
+            if(partner.eq.0) cycle
+            events = max(1_ilong, counts(proc) + counts(partner))
+            if(factor(proc).lt.1.)then
+                imbalance(proc) = max(imbalance(proc), abs(counts(proc) - counts(partner))/real(events, rdouble))
+                ratio(proc) = min(ratio(proc), events/real(others, rdouble))
+            endif
+            if(balanced(proc))then
+                new_factor = min(1._rdouble, factor(proc)*max(real(min_events, rdouble), separation*others)/events)
+            else
+                new_factor = 1.
+            endif
+            if(new_factor.ne.factor(proc))then
+                factor(proc) = new_factor
+                call set_rate_const(proc, unscaled_rates(proc)*new_factor)
+            endif
+            scaling(proc) = min(scaling(proc), factor(proc))
+        enddo
+    enddo
+
+    do proc = 1, 46
+        if(factor(proc).lt.1.) call set_rate_const(proc, unscaled_rates(proc))
+    enddo
+    where(scaling.ge.1.) ratio = 0.
+
+end subroutine do_kmc_steps_accelerated
+
 subroutine do_kmc_step()
 
 !****f* proclist/do_kmc_step
@@ -207,6 +534,7 @@ subroutine do_kmc_step()
 !******
     real(kind=rsingle) :: ran_proc, ran_time, ran_site
     integer(kind=iint) :: nr_site, proc_nr
+    logical :: due
 
     call random_number(ran_time)
     call random_number(ran_proc)
@@ -215,6 +543,10 @@ subroutine do_kmc_step()
     call update_clocks(ran_time)
 
     call update_integ_rate
+    if(recorder_active)then
+        call recorder_due(due)
+        if(due) call take_samples()
+    endif
     call determine_procsite(ran_proc, ran_site, proc_nr, nr_site)
     call run_proc_nr(proc_nr, nr_site)
 end subroutine do_kmc_step
@@ -279,6 +611,24 @@ subroutine get_occupation(occupation)
     occupation = occupation/real(system_size(1)*system_size(2)*system_size(3))
 end subroutine get_occupation
 
+subroutine take_samples()
+
+!****f* proclist/take_samples
+! FUNCTION
+!    Passes the current occupation to base/record_samples, which stores
+!    the samples of the time-series recorder that are due. Called by
+!    do_kmc_steps and do_kmc_step before the process is executed.
+!
+! ARGUMENTS
+!
+!    ``none``
+!******
+    real(kind=rdouble), dimension(0:3, 1:25) :: occupation
+
+    call get_occupation(occupation)
+    call record_samples(size(occupation), occupation)
+end subroutine take_samples
+
 subroutine init(input_system_size, system_name, layer, seed_in, no_banner)
 
 !****f* proclist/init
@@ -435,6 +785,98 @@ subroutine initialize_state(layer, seed_in)
 
 end subroutine initialize_state
 
+subroutine set_configuration(config, size_x, size_y, size_z, size_n)
+
+!****f* proclist/set_configuration
+! FUNCTION
+!    Writes a whole configuration into the lattice and rebuilds the
+!    book-keeping of available processes in one go. This replaces
+!    calling replace_species for every site from Python.
+!
+! ARGUMENTS
+!
+!    * ``config`` species of all sites as array of the shape
+!      (system_size(1), system_size(2), system_size(3), spuck)
+!    * ``size_x``, ``size_y``, ``size_z``, ``size_n`` shape of config,
+!      inferred by f2py
+!******
+    integer(kind=iint), intent(in) :: size_x, size_y, size_z, size_n
+    integer(kind=iint), dimension(size_x, size_y, size_z, size_n), intent(in) :: config
+
+    integer(kind=iint) :: i, j, k, nr
+
+    if(size_x.ne.system_size(1).or.size_y.ne.system_size(2) &
+        .or.size_z.ne.system_size(3).or.size_n.ne.spuck)then
+        print *,"PROCLIST/SET_CONFIGURATION: shape of config", size_x, size_y, size_z, size_n
+        print *,"does not match the model", system_size, spuck
+        return
+    endif
+
+    do k = 0, system_size(3)-1
+        do j = 0, system_size(2)-1
+            do i = 0, system_size(1)-1
+                do nr = 1, spuck
+                    call replace_species((/i, j, k, nr/), &
+                        get_species((/i, j, k, nr/)), config(i+1, j+1, k+1, nr))
+                end do
+            end do
+        end do
+    end do
+
+    call touchup_lattice()
+
+end subroutine set_configuration
+
+subroutine touchup_lattice()
+
+!****f* proclist/touchup_lattice
+! FUNCTION
+!    Rebuilds the book-keeping of available processes of all sites from
+!    the current lattice configuration, e.g. after species have been
+!    replaced directly, and brings the accumulated rates up to date.
+!
+! ARGUMENTS
+!
+!    ``none``
+!******
+    integer(kind=iint) :: i, j, k
+
+    do k = 0, system_size(3)-1
+        do j = 0, system_size(2)-1
+            do i = 0, system_size(1)-1
+                call touchup_Pd100_h1((/i, j, k, Pd100_h1/))
+                call touchup_Pd100_h2((/i, j, k, Pd100_h2/))
+                call touchup_Pd100_h4((/i, j, k, Pd100_h4/))
+                call touchup_Pd100_h5((/i, j, k, Pd100_h5/))
+                call touchup_Pd100_b1((/i, j, k, Pd100_b1/))
+                call touchup_Pd100_b2((/i, j, k, Pd100_b2/))
+                call touchup_Pd100_b3((/i, j, k, Pd100_b3/))
+                call touchup_Pd100_b4((/i, j, k, Pd100_b4/))
+                call touchup_Pd100_b5((/i, j, k, Pd100_b5/))
+                call touchup_Pd100_b6((/i, j, k, Pd100_b6/))
+                call touchup_Pd100_b7((/i, j, k, Pd100_b7/))
+                call touchup_Pd100_b8((/i, j, k, Pd100_b8/))
+                call touchup_Pd100_b9((/i, j, k, Pd100_b9/))
+                call touchup_Pd100_b10((/i, j, k, Pd100_b10/))
+                call touchup_Pd100_h3((/i, j, k, Pd100_h3/))
+                call touchup_PdO_bridge2((/i, j, k, PdO_bridge2/))
+                call touchup_PdO_hollow1((/i, j, k, PdO_hollow1/))
+                call touchup_PdO_hollow2((/i, j, k, PdO_hollow2/))
+                call touchup_PdO_bridge1((/i, j, k, PdO_bridge1/))
+                call touchup_PdO_Pd2((/i, j, k, PdO_Pd2/))
+                call touchup_PdO_Pd3((/i, j, k, PdO_Pd3/))
+                call touchup_PdO_Pd4((/i, j, k, PdO_Pd4/))
+                call touchup_PdO_hollow3((/i, j, k, PdO_hollow3/))
+                call touchup_PdO_hollow4((/i, j, k, PdO_hollow4/))
+                call touchup_PdO_Pd1((/i, j, k, PdO_Pd1/))
+            end do
+        end do
+    end do
+
+    call update_accum_rate
+
+end subroutine touchup_lattice
+
 subroutine run_proc_nr(proc, nr_site)
 
 !****f* proclist/run_proc_nr
@@ -1,84 +1,916 @@
 #!/usr/bin/env python
 
+import os
+import pprint
 
-def test_build_model():
-    import os
-    import sys
-    import kmos.cli
-    import pprint
-    import filecmp
+import numpy as np
+import pytest
 
-    old_path = os.path.abspath(os.getcwd())
+import kmos.run
 
-    os.chdir(os.path.abspath(os.path.dirname(__file__)))
+TEST_DIR = os.path.abspath(os.path.dirname(__file__))
 
-    for backend in ["local_smart", "lat_int", "otf"]:
-        export_dir = "_tmp_export_{backend}".format(**locals())
 
-        print(os.getcwd())
-        print(os.listdir("."))
+def run_trajectory(model, steps=10000):
+    """Run the model step by step and return the (process, site) pairs."""
+    procs_sites = []
+    for i in range(steps):
+        proc, site = model.get_next_kmc_step()
+        procs_sites.append((proc.real, site.real))
+        model.run_proc_nr(proc, site)
+    return procs_sites
 
-        kmos.cli.main(
-            "export AB_model.ini {export_dir} -o -b{backend}".format(**locals())
+
+def reference_trajectory(backend="local_smart"):
+    """Return the reference trajectory of a backend as written by pprint."""
+    export_dir = os.path.join(TEST_DIR, "_tmp_export_%s" % backend)
+    with open(os.path.join(export_dir, "ref_procs_sites_%s.log" % backend)) as infile:
+        return infile.read()
+
+
+@pytest.mark.parametrize("backend", ["local_smart", "lat_int", "otf"])
+def test_build_model(export_model, backend):
+    export_model("_tmp_export_%s" % backend, "-b%s" % backend)
+
+    with kmos.run.KMC_Model(print_rates=False, banner=False) as model:
+        procs_sites = run_trajectory(model)
+
+    assert pprint.pformat(procs_sites) == reference_trajectory(backend), (
+        "Trajectories differ for backend %s" % backend
+    )
+
+
+@pytest.mark.parametrize(
+    "name, options",
+    [
+        ("local_smart", "-blocal_smart"),
+        ("lat_int", "-blat_int"),
+        ("otf", "-botf"),
+        ("otf_sparse", "-botf --sparse"),
+    ],
+)
+def test_sum_trees(export_model, name, options):
+    """The sum trees hold nr_of_sites*rates after set_rate_const and
+    determine_procsite takes the first and the last non-empty leaf for
+    random numbers of 0 and 1."""
+    kmc_model = export_model("_tmp_export_trees_%s" % name, options)
+    base, proclist = kmc_model.base, kmc_model.proclist
+    nr_of_proc = proclist.nr_of_proc
+
+    def check(rates):
+        for proc, rate in enumerate(rates, 1):
+            base.set_rate_const(proc, rate)
+        # otf takes the rates of the sites from the rate constants
+        if hasattr(proclist, "recalculate_rates_matrix"):
+            proclist.recalculate_rates_matrix()
+        base.update_accum_rate()
+
+        nr_of_sites = np.array(
+            [base.get_nrofsites(proc) for proc in range(1, nr_of_proc + 1)]
         )
+        totals = nr_of_sites * rates
+        assert np.isclose(base.get_accum_rate(0), totals.sum())
+        assert np.allclose(
+            [base.get_accum_rate(proc) for proc in range(1, nr_of_proc + 1)],
+            np.cumsum(totals),
+        )
+
+        procs = np.flatnonzero(totals) + 1
+        proc, site = base.determine_procsite(0.0, 0.0)
+        assert proc == procs[0]
+        assert site == base.get_avail_site(proc, 1, 1)
+        proc, site = base.determine_procsite(1.0, 1.0)
+        assert proc == procs[-1]
+        assert site == base.get_avail_site(proc, nr_of_sites[proc - 1], 1)
+        return procs
+
+    with kmos.run.KMC_Model(print_rates=False, banner=False, random_seed=1) as model:
+        model.do_steps(1000)
+        rates = 1.5 * np.arange(1, nr_of_proc + 1)
+        procs = check(rates)
+        assert len(procs) > 2
+        # empty leaves at both ends are never taken
+        rates[[procs[0] - 1, procs[-1] - 1]] = 0.0
+        check(rates)
+
+
+def test_bulk_getters(export_model):
+    """The getters of whole arrays return what the getters of single
+    elements do."""
+    kmc_model = export_model("_tmp_export_getters")
+    base, lattice, proclist = kmc_model.base, kmc_model.lattice, kmc_model.proclist
+    procs = range(1, proclist.nr_of_proc + 1)
+
+    with kmos.run.KMC_Model(
+        print_rates=False, banner=False, random_seed=1, size=[6, 5]
+    ) as model:
+        model.do_steps(1000)
+        assert list(base.get_procstats(proclist.nr_of_proc)) == [
+            base.get_procstat(proc) for proc in procs
+        ]
+        assert list(base.get_integ_rates(proclist.nr_of_proc)) == [
+            base.get_integ_rate(proc) for proc in procs
+        ]
+        assert list(base.get_rates(proclist.nr_of_proc)) == [
+            base.get_rate(proc) for proc in procs
+        ]
+
+        sites = range(1, base.get_volume() + 1)
+        species = [base.get_species(site) for site in sites]
+        assert list(base.get_all_species(base.get_volume())) == species
+        configuration = model._get_configuration()
+        for site in sites:
+            x, y, z, n = lattice.nr2lattice[site - 1]
+            assert configuration[x, y, z, n - 1] == species[site - 1]
+
 
-        os.chdir("..")
+def test_build_sparse_model(export_model):
+    """The --sparse book-keeping must not change the trajectory."""
+    export_model("_tmp_export_sparse", "-blocal_smart --sparse")
 
-        print(os.getcwd())
-        print(os.listdir("."))
+    with kmos.run.KMC_Model(print_rates=False, banner=False) as model:
+        procs_sites = run_trajectory(model)
 
-        # os.chdir(export_dir)
-        sys.path.insert(0, os.path.abspath("."))
+    assert (
+        pprint.pformat(procs_sites) == reference_trajectory()
+    ), "Trajectories differ for --sparse"
 
-        import kmos.run
 
-        if kmos.run.settings is None:
-            import kmc_settings as settings
+def test_build_inline_model(export_model):
+    """The --inline put/take routines must not change the trajectory."""
+    kmc_model = export_model("_tmp_export_inline", "-blocal_smart --inline")
 
-            kmos.run.settings = settings
+    with open("src/proclist.f90") as infile:
+        source = infile.read()
+    assert "call base_add_proc(" in source
+    assert "call add_proc(" not in source
 
-        if kmos.run.lattice is None:
-            from kmc_model import base, lattice, proclist
+    with kmos.run.KMC_Model(print_rates=False, banner=False) as model:
+        procs_sites = run_trajectory(model)
+        # the lattice is public with --inline and stored in one byte per site
+        assert kmc_model.base.lattice.dtype.itemsize == 1
 
-            kmos.run.base = base
-            kmos.run.lattice = lattice
-            kmos.run.proclist = proclist
+    assert (
+        pprint.pformat(procs_sites) == reference_trajectory()
+    ), "Trajectories differ for --inline"
 
-        procs_sites = []
+
+def test_build_morton_model(export_model):
+    """Numbering the sites along a Morton curve must not change the
+    trajectory in terms of lattice coordinates."""
+    export_model("_tmp_export_morton", "-blocal_smart --site-order=morton")
+
+    procs_sites = []
+    with kmos.run.KMC_Model(print_rates=False, banner=False) as model:
+        X, Y, Z = model.lattice.system_size
+        spuck = model.lattice.spuck
+        # the Z-order visits (0, 0), (1, 0), (0, 1), (1, 1) first
+        assert list(model.lattice.nr2lattice[2 * spuck]) == [0, 1, 0, 1]
+        for i in range(10000):
+            proc, site = model.get_next_kmc_step()
+            x, y, z, n = model.lattice.calculate_nr2lattice(site)
+            assert model.lattice.calculate_lattice2nr([x, y, z, n]) == site
+            # the number of the site with the default row order
+            procs_sites.append((proc.real, int(spuck * (x + X * (y + Y * z)) + n)))
+            model.run_proc_nr(proc, site)
+
+    assert (
+        pprint.pformat(procs_sites) == reference_trajectory()
+    ), "Trajectories differ for --site-order=morton"
+
+
+def test_build_compact_lookup_model(export_model):
+    """--compact-lookup shrinks lattice2nr but must not change the
+    trajectory, also without the mapping self-check."""
+    export_model("_tmp_export_compact_lookup", "-blocal_smart --compact-lookup")
+
+    with kmos.run.KMC_Model(
+        print_rates=False, banner=False, check_mapping=False
+    ) as model:
+        X, Y, Z = model.lattice.system_size
+        # nearest neighbour processes reach two cells beyond the system
+        assert model.lattice.lattice2nr.shape == (X + 4, Y + 4, Z, 1)
+        procs_sites = run_trajectory(model)
+
+    assert (
+        pprint.pformat(procs_sites) == reference_trajectory()
+    ), "Trajectories differ for --compact-lookup"
+
+
+def test_build_table_model(export_model):
+    """The table backend must give the trajectory of the lat_int backend."""
+    trajectories = {}
+    for backend in ["lat_int", "table"]:
+        export_model("_tmp_export_%s" % backend, "-b%s" % backend)
         with kmos.run.KMC_Model(print_rates=False, banner=False) as model:
-            print("Model compilation successfull")
-            for i in range(10000):
-                proc, site = model.get_next_kmc_step()
-                procs_sites.append((proc.real, site.real))
-                model.run_proc_nr(proc, site)
-
-        ## Regenerate reference trajectory files -- comment out
-        ## Comment to make test useful
-        # Generate reference file for new backends
-        if backend == "otf" and not os.path.exists(
-            "ref_procs_sites_{backend}.log".format(**locals())
-        ):
-            with open(
-                "ref_procs_sites_{backend}.log".format(**locals()), "w"
-            ) as outfile:
-                outfile.write(pprint.pformat(procs_sites))
-
-        with open("test_procs_sites_{backend}.log".format(**locals()), "w") as outfile:
-            outfile.write(pprint.pformat(procs_sites))
-
-        # check if both trajectories are equal
-        assert filecmp.cmp(
-            "test_procs_sites_{backend}.log".format(**locals()),
-            "ref_procs_sites_{backend}.log".format(**locals()),
-        ), "Trajectories differ for backend {backend}".format(**locals())
-        # Clean-up action
-        os.chdir("..")
-
-        kmos.run.lattice = None
-        kmos.run.settings = None
-
-    os.chdir(old_path)
+            trajectories[backend] = run_trajectory(model)
+
+    # the table backend has no code per process
+    assert not [
+        name for name in os.listdir("src") if name.startswith(("run_proc_", "nli_"))
+    ]
+    assert (
+        trajectories["table"] == trajectories["lat_int"]
+    ), "Trajectories differ for the table backend"
+
+
+def test_build_xoshiro_model(export_model):
+    """--rng=xoshiro: reference seeding, streams and reload of the state."""
+    kmc_model = export_model("_tmp_export_xoshiro", "-blocal_smart --rng=xoshiro")
+
+    # splitmix64 states of the reference implementation for seed 42
+    with kmos.run.KMC_Model(print_rates=False, banner=False, random_seed=42) as model:
+        assert list(model.get_rng_state()) == [
+            -4767286540954276203,
+            2949826092126892291,
+            5139283748462763858,
+            6349198060258255764,
+        ]
+        model.do_steps(1000)
+        model.base.set_system_name("%-200s" % "xoshiro_test")
+        model.base.save_system()
+        state = model.get_rng_state()
+        procs_sites = run_trajectory(model, 1000)
+        model.base.deallocate_system()
+        assert model.base.reload_system("%-200s" % "xoshiro_test")
+        assert list(model.get_rng_state()) == list(state)
+        assert run_trajectory(model, 1000) == procs_sites
+    os.remove("xoshiro_test.reload")
+
+    # stream 1 is the reference state jumped by 2^128 numbers
+    with kmos.run.KMC_Model(
+        print_rates=False, banner=False, random_seed=42, random_stream=1
+    ) as model:
+        assert list(model.get_rng_state()) == [
+            -9118550074381003083,
+            7232381093710323886,
+            -831081080334571476,
+            2563666913258560417,
+        ]
+    kmc_model.rng.rng_stream = 0
+
+
+def test_configuration(export_model):
+    """Setting a configuration rebuilds the database of available
+    processes, double and halve keep the species of the sites."""
+    import random
+
+    kmc_model = export_model("_tmp_export_configuration")
+    base, proclist = kmc_model.base, kmc_model.proclist
+
+    def available():
+        return {
+            (proc, site)
+            for proc in range(1, proclist.nr_of_proc + 1)
+            for site in range(1, base.get_volume() + 1)
+            if base.get_avail_site(proc, site, 2)
+        }
+
+    with kmos.run.KMC_Model(print_rates=False, banner=False, random_seed=1) as model:
+        model.do_steps(1000)
+        configuration = model._get_configuration()
+        processes = available()
+        model._set_configuration(model._get_configuration())
+        assert (model._get_configuration() == configuration).all()
+        assert available() == processes
+        model._adjust_database()
+        assert available() == processes
+
+        # halving the copies of double gives the configuration back
+        X, Y, Z, N = configuration.shape
+        model.double()
+        doubled = model._get_configuration()
+        assert (doubled == np.tile(configuration, (2, 2, 1, 1))).all()
+        assert len(available()) == 4 * len(processes)
+        model.halve()
+        assert (model._get_configuration() == configuration).all()
+        assert available() == processes
+
+        # otherwise each site takes the species of one of its four copies
+        model.double()
+        model.do_steps(1000)
+        doubled = model._get_configuration()
+        random.seed(5)
+        model.halve()
+        halved = model._get_configuration()
+        copies = doubled.reshape(2, X, 2, Y, Z, N)
+        assert ((copies == halved[None, :, None]).any(axis=(0, 2))).all()
+        assert (copies != halved[None, :, None]).any()
+        processes = available()
+        model._adjust_database()
+        assert available() == processes
+        model.double()
+        model._set_configuration(doubled)
+        random.seed(5)
+        model.halve()
+        assert (model._get_configuration() == halved).all()
+        assert available() == processes
+
+
+def test_recorder(export_model):
+    """Samples of the time-series recorder add up to the counters."""
+    kmc_model = export_model("_tmp_export_recorder")
+    base, proclist = kmc_model.base, kmc_model.proclist
+
+    with kmos.run.KMC_Model(print_rates=False, banner=False) as model:
+        nr_of_proc = proclist.nr_of_proc
+        model.do_steps(1000)
+
+        # every 10 steps
+        step0 = base.get_kmc_step()
+        procstat0 = base.get_procstats(nr_of_proc)
+        assert not base.recorder_active
+        model.start_recorder(interval_steps=10, buffer_size=100)
+        assert base.recorder_active
+        model.do_steps(500)
+        samples = model.drain_recorder()
+        assert list(samples["kmc_step"] - step0) == list(range(10, 500, 10))
+        assert (samples["procstat"].sum(axis=1) == 10).all()
+        assert samples["occupation"].shape == (49,) + proclist.get_occupation().shape
+
+        # at fixed kMC time, the sample holds the state before the step
+        # that passed the sample time
+        interval = base.get_kmc_time() / 1e4
+        time0 = base.get_kmc_time()
+        procstat0 = base.get_procstats(nr_of_proc)
+        model.start_recorder(interval_time=interval)
+        while not base.recorder_nr_of_samples:
+            occupation = proclist.get_occupation()
+            procstat = base.get_procstats(nr_of_proc)
+            model.do_steps(1)
+        samples = model.drain_recorder()
+        assert np.isclose(samples["kmc_time"][0], time0 + interval)
+        assert np.allclose(samples["occupation"][0], occupation)
+        assert (procstat0 + samples["procstat"][0] == procstat).all()
+        model.stop_recorder()
+        assert base.recorder_size == 0
+        assert not base.recorder_active
+
+
+def test_do_steps_until(export_model):
+    """do_steps stops at the kMC time, process count or coverage."""
+    kmc_model = export_model("_tmp_export_until")
+    base, proclist = kmc_model.base, kmc_model.proclist
+
+    with kmos.run.KMC_Model(print_rates=False, banner=False) as model:
+        model.do_steps(200)
+
+        t_end = 1.5 * base.get_kmc_time()
+        assert model.do_steps(10**7, until_time=t_end) == "time"
+        assert base.get_kmc_time() == t_end
+        step = base.get_kmc_step()
+        assert model.do_steps(5, until_time=2 * t_end) == "steps"
+        assert base.get_kmc_step() == step + 5
+
+        procstat = base.get_procstat(proclist.a_adsorption)
+        assert model.do_steps(10**7, until_proc="A_adsorption", until_count=7) == "proc"
+        assert base.get_procstat(proclist.a_adsorption) == procstat + 7
+
+        coverage = proclist.get_occupation()[proclist.a].sum() + 0.05
+        assert model.do_steps(10**7, until_coverage=("A", None, coverage)) == "coverage"
+        assert abs(proclist.get_occupation()[proclist.a].sum() - coverage) < 1e-9
+
+
+def test_lean_stepping(export_model):
+    """Lean stepping keeps the trajectory and, accumulated lazily, the
+    integrated rates."""
+    kmc_model = export_model("_tmp_export_lean")
+    base, proclist = kmc_model.base, kmc_model.proclist
+
+    results = {}
+    for integ_mode in ["step", "lazy", "off"]:
+        with kmos.run.KMC_Model(
+            print_rates=False,
+            banner=False,
+            random_seed=1,
+            walltime_interval=100,
+            integ_mode=integ_mode,
+        ) as model:
+            model.do_steps(3000)
+            results[integ_mode] = (
+                base.get_kmc_time(),
+                base.get_procstats(proclist.nr_of_proc),
+                base.get_integ_rates(proclist.nr_of_proc),
+            )
+            if integ_mode == "off":
+                with pytest.raises(UserWarning):
+                    model.get_std_sampled_data(1, 100, tof_method="integ")
+                # switching back continues from the current state
+                model.set_lean_stepping(1, "step")
+                model.do_steps(10)
+                assert base.get_integ_rates(proclist.nr_of_proc).sum() > 0
+
+    for integ_mode in ["lazy", "off"]:
+        assert results[integ_mode][0] == results["step"][0]
+        assert (results[integ_mode][1] == results["step"][1]).all()
+    assert np.allclose(results["lazy"][2], results["step"][2], rtol=1e-10, atol=0)
+    assert not results["off"][2].any()
+
+
+def test_get_atoms(export_model):
+    """get_atoms places each representation on its site as the
+    site-by-site loop over the lattice did."""
+    lattice = export_model("_tmp_export_atoms").lattice
+
+    with kmos.run.KMC_Model(
+        print_rates=False, banner=False, random_seed=1, size=[6, 5]
+    ) as model:
+        model.do_steps(1000)
+        atoms = model.get_atoms(tag="site")
+
+        numbers, positions, sites = [], [], []
+        for x in range(6):
+            for y in range(5):
+                for n in range(1, 1 + lattice.spuck):
+                    species = lattice.get_species([x, y, 0, n])
+                    if species == model.null_species:
+                        continue
+                    representation = model.species_representation[species]
+                    offset = np.dot(
+                        np.array([x, y, 0]) + lattice.site_positions[n - 1],
+                        lattice.unit_cell_size,
+                    )
+                    numbers.extend(representation.numbers)
+                    positions.extend(representation.positions + offset)
+                    sites.extend([n] * len(representation))
+                numbers.extend(model.lattice_representation.numbers)
+                positions.extend(
+                    model.lattice_representation.positions
+                    + np.dot([x, y, 0], lattice.unit_cell_size)
+                )
+                sites.extend([0] * len(model.lattice_representation))
+
+        assert len(atoms) > 6 * 5 * len(model.lattice_representation)
+        assert (atoms.numbers == numbers).all()
+        assert np.allclose(atoms.positions, positions)
+        assert (atoms.get_initial_magnetic_moments() == sites).all()
+        assert np.allclose(atoms.cell, model.cell_size)
+
+
+def test_export_movie_pipelined(export_model):
+    """Worker processes write the same frames as the serial export."""
+    import ase.io
+
+    base = export_model("_tmp_export_movie").base
+
+    for processes in [1, 2]:
+        with kmos.run.KMC_Model(
+            print_rates=False, banner=False, random_seed=1, size=[8, 8]
+        ) as model:
+            model.export_movie(
+                frames=5,
+                skip=200,
+                prefix="movie_%d" % processes,
+                suffix="traj",
+                processes=processes,
+                max_pending=2,
+            )
+            steps = base.get_kmc_step()
+        assert steps == 5 * 200
+
+    for i in range(5):
+        serial = ase.io.read("movie_1_%06d.traj" % i)
+        pipelined = ase.io.read("movie_2_%06d.traj" % i)
+        assert (serial.numbers == pipelined.numbers).all()
+        assert np.allclose(serial.positions, pipelined.positions)
+
+
+def test_lattice_png(export_model):
+    """The raster painter colours each site by its species."""
+    import matplotlib.image
+    import kmos.run.png
+
+    export_model("_tmp_export_lattice_png")
+
+    with kmos.run.KMC_Model(
+        print_rates=False, banner=False, random_seed=1, size=[6, 5]
+    ) as model:
+        model.do_steps(1000)
+        painter = kmos.run.png.LatticePNG(
+            model, scale=4, colors={"A": (255, 0, 0)}, glyphs={"default_a": "circle"}
+        )
+        image = painter.paint(model)
+        assert image.shape == (painter.height, painter.width, 3)
+
+        # the centre pixel of each site has the colour of its species
+        species = model._get_configuration()
+        for x in range(6):
+            for y in range(5):
+                row = painter.margin + 4 * (4 - y)
+                column = painter.margin + 4 * x
+                assert (image[row, column] == painter.lookup[species[x, y, 0, 0]]).all()
+        assert (painter.lookup[0] == (255, 0, 0)).all()
+
+        painter.write("lattice.png", model)
+        written = matplotlib.image.imread("lattice.png")
+        assert (np.rint(written * 255) == image).all()
+
+
+def test_model_runner(export_model):
+    """ModelRunner works through its job queue and resumes it."""
+    from kmos.run.jobqueue import JobQueue
+
+    base = export_model("_tmp_export_runner").base
+
+    class ScanAB(kmos.run.ModelRunner):
+        T = kmos.run.TemperatureParameter(min=500, max=700, steps=2)
+        p_COgas = kmos.run.PressureParameter(min=0.1, max=10, steps=3)
+        # renew the leases a couple of times per point
+        renew_steps = 300
+
+    for name in ["ScanAB.sqlite", "ScanAB.npz", "leases.sqlite"]:
+        if os.path.exists(name):
+            os.remove(name)
+
+    # the callback comes between pieces of at most callback_steps steps
+    with kmos.run.KMC_Model(print_rates=False, banner=False) as model:
+        steps = []
+        model.get_std_sampled_data(
+            2,
+            1000,
+            callback=lambda: steps.append(base.get_kmc_step()),
+            callback_steps=300,
+        )
+        assert steps == [300, 500, 800, 1000]
+
+    runner = ScanAB()
+    # a worker that died while running a point leaves it claimed
+    queue = runner.get_queue(lease_time=-1.0)
+    queue.add([(ScanAB.T.get_grid()[0], ScanAB.p_COgas.get_grid()[0])])
+    assert queue.claim() is not None
+    queue.close()
+
+    filename = runner.run(init_steps=1000, sample_steps=1000, cores=2)
+    assert filename == "ScanAB.npz"
+    data = np.load(filename)
+    assert len(data["T"]) == 6
+    assert sorted(set(data["T"])) == [500.0, 700.0]
+    assert (data["duration"] > 0).all()
+    assert "TOF" in data and "kmc_steps" in data
+
+    # failed points are tried again, the others are kept
+    queue = runner.get_queue()
+    assert queue.count() == queue.count("done") == 6
+    # as the worker which ran the first point
+    queue.worker = queue.get_results()[0][3]
+    assert queue.fail(1, "killed")
+    queue.close()
+    runner.run(init_steps=1000, sample_steps=1000, cores=2)
+    queue = runner.get_queue()
+    assert queue.count() == queue.count("done") == 6
+    queue.close()
+    assert len(runner.get_data()) == 6
+
+    # a worker whose lease ran out can neither renew, fail nor finish the
+    # point once another worker took it over
+    stale = JobQueue("leases.sqlite", lease_time=-1.0, worker="stale")
+    stale.add([(1.0,)])
+    job_id, _ = stale.claim()
+    fresh = JobQueue("leases.sqlite", worker="fresh")
+    assert fresh.claim() == (job_id, [1.0])
+    assert not stale.renew(job_id)
+    assert not stale.fail(job_id, "killed")
+    assert fresh.count("running") == 1
+    assert not stale.finish(job_id, {"TOF": 1.0}, 1.0)
+    assert fresh.renew(job_id)
+    assert fresh.finish(job_id, {"TOF": 2.0}, 1.0)
+    assert not stale.finish(job_id, {"TOF": 1.0}, 1.0)
+    assert fresh.get_results() == [([1.0], {"TOF": 2.0}, 1.0, "fresh")]
+    stale.close()
+    fresh.close()
+
+
+def test_model_runner_adaptive(export_model):
+    """Adaptive scans refine a coarse grid within the budget."""
+    export_model("_tmp_export_adaptive")
+
+    class ScanAdaptive(kmos.run.ModelRunner):
+        T = kmos.run.TemperatureParameter(600)
+        p_COgas = kmos.run.PressureParameter(min=0.01, max=100, steps=3)
+
+    for name in ["ScanAdaptive.sqlite", "ScanAdaptive.npz"]:
+        if os.path.exists(name):
+            os.remove(name)
+
+    runner = ScanAdaptive()
+    runner.run_adaptive(
+        budget=7, tolerance=0.01, init_steps=2000, sample_steps=5000, cores=2
+    )
+    data = runner.get_data()
+    assert 3 < len(data) <= 7
+    assert (data["T"] == 600.0).all()
+
+    # refinement points lie half way between two others on the log(p) scale
+    coarse = ScanAdaptive.p_COgas.get_grid()
+    pressures = data["p_COgas"]
+    means = np.sqrt(np.outer(pressures, pressures))
+    np.fill_diagonal(means, np.nan)
+    for pressure in pressures:
+        if not np.isclose(pressure, coarse).any():
+            assert np.isclose(pressure, means).any()
+
+
+def test_model_instances(export_model):
+    """Interleaved model instances run as if they were run one by one."""
+    kmc_model = export_model("_tmp_export_instances")
+    settings = kmos.run.settings
+    proclist = kmc_model.proclist
+
+    def state(model):
+        return (
+            model.base.get_kmc_time(),
+            model.base.get_procstats(proclist.nr_of_proc),
+            model.proclist.get_occupation(),
+        )
+
+    def same(state1, state2):
+        return all(np.array_equal(a, b) for a, b in zip(state1, state2))
+
+    with kmos.run.KMC_Model(print_rates=False, banner=False, random_seed=1) as model:
+        model.do_steps(300)
+        reference_a = [state(model)]
+        model.do_steps(500)
+        reference_a.append(state(model))
+    with kmos.run.KMC_Model(
+        print_rates=False, banner=False, random_seed=7, size=[7, 5]
+    ) as model:
+        model.parameters.p_COgas = 2.0
+        model.do_steps(400)
+        reference_b = state(model)
+    settings.parameters["p_COgas"]["value"] = 1.0
+
+    model_a = kmos.run.KMC_Model(print_rates=False, banner=False, random_seed=1)
+    # instances are only switched while there are several of them
+    assert "__getattribute__" not in kmos.run.KMC_Model.__dict__
+    model_b = kmos.run.KMC_Model(
+        print_rates=False, banner=False, random_seed=7, size=[7, 5], instance=1
+    )
+    assert "__getattribute__" in kmos.run.KMC_Model.__dict__
+    model_b.parameters.p_COgas = 2.0
+    model_a.do_steps(300)
+    assert same(state(model_a), reference_a[0])
+    model_b.do_steps(400)
+    assert same(state(model_b), reference_b)
+    model_a.do_steps(500)
+    assert same(state(model_a), reference_a[1])
+    assert settings.parameters["p_COgas"]["value"] == 1.0
+    assert list(model_b.lattice.system_size) == [7, 5, 1]
+    assert settings.parameters["p_COgas"]["value"] == 2.0
+    model_b.deallocate()
+    assert "__getattribute__" not in kmos.run.KMC_Model.__dict__
+    assert kmc_model.base.current_instance == 0
+    assert same(state(model_a), reference_a[1])
+    model_a.deallocate()
+
+
+def test_ensemble(export_model):
+    """The replicas of KMC_Ensemble run as if they were run one by one."""
+    kmc_model = export_model("_tmp_export_ensemble", "-blocal_smart --openmp")
+    base, proclist = kmc_model.base, kmc_model.proclist
+
+    references = []
+    for replica in range(3):
+        with kmos.run.KMC_Model(
+            print_rates=False, banner=False, random_seed=5 + replica
+        ) as model:
+            model.do_steps(1000)
+            references.append(
+                (
+                    base.get_kmc_time(),
+                    base.get_procstats(proclist.nr_of_proc),
+                    proclist.get_occupation(),
+                )
+            )
+
+    with kmos.run.KMC_Ensemble(
+        3, random_seed=5, print_rates=False, banner=False
+    ) as ensemble:
+        kmc_times, procstats, occupations = ensemble.do_steps(1000)
+        for replica, (kmc_time, procstat, occupation) in enumerate(references):
+            assert kmc_times[replica] == kmc_time
+            assert (procstats[replica] == procstat).all()
+            assert np.array_equal(occupations[replica], occupation)
+        assert ensemble.replicas[1].base.get_kmc_time() == kmc_times[1]
+
+
+def test_sublattice(export_model):
+    """do_steps_sublattice reproduces the steady state of do_steps."""
+    kmc_model = export_model("_tmp_export_sublattice", "-blocal_smart --sublattice")
+    base, proclist = kmc_model.base, kmc_model.proclist
+
+    with kmos.run.KMC_Model(
+        print_rates=False, banner=False, size=[20, 20], random_seed=3
+    ) as model:
+        # a reactive steady state with rates of the same order
+        model.parameters.p_COgas = 1e-3
+        model.parameters.p_O2gas = 1e-3
+        model.parameters.E_bind_CO = -0.05
+        model.parameters.E_bind_O2 = -0.05
+        t_window = 0.1 / base.get_rates(proclist.nr_of_proc).max()
+        model.do_steps(20000)
+        configuration = model._get_configuration()
+
+        def steady_state(run):
+            kmc_time = base.get_kmc_time()
+            reactions = base.get_procstats(proclist.nr_of_proc)[:4].sum()
+            occupations = []
+            for sample in range(50):
+                run()
+                occupations.append(proclist.get_occupation()[:, 0])
+            reactions = base.get_procstats(proclist.nr_of_proc)[:4].sum() - reactions
+            return (
+                np.mean(occupations, axis=0),
+                reactions / (base.get_kmc_time() - kmc_time),
+            )
+
+        occupation, tof = steady_state(lambda: model.do_steps(1600))
+
+        model._set_configuration(configuration)
+        kmc_time = base.get_kmc_time()
+        model.do_steps_sublattice(10, t_window, domains=(2, 5))
+        assert np.isclose(base.get_kmc_time(), kmc_time + 10 * t_window)
+        sublattice_occupation, sublattice_tof = steady_state(
+            lambda: model.do_steps_sublattice(30, t_window)
+        )
+        assert np.allclose(sublattice_occupation, occupation, atol=0.03)
+        assert abs(sublattice_tof / tof - 1) < 0.1
+
+        # the book-keeping is complete again afterwards
+        model.do_steps(1000)
+        with pytest.raises(UserWarning):
+            # domains of 20/3 unit cells
+            model.do_steps_sublattice(1, t_window, domains=(3, 1))
+
+
+def test_acceleration(export_model):
+    """do_steps_accelerated reproduces the TOF of do_steps in fewer steps."""
+    kmc_model = export_model("_tmp_export_acceleration")
+    base, proclist = kmc_model.base, kmc_model.proclist
+
+    # adsorption and desorption are reverse pairs, the reactions count
+    # towards the TOF
+    reverse = proclist.get_reverse_procs()
+    assert list(reverse) == [0, 0, 0, 0, 6, 5, 8, 7]
+
+    with kmos.run.KMC_Model(
+        print_rates=False, banner=False, size=[20, 20], random_seed=3
+    ) as model:
+        # adsorption and desorption are about 1000 times faster than the
+        # reactions
+        model.parameters.E_bind_CO = -0.05
+        model.parameters.E_bind_O2 = -0.05
+        rates = base.get_rates(proclist.nr_of_proc)
+        model.do_steps(50000)
+        configuration = model._get_configuration()
+
+        def tof(run, steps):
+            kmc_time = base.get_kmc_time()
+            reactions = base.get_procstats(proclist.nr_of_proc)[:4].sum()
+            report = run(steps)
+            reactions = base.get_procstats(proclist.nr_of_proc)[:4].sum() - reactions
+            return reactions, reactions / (base.get_kmc_time() - kmc_time), report
+
+        reactions, serial_tof, _ = tof(model.do_steps, 10000000)
+
+        model._set_configuration(configuration)
+        accelerated_reactions, accelerated_tof, report = tof(
+            model.do_steps_accelerated, 4000000
+        )
+        assert accelerated_reactions > reactions
+        assert abs(accelerated_tof / serial_tof - 1) < 0.05
+        assert sorted(report) == [
+            "A_adsorption",
+            "A_desorption",
+            "B_adsorption",
+            "B_desorption",
+        ]
+        for entry in report.values():
+            assert 0 < entry["scaling"] < 0.1
+            assert entry["imbalance"] <= 1
+        # the rate constants are restored
+        assert np.allclose(base.get_rates(proclist.nr_of_proc), rates)
+
+        # user-declared pairs replace the detected ones. A pair alone is
+        # not faster than the other one, so it keeps its rate constants.
+        report = model.do_steps_accelerated(
+            100000, reverse_pairs=[("A_adsorption", "A_desorption")]
+        )
+        assert report == {}
+        report = model.do_steps_accelerated(
+            100000,
+            reverse_pairs=[
+                ("A_desorption", "A_adsorption"),
+                ("B_adsorption", "B_desorption"),
+            ],
+        )
+        assert len(report) == 4
+        with pytest.raises(UserWarning):
+            # a process in two pairs
+            model.do_steps_accelerated(
+                1000,
+                reverse_pairs=[
+                    ("A_adsorption", "A_desorption"),
+                    ("A_adsorption", "B_desorption"),
+                ],
+            )
+
+
+def test_rate_tables(export_model):
+    """--rate-tables gives the same otf rates as the rate expressions."""
+    # CO_ads has a table of 5x5 entries, CO_oxidation_* of 4x4x4x4
+    kmc_model = export_model(
+        "_tmp_export_rate_tables",
+        "-botf --rate-tables=100",
+        model="../export_test/intZGB_otf.xml",
+    )
+    proclist_constants = kmc_model.proclist_constants
+    proclist_pars = kmc_model.proclist_pars
+
+    with open(os.path.join("src", "proclist_pars.f90")) as infile:
+        source = infile.read()
+    assert "subroutine fill_rate_table_CO_ads()" in source
+    assert "subroutine fill_rate_table_CO_oxidation_00()" not in source
+
+    with kmos.run.KMC_Model(
+        print_rates=False, banner=False, size=[10, 10], random_seed=1
+    ) as model:
+        model.parameters.kDes = 1.0
+        model.parameters.J_O_CO = 0.8
+        model.do_steps(2000)
+        configuration = model._get_configuration()[:, :, 0, 0]
+
+        # the tables are filled again when the parameters change
+        for y_CO, J_CO_CO in [(0.45, 0.9), (0.5, 1.1)]:
+            model.parameters.yCO = y_CO
+            model.parameters.J_CO_CO = J_CO_CO
+            for x in range(10):
+                for y in range(10):
+                    neighbours = [
+                        configuration[(x + dx) % 10, (y + dy) % 10]
+                        for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]
+                    ]
+                    rate = (
+                        y_CO
+                        * 0.8 ** neighbours.count(proclist_constants.o)
+                        * J_CO_CO ** neighbours.count(proclist_constants.co)
+                    )
+                    assert np.isclose(proclist_pars.gr_co_ads([x, y, 0, 0]), rate)
+
+                    # CO_oxidation_00 shares its bystander sites with
+                    # O_ads_00 and CO_oxidation_02, read from (-1, -1)
+                    species = proclist_pars.read_bystanders_1([x - 1, y - 1, 0, 0])
+                    assert np.isclose(
+                        proclist_pars.gs_co_oxidation_00(species),
+                        proclist_pars.gr_co_oxidation_00([x, y, 0, 0]),
+                    )
+
+    # each instance sees the tables of its own parameters. J_O_CO only
+    # enters the tables, not the rate constants.
+    model_a = kmos.run.KMC_Model(print_rates=False, banner=False, size=[10, 10])
+    model_b = kmos.run.KMC_Model(
+        print_rates=False, banner=False, size=[10, 10], instance=1
+    )
+    for model, J_O_CO in [(model_a, 0.8), (model_b, 0.5)]:
+        model.parameters.J_O_CO = J_O_CO
+        configuration = model._get_configuration()
+        configuration[1, 0, 0, 0] = proclist_constants.o
+        model._set_configuration(configuration)
+    y_CO = kmos.run.settings.parameters["yCO"]["value"]
+    for model, J_O_CO in [(model_a, 0.8), (model_b, 0.5), (model_a, 0.8)]:
+        rate = model.proclist.gr_co_ads([0, 0, 0, 0])
+        assert np.isclose(rate, float(y_CO) * J_O_CO)
+    model_b.deallocate()
+    model_a.deallocate()
+
+
+@pytest.mark.parametrize(
+    "name, options",
+    [("intZGB_otf", "-botf"), ("intZGB_otf_tables", "-botf --rate-tables=100")],
+)
+def test_shared_bystanders(export_model, name, options):
+    """Reading the bystanders of a group once per event and position
+    gives the trajectory of reading them for every process."""
+    export_model(
+        "_tmp_export_%s" % name, options, model="../export_test/intZGB_otf.xml"
+    )
+
+    with open(os.path.join("src", "run_proc_0003.f90")) as infile:
+        source = infile.read()
+    assert "call read_bystanders_" in source
+    assert "gs_" in source
+
+    with kmos.run.KMC_Model(
+        print_rates=False, banner=False, size=[10, 10], random_seed=1
+    ) as model:
+        model.parameters.kDes = 1.0
+        model.parameters.J_O_CO = 0.8
+        procs_sites = run_trajectory(model)
+
+    # recorded with gr_<process> reading the bystanders of each process
+    assert pprint.pformat(procs_sites) == reference_trajectory("intZGB_otf"), (
+        "Trajectories differ for shared bystanders with %s" % options
+    )
 
 
 if __name__ == "__main__":
-    test_build_model()
+    pytest.main([__file__, "-v"])